@@ -0,0 +1,257 @@
+# benchmarks/bench_hot_paths.py
+"""
+Микробенчмарки горячих функций бота (pyperf).
+
+Каждый бенчмарк готовит данные при первом вызове в своём рабочем
+процессе, поэтому подготовка не входит в замер.
+
+Запуск и сравнение с базовой линией:
+    python -m benchmarks.bench_hot_paths -o base.json
+    python -m benchmarks.bench_hot_paths -o new.json
+    python -m pyperf compare_to base.json new.json --table
+
+Ключ --quick оставляет только наименьшие размеры данных,
+--bench NAME запускает бенчмарки, имя которых начинается с NAME.
+"""
+import asyncio
+import io
+import time
+from typing import Any, Callable, Dict
+
+import pyperf
+
+from benchmarks import fixtures
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from db.importer import bulk_insert_questions
+from db.models import Job
+from db.session import async_session
+from db.snapshot import get_test_snapshot
+from fsm.session import TestSession
+from handlers.testing import show_question, complete_test, score_session
+from i18n.locales import get_text
+from keyboards.question import get_question_view, render_question
+from keyboards.reply import main_menu
+from tools.fake_bot_api import fake_message
+from utils.admin_jobs import JOB_EXPORT_RESULTS, run_export_results
+from utils.question_upload import open_upload
+from utils.word_parser import WordTestParser
+
+# Ключи локализации, запрашиваемые при прохождении теста
+TEXT_KEYS = ("question_header", "hint_single", "hint_multiple", "btn_skip", "btn_done", "btn_next")
+
+loop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+
+_prepared: Dict[Any, Any] = {}
+
+
+def prepared(key: Any, factory: Callable[[], Any]) -> Any:
+    """Подготовить данные один раз на процесс (корутины выполняются в loop)."""
+    if key not in _prepared:
+        value = factory()
+        if asyncio.iscoroutine(value):
+            value = loop.run_until_complete(value)
+        _prepared[key] = value
+    return _prepared[key]
+
+
+def database() -> int:
+    """Создать схему и студента; вернуть ID студента в БД."""
+    async def create():
+        await fixtures.create_schema()
+        return await fixtures.create_student()
+    return prepared("database", create)
+
+
+def bot():
+    return prepared("bot", fixtures.make_bot)
+
+
+def state() -> FSMContext:
+    key = StorageKey(bot_id=bot().id, chat_id=fixtures.STUDENT_TG_ID, user_id=fixtures.STUDENT_TG_ID)
+    return prepared("state", lambda: FSMContext(storage=MemoryStorage(), key=key))
+
+
+def test_with_questions(size: int):
+    """Тест заданного размера и его снимок."""
+    database()
+    test_id = prepared(("test", size), lambda: fixtures.create_test(size))
+    return prepared(("snapshot", size), lambda: get_test_snapshot(test_id))
+
+
+def answered_session(snapshot, result_id: int = 0) -> TestSession:
+    """Попытка, в которой даны ответы на все вопросы."""
+    test_session = TestSession.start(snapshot.test_id, result_id, [q.id for q in snapshot.questions])
+    for position, meta in enumerate(snapshot.questions):
+        if meta.question_type == "text":
+            test_session.texts[str(position)] = "Ответ"
+        else:
+            test_session.masks[position] = 1
+    return test_session
+
+
+def bench_render_question(loops: int, size: int) -> float:
+    snapshot = test_with_questions(size)
+
+    async def load_views():
+        return [await get_question_view(q.id, "ru") for q in snapshot.questions]
+    views = prepared(("views", size), load_views)
+
+    started = time.perf_counter()
+    for _ in range(loops):
+        for index, view in enumerate(views):
+            render_question(view, index, size, 1, "ru", 0)
+    return time.perf_counter() - started
+
+
+def bench_show_question(loops: int, size: int) -> float:
+    snapshot = test_with_questions(size)
+    message = fake_message(bot(), fixtures.STUDENT_TG_ID)
+    test_session = answered_session(snapshot)
+
+    async def run() -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            for position in range(size):
+                test_session.current = position
+                await show_question(message, state(), "ru", test_session)
+        return time.perf_counter() - started
+    return loop.run_until_complete(run())
+
+
+def bench_score_session(loops: int, size: int) -> float:
+    snapshot = test_with_questions(size)
+    test_session = answered_session(snapshot)
+
+    started = time.perf_counter()
+    for _ in range(loops):
+        score_session(test_session, snapshot)
+    return time.perf_counter() - started
+
+
+def bench_complete_test(loops: int, size: int) -> float:
+    snapshot = test_with_questions(size)
+    user_id = database()
+    message = fake_message(bot(), fixtures.STUDENT_TG_ID)
+
+    async def run() -> float:
+        elapsed = 0.0
+        for _ in range(loops):
+            result_id = await fixtures.create_attempt(user_id, snapshot.test_id)
+            test_session = answered_session(snapshot, result_id)
+            started = time.perf_counter()
+            await complete_test(message, state(), "ru", test_session)
+            elapsed += time.perf_counter() - started
+        return elapsed
+    return loop.run_until_complete(run())
+
+
+def bench_get_text(loops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        for key in TEXT_KEYS:
+            get_text(key, "uz", num=1, total=10)
+    return time.perf_counter() - started
+
+
+def bench_main_menu(loops: int) -> float:
+    users = ((fixtures.STUDENT_TG_ID, "ru"), (fixtures.STUDENT_TG_ID, "en"), (1, "uz"))
+    started = time.perf_counter()
+    for _ in range(loops):
+        for user_id, lang in users:
+            main_menu(user_id, lang)
+    return time.perf_counter() - started
+
+
+def bench_word_parse(loops: int, size: int) -> float:
+    data = prepared(("docx", size), lambda: fixtures.word_bytes(size))
+    started = time.perf_counter()
+    for _ in range(loops):
+        WordTestParser(io.BytesIO(data)).parse()
+    return time.perf_counter() - started
+
+
+def bench_excel_upload(loops: int, size: int) -> float:
+    database()
+    data = prepared(("xlsx", size), lambda: fixtures.excel_bytes(size))
+
+    async def run() -> float:
+        elapsed = 0.0
+        for _ in range(loops):
+            test_id = await fixtures.create_test(0)
+            started = time.perf_counter()
+            records, _ = open_upload(io.BytesIO(data), "xlsx")
+            async with async_session() as session:
+                await bulk_insert_questions(session, test_id, records)
+                await session.commit()
+            elapsed += time.perf_counter() - started
+        return elapsed
+    return loop.run_until_complete(run())
+
+
+def bench_export_results(loops: int, size: int) -> float:
+    database()
+
+    async def create():
+        test_id = await fixtures.create_test(10)
+        await fixtures.create_results(test_id, size)
+        return test_id
+    test_id = prepared(("results", size), create)
+    # Задача не сохраняется в БД: замеряется только сама выгрузка
+    job = Job(id=0, kind=JOB_EXPORT_RESULTS, chat_id=fixtures.STUDENT_TG_ID)
+    payload = {'test_id': test_id, 'lang': 'ru'}
+
+    async def run() -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            async with async_session() as session:
+                await run_export_results(bot(), session, job, payload)
+        return time.perf_counter() - started
+    return loop.run_until_complete(run())
+
+
+def add_cmdline_args(cmd, args) -> None:
+    """Передать собственные ключи рабочим процессам pyperf."""
+    if args.quick:
+        cmd.append("--quick")
+    if args.bench:
+        cmd.extend(("--bench", args.bench))
+
+
+def main() -> None:
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.argparser.add_argument("--quick", action="store_true", help="только наименьшие размеры")
+    runner.argparser.add_argument("--bench", help="запускать бенчмарки с этим префиксом имени")
+    args = runner.parse_args()
+
+    question_sizes = fixtures.QUESTION_SIZES[:1] if args.quick else fixtures.QUESTION_SIZES
+    result_sizes = fixtures.RESULT_SIZES[:1] if args.quick else fixtures.RESULT_SIZES
+
+    # (имя, функция, аргументы, внутренних повторов на вызов)
+    benchmarks = [
+        ("get_text", bench_get_text, (), len(TEXT_KEYS)),
+        ("main_menu", bench_main_menu, (), 3),
+    ]
+    for size in question_sizes:
+        benchmarks += [
+            (f"render_question[{size}]", bench_render_question, (size,), size),
+            (f"show_question[{size}]", bench_show_question, (size,), size),
+            (f"score_session[{size}]", bench_score_session, (size,), 1),
+            (f"complete_test[{size}]", bench_complete_test, (size,), 1),
+            (f"word_parse[{size}]", bench_word_parse, (size,), size),
+            (f"excel_upload[{size}]", bench_excel_upload, (size,), 1),
+        ]
+    for size in result_sizes:
+        benchmarks.append((f"export_results[{size}]", bench_export_results, (size,), 1))
+
+    for name, func, func_args, inner_loops in benchmarks:
+        if args.bench and not name.startswith(args.bench):
+            continue
+        runner.bench_time_func(name, func, *func_args, inner_loops=inner_loops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_word_parser.py
+"""
+Масштабируемость разбора вопросов из Word (pyperf).
+
+Разбирается текстовый формат из 1 000, 10 000 и 100 000 вопросов
+(и .docx целиком — из 1 000 и 10 000).
+Время выводится в пересчёте на один вопрос: при линейной сложности
+оно не зависит от размера документа. Вопросы потребляются без
+накопления, поэтому с ключом --tracemalloc видно, что пик памяти
+определяется одним вопросом, а не документом.
+
+Запуск:
+    python -m benchmarks.bench_word_parser -o word.json
+    python -m benchmarks.bench_word_parser --tracemalloc
+    python -m pyperf compare_to base.json word.json --table
+"""
+import io
+import time
+from collections import deque
+from typing import List
+
+import pyperf
+
+from benchmarks.fixtures import word_bytes
+from utils.word_parser import WordTestParser, iter_questions
+
+# Размеры документов (количество вопросов)
+SIZES = (1_000, 10_000, 100_000)
+
+
+def document_lines(questions: int) -> List[str]:
+    """Абзацы документа с заданным числом вопросов."""
+    lines = []
+    for number in range(questions):
+        lines.append(f"{number + 1}. Вопрос: " + "текст вопроса " * 8)
+        lines.extend(f"{letter}) {'*' if letter == 'A' else ''}Вариант {letter}" for letter in "ABCD")
+        lines.append("")
+    return lines
+
+
+def bench_iter_questions(loops: int, lines: List[str]) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        deque(iter_questions(lines), maxlen=0)
+    return time.perf_counter() - started
+
+
+def bench_docx_parse(loops: int, data: bytes) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        WordTestParser(io.BytesIO(data)).parse()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    runner = pyperf.Runner()
+    for size in SIZES:
+        runner.bench_time_func(
+            f"iter_questions[{size}]", bench_iter_questions, document_lines(size), inner_loops=size
+        )
+    for size in SIZES[:2]:
+        runner.bench_time_func(
+            f"docx_parse[{size}]", bench_docx_parse, word_bytes(size), inner_loops=size
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# benchmarks/fixtures.py
+"""
+Генерируемые данные для микробенчмарков.
+
+База данных — SQLite в памяти, Bot API — FakeSession.
+Модуль нужно импортировать до модулей бота: он задаёт настройки
+подключения через переменные окружения.
+"""
+import io
+import os
+import zipfile
+from xml.sax.saxutils import escape
+from datetime import datetime, timedelta
+
+os.environ.setdefault("TOKEN", "123456:BENCHMARK-TOKEN")
+os.environ.setdefault("SQLALCHEMY_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SQLALCHEMY_ECHO", "0")
+os.environ.setdefault("ADMIN_ID", "1")
+
+import pandas as pd  # noqa: E402
+from aiogram import Bot  # noqa: E402
+
+from db.models import Base, User, Test, Question, Option, TestResult  # noqa: E402
+from db.schema import upgrade_schema  # noqa: E402
+from db.session import async_session, engine  # noqa: E402
+from tools.fake_bot_api import FakeSession  # noqa: E402
+
+# Размеры тестов (количество вопросов)
+QUESTION_SIZES = (10, 100, 1000)
+
+# Размеры выгрузок (количество результатов)
+RESULT_SIZES = (100, 10_000)
+
+# Telegram ID студента, проходящего тесты в бенчмарках
+STUDENT_TG_ID = 500_000
+
+
+def make_bot() -> Bot:
+    """Создать бота с имитацией Bot API."""
+    return Bot(token=os.environ["TOKEN"], session=FakeSession())
+
+
+def question_type_for(number: int) -> str:
+    """Тип вопроса по номеру: 70% single, 20% multiple, 10% text."""
+    roll = number % 10
+    return "text" if roll == 9 else "multiple" if roll >= 7 else "single"
+
+
+async def create_schema() -> None:
+    """Создать таблицы в базе данных."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+
+
+async def create_student() -> int:
+    """
+    Создать активного студента.
+
+    Returns:
+        ID пользователя в БД
+    """
+    async with async_session() as session:
+        user = User(user_id=STUDENT_TG_ID, name="Студент", phone="+998000000000", language="ru", is_active=True)
+        session.add(user)
+        await session.commit()
+        return user.id
+
+
+async def create_test(questions: int) -> int:
+    """
+    Создать тест с вопросами всех типов.
+
+    Args:
+        questions: Количество вопросов
+
+    Returns:
+        ID теста
+    """
+    async with async_session() as session:
+        test = Test(title=f"Бенчмарк {questions}", total_questions=questions, is_active=True)
+        session.add(test)
+        await session.flush()
+
+        question_rows = [
+            Question(
+                test_id=test.id,
+                text=f"Вопрос {number + 1}: " + "текст вопроса " * 8,
+                question_type=question_type_for(number),
+                points=2.0,
+                order_num=number,
+                topic=f"Тема {number % 5}",
+            )
+            for number in range(questions)
+        ]
+        session.add_all(question_rows)
+        await session.flush()
+
+        for question in question_rows:
+            if question.question_type == "text":
+                continue
+            session.add_all(
+                Option(
+                    question_id=question.id,
+                    text=f"Вариант {option_number + 1}",
+                    is_correct=option_number == 0 or (question.question_type == "multiple" and option_number == 1),
+                )
+                for option_number in range(4)
+            )
+        await session.commit()
+        return test.id
+
+
+async def create_results(test_id: int, count: int) -> None:
+    """
+    Создать завершённые результаты теста от разных пользователей.
+
+    Args:
+        test_id: ID теста
+        count: Количество результатов
+    """
+    started = datetime(2024, 1, 1, 9, 0)
+    async with async_session() as session:
+        users = [
+            User(user_id=1_000_000 + test_id * 100_000 + number, name=f"Студент {number}",
+                 phone=f"+{test_id:03d}{number:09d}", is_active=True)
+            for number in range(count)
+        ]
+        session.add_all(users)
+        await session.flush()
+        session.add_all(
+            TestResult(
+                user_id=user.id,
+                test_id=test_id,
+                score=float(number % 100),
+                max_score=100,
+                started_at=started,
+                completed_at=started + timedelta(minutes=30),
+                answers_data="{}",
+            )
+            for number, user in enumerate(users)
+        )
+        await session.commit()
+
+
+async def create_attempt(user_id: int, test_id: int) -> int:
+    """
+    Создать незавершённую попытку.
+
+    Returns:
+        ID результата
+    """
+    async with async_session() as session:
+        result = TestResult(user_id=user_id, test_id=test_id, max_score=100, started_at=datetime.now())
+        session.add(result)
+        await session.commit()
+        return result.id
+
+
+def excel_bytes(questions: int) -> bytes:
+    """
+    Сформировать Excel-файл с вопросами в формате шаблона.
+
+    Args:
+        questions: Количество вопросов
+
+    Returns:
+        Содержимое .xlsx
+    """
+    rows = []
+    for number in range(questions):
+        question_type = question_type_for(number)
+        options = "" if question_type == "text" else "*Вариант 1||Вариант 2||Вариант 3||Вариант 4"
+        rows.append({
+            "question": f"Вопрос {number + 1}: " + "текст вопроса " * 8,
+            "type": question_type,
+            "points": 2,
+            "options": options,
+            "topic": f"Тема {number % 5}",
+        })
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        pd.DataFrame(rows).to_excel(writer, sheet_name="Questions", index=False)
+    return output.getvalue()
+
+
+# Минимальный набор частей .docx
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def docx_bytes(paragraphs) -> bytes:
+    """
+    Сформировать .docx из абзацев.
+
+    Args:
+        paragraphs: Тексты абзацев
+
+    Returns:
+        Содержимое .docx
+    """
+    body = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>' for text in paragraphs
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}<w:sectPr/></w:body></w:document>'
+    )
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _DOCX_RELS)
+        archive.writestr("word/document.xml", document)
+    return output.getvalue()
+
+
+def word_bytes(questions: int) -> bytes:
+    """
+    Сформировать .docx с вопросами в текстовом формате.
+
+    Args:
+        questions: Количество вопросов
+
+    Returns:
+        Содержимое .docx
+    """
+    paragraphs = []
+    for number in range(questions):
+        paragraphs.append(f"{number + 1}. Вопрос: " + "текст вопроса " * 8)
+        paragraphs.extend(f"{letter}) {'*' if letter == 'A' else ''}Вариант {letter}" for letter in "ABCD")
+        paragraphs.append("")
+    return docx_bytes(paragraphs)
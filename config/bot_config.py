@@ -10,9 +10,28 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Абсолютный путь к .env файлу
 env_path = os.path.join(BASE_DIR, 'config', '.env')
 
-# Загружаем конфигурацию
-config = dotenv_values(env_path)
+# Загружаем конфигурацию; переменные окружения имеют приоритет над .env
+config = {
+    **dotenv_values(env_path),
+    **{key: value for key, value in os.environ.items() if key in (
+        "TOKEN", "SQLALCHEMY_URL", "SQLALCHEMY_ECHO", "ADMIN_ID", "METRICS_HOST", "METRICS_PORT",
+        "TRACE_FILE", "TRACE_SAMPLE_RATE", "TRACE_SLOW_MS", "JOBS_CONCURRENCY"
+    )},
+}
 
 API_TOKEN = config['TOKEN']
 SQLALCHEMY_URL = config['SQLALCHEMY_URL']
-ADMIN_ID = int(config.get("ADMIN_ID", "0"))
\ No newline at end of file
+SQLALCHEMY_ECHO = config.get("SQLALCHEMY_ECHO", "1").lower() in ("1", "true", "yes")
+ADMIN_ID = int(config.get("ADMIN_ID", "0"))
+
+# Эндпоинт метрик Prometheus (порт 0 — выключен)
+METRICS_HOST = config.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(config.get("METRICS_PORT", "0"))
+
+# Трассировка обновлений (пустой TRACE_FILE — выключена)
+TRACE_FILE = config.get("TRACE_FILE", "")
+TRACE_SAMPLE_RATE = float(config.get("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_SLOW_MS = float(config.get("TRACE_SLOW_MS", "1000"))
+
+# Количество воркеров очереди фоновых задач
+JOBS_CONCURRENCY = int(config.get("JOBS_CONCURRENCY", "2"))
@@ -0,0 +1,257 @@
+# db/importer.py
+"""
+Пакетная запись импортируемых вопросов.
+
+Записи вопросов (формат WordTestParser.get_questions_as_db_format)
+читаются из итератора пачками и сохраняются двумя запросами на пачку:
+INSERT вопросов с RETURNING id и executemany INSERT вариантов.
+Источник может быть ленивым (потоковое чтение Excel) — в памяти
+одновременно держится только одна пачка.
+
+Для каждого вопроса сохраняется хэш содержимого (utils.content_hash).
+По нему повторная загрузка того же банка может пропускать вопросы,
+которые уже есть в тесте, или подключать вопросы других тестов
+без копирования (TestQuestionLink).
+"""
+import asyncio
+import logging
+from itertools import islice
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from db.models import Question, Option, TestQuestionLink
+from utils.content_hash import question_hash
+
+logger = logging.getLogger(__name__)
+
+# Количество вопросов в одной пачке INSERT
+IMPORT_BATCH_SIZE = 500
+
+# Режимы обработки дубликатов
+DEDUPE_NONE = 'none'  # сохранять все вопросы
+DEDUPE_SKIP = 'skip'  # пропускать вопросы, которые уже есть в тесте или повторяются в файле
+DEDUPE_LINK = 'link'  # как skip, а вопросы других тестов подключать без копирования
+DEDUPE_MODES = (DEDUPE_NONE, DEDUPE_SKIP, DEDUPE_LINK)
+
+
+class ImportStats(NamedTuple):
+    """Итоги загрузки вопросов."""
+    inserted: int
+    linked: int
+    skipped: int
+
+    @property
+    def total(self) -> int:
+        """Вопросов в тесте после загрузки (новых и подключённых)."""
+        return self.inserted + self.linked
+
+    @property
+    def processed(self) -> int:
+        """Обработано записей источника."""
+        return self.inserted + self.linked + self.skipped
+
+
+def _question_record(question: Question) -> Dict:
+    """Представить вопрос из БД в формате записи импорта."""
+    return {
+        'text': question.text,
+        'type': question.question_type,
+        'points': question.points,
+        'topic': question.topic,
+        'options': [
+            {'text': option.text, 'is_correct': option.is_correct}
+            for option in question.options
+        ],
+    }
+
+
+def _read_batch(iterator: Iterator[Dict], batch_size: int) -> List[Dict]:
+    """Прочитать очередную пачку записей и вычислить их хэши."""
+    batch = list(islice(iterator, batch_size))
+    for record in batch:
+        record['content_hash'] = question_hash(record)
+    return batch
+
+
+async def backfill_content_hashes(session: AsyncSession, batch_size: int = IMPORT_BATCH_SIZE) -> int:
+    """
+    Вычислить хэши вопросов, сохранённых без них.
+
+    Такие вопросы остаются от старых версий и ручного добавления.
+
+    Args:
+        session: Сессия БД
+        batch_size: Размер пачки
+
+    Returns:
+        Количество обновлённых вопросов
+    """
+    total = 0
+    while True:
+        result = await session.execute(
+            select(Question)
+            .options(selectinload(Question.options))
+            .where(Question.content_hash.is_(None))
+            .limit(batch_size)
+        )
+        questions = result.scalars().all()
+        if not questions:
+            break
+        for question in questions:
+            question.content_hash = question_hash(_question_record(question))
+        await session.flush()
+        for question in questions:
+            for option in question.options:
+                session.expunge(option)
+            session.expunge(question)
+        total += len(questions)
+    if total:
+        logger.info("Computed content hashes for %s questions", total)
+    return total
+
+
+async def _test_hashes(session: AsyncSession, test_id: int) -> Set[str]:
+    """Хэши вопросов теста (собственных и подключённых)."""
+    own = await session.execute(
+        select(Question.content_hash).where(Question.test_id == test_id)
+    )
+    linked = await session.execute(
+        select(Question.content_hash)
+        .join(TestQuestionLink, TestQuestionLink.question_id == Question.id)
+        .where(TestQuestionLink.test_id == test_id)
+    )
+    return {value for value in own.scalars()} | {value for value in linked.scalars()}
+
+
+async def _insert_question_batch(session: AsyncSession, test_id: int, batch: List[Dict]) -> None:
+    """
+    Записать пачку вопросов с вариантами ответов.
+
+    Args:
+        session: Сессия БД
+        test_id: ID теста
+        batch: Записи вопросов
+    """
+    rows = [
+        {
+            'test_id': test_id,
+            'text': record['text'],
+            'question_type': record['type'],
+            'points': record['points'],
+            'order_num': record['order_num'],
+            'topic': record.get('topic'),
+            'content_hash': record.get('content_hash'),
+        }
+        for record in batch
+    ]
+
+    bind = session.get_bind()
+    if bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = await session.execute(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            rows
+        )
+        question_ids = list(result.scalars())
+    else:
+        # Драйвер не гарантирует порядок RETURNING — через ORM (flush пачкой)
+        questions = [Question(**row) for row in rows]
+        session.add_all(questions)
+        await session.flush()
+        question_ids = [question.id for question in questions]
+        for question in questions:
+            session.expunge(question)
+
+    options = [
+        {'question_id': question_id, 'text': option['text'], 'is_correct': option['is_correct']}
+        for question_id, record in zip(question_ids, batch)
+        for option in record['options']
+    ]
+    if options:
+        await session.execute(insert(Option), options)
+
+
+async def bulk_insert_questions(
+    session: AsyncSession,
+    test_id: int,
+    records: Iterable[Dict],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    dedupe: str = DEDUPE_NONE,
+    on_batch: Optional[Callable[[ImportStats], Awaitable[None]]] = None
+) -> ImportStats:
+    """
+    Сохранить вопросы пачками.
+
+    Очередная пачка читается из источника (и хэшируется) в отдельном
+    потоке, чтобы разбор файла не блокировал цикл событий. Коммит
+    выполняет вызывающий код — в конце или после каждой пачки
+    в on_batch.
+
+    Args:
+        session: Сессия БД
+        test_id: ID теста
+        records: Записи вопросов (список или ленивый итератор)
+        batch_size: Размер пачки
+        dedupe: Режим обработки дубликатов (DEDUPE_MODES)
+        on_batch: Вызывается после записи каждой пачки с итогами на этот момент
+
+    Returns:
+        ImportStats
+    """
+    if dedupe not in DEDUPE_MODES:
+        raise ValueError(f"unknown dedupe mode: {dedupe}")
+
+    seen: Set[str] = set()
+    if dedupe != DEDUPE_NONE:
+        await backfill_content_hashes(session)
+        seen = await _test_hashes(session, test_id)
+
+    iterator: Iterator[Dict] = iter(records)
+    inserted = linked = skipped = 0
+    while True:
+        batch = await asyncio.to_thread(_read_batch, iterator, batch_size)
+        if not batch:
+            break
+
+        existing: Dict[str, int] = {}
+        if dedupe == DEDUPE_LINK:
+            result = await session.execute(
+                select(Question.content_hash, func.min(Question.id))
+                .where(Question.content_hash.in_({record['content_hash'] for record in batch}))
+                .group_by(Question.content_hash)
+            )
+            existing = dict(result.all())
+
+        new_records = []
+        links = []
+        for record in batch:
+            content_hash = record['content_hash']
+            if dedupe != DEDUPE_NONE:
+                if content_hash in seen:
+                    skipped += 1
+                    continue
+                seen.add(content_hash)
+            if content_hash in existing:
+                links.append({
+                    'test_id': test_id,
+                    'question_id': existing[content_hash],
+                    'order_num': record['order_num'],
+                })
+            else:
+                new_records.append(record)
+
+        if new_records:
+            await _insert_question_batch(session, test_id, new_records)
+        if links:
+            await session.execute(insert(TestQuestionLink), links)
+        inserted += len(new_records)
+        linked += len(links)
+        logger.debug(
+            "Import into test %s: %s inserted, %s linked, %s skipped",
+            test_id, inserted, linked, skipped
+        )
+        if on_batch is not None:
+            await on_batch(ImportStats(inserted, linked, skipped))
+    return ImportStats(inserted, linked, skipped)
@@ -3,7 +3,7 @@
 Модели базы данных для бота тестирования.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text, LargeBinary
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.ext.asyncio import AsyncAttrs
 
@@ -42,6 +42,8 @@ class Test(Base, AsyncAttrs):
     time_limit = Column(Integer, nullable=True)  # в минутах
     scheduled_time = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
+    shuffle = Column(Boolean, default=False)  # перемешивать вопросы и варианты
+    sampling = Column(String(20), nullable=True)  # выборка из банка: random, topic, points
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Отношения
@@ -54,17 +56,29 @@ class Question(Base, AsyncAttrs):
     __tablename__ = 'questions'
     
     id = Column(Integer, primary_key=True)
-    test_id = Column(Integer, ForeignKey('tests.id'))
+    test_id = Column(Integer, ForeignKey('tests.id'), index=True)
     text = Column(Text, nullable=False)
     question_type = Column(String(20), default='single')  # single, multiple, text
     points = Column(Float, default=2.0)
     order_num = Column(Integer, default=0)
+    topic = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 нормализованного содержимого
     
     # Отношения
     test = relationship("Test", back_populates="questions")
     options = relationship("Option", back_populates="question")
 
 
+class TestQuestionLink(Base, AsyncAttrs):
+    """Вопрос другого теста, подключённый к тесту без копирования."""
+    __tablename__ = 'test_question_links'
+    
+    id = Column(Integer, primary_key=True)
+    test_id = Column(Integer, ForeignKey('tests.id'), index=True)
+    question_id = Column(Integer, ForeignKey('questions.id'), index=True)
+    order_num = Column(Integer, default=0)
+
+
 class Option(Base, AsyncAttrs):
     """Модель варианта ответа."""
     __tablename__ = 'options'
@@ -90,8 +104,33 @@ class TestResult(Base, AsyncAttrs):
     started_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     answers_data = Column(Text, nullable=True)  # JSON данные ответов
+    shuffle_seed = Column(Integer, nullable=True)  # зерно перемешивания попытки
+    question_ids = Column(LargeBinary, nullable=True)  # выбранные вопросы (array('I'))
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Отношения
     user = relationship("User", back_populates="test_results")
     test = relationship("Test", back_populates="results")
+
+
+class Job(Base, AsyncAttrs):
+    """Фоновая задача администратора с сохраняемым прогрессом."""
+    __tablename__ = 'jobs'
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)  # import, export_results, delete_test, delete_users
+    status = Column(String(20), default='pending', index=True)  # pending, running, done, failed, cancelled
+    priority = Column(Integer, default=0)  # больше — раньше
+    payload = Column(Text, nullable=True)  # JSON параметры задачи
+    cursor = Column(Integer, default=0)  # обработано записей (сохранено в БД)
+    total = Column(Integer, nullable=True)  # всего записей, если известно
+    result = Column(Text, nullable=True)  # JSON итоги
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)  # выполненных попыток
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, nullable=True)  # не запускать раньше (повтор после ошибки)
+    chat_id = Column(Integer, nullable=True)  # чат для уведомлений
+    message_id = Column(Integer, nullable=True)  # сообщение с прогрессом
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,52 @@
+# db/schema.py
+"""
+Обновление схемы существующей базы данных.
+
+create_all создаёт только отсутствующие таблицы. Новые столбцы моделей
+(все они допускают NULL) и индексы добавляются в уже существующие
+таблицы здесь.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from db.models import Base
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_schema(connection: Connection) -> None:
+    """
+    Добавить недостающие столбцы и индексы в существующие таблицы.
+
+    Вызывается через AsyncConnection.run_sync после create_all.
+
+    Args:
+        connection: Синхронное соединение SQLAlchemy
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    preparer = connection.dialect.identifier_preparer
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(
+                f"ALTER TABLE {preparer.quote(table.name)} "
+                f"ADD COLUMN {preparer.quote(column.name)} {column_type}"
+            ))
+            logger.info("Added column %s.%s", table.name, column.name)
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            index.create(connection)
+            logger.info("Created index %s", index.name)
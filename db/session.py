@@ -1,6 +1,6 @@
 # db/session.py
-from config.bot_config import SQLALCHEMY_URL
+from config.bot_config import SQLALCHEMY_URL, SQLALCHEMY_ECHO
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-engine = create_async_engine(SQLALCHEMY_URL, echo=True)
+engine = create_async_engine(SQLALCHEMY_URL, echo=SQLALCHEMY_ECHO)
 async_session = async_sessionmaker(engine, expire_on_commit=False)
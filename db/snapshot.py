@@ -0,0 +1,189 @@
+# db/snapshot.py
+"""
+Кэшируемые снимки тестов.
+
+Снимок содержит всё, что нужно для проведения и оценки попытки:
+порядок вопросов, их типы, баллы, маски правильных вариантов
+и группы вопросов (по темам и баллам) для выборки из банка.
+В тест входят его собственные вопросы и вопросы других тестов,
+подключённые при импорте (TestQuestionLink).
+Тексты вопросов сюда не входят — они хранятся в кэше отрисовки.
+"""
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+from db.models import Test, Question, Option, TestQuestionLink
+from db.session import async_session
+from utils.sampling import sample_positions
+
+# Максимальное количество тестов в кэше снимков
+SNAPSHOT_CACHE_SIZE = 256
+
+
+class QuestionMeta(NamedTuple):
+    """Данные вопроса, необходимые для оценки ответа."""
+    id: int
+    question_type: str
+    points: float
+    option_ids: Tuple[int, ...]
+    correct_mask: int
+    topic: Optional[str] = None
+
+    def option_bit(self, option_id: int) -> int:
+        """
+        Получить бит варианта ответа в маске выбора.
+
+        Args:
+            option_id: ID варианта
+
+        Returns:
+            Бит варианта или 0, если вариант не относится к вопросу
+        """
+        try:
+            return 1 << self.option_ids.index(option_id)
+        except ValueError:
+            return 0
+
+    def option_ids_for(self, mask: int) -> list:
+        """
+        Получить ID вариантов, отмеченных в маске.
+
+        Args:
+            mask: Маска выбранных вариантов
+
+        Returns:
+            Список ID вариантов
+        """
+        return [oid for i, oid in enumerate(self.option_ids) if mask >> i & 1]
+
+
+class TestSnapshot(NamedTuple):
+    """Неизменяемый снимок теста."""
+    test_id: int
+    title: str
+    time_limit: Optional[int]
+    questions: Tuple[QuestionMeta, ...]
+    by_id: Dict[int, QuestionMeta]
+    strata: Dict[str, Dict[object, Tuple[int, ...]]]
+
+    def sample_ids(self, count: int, seed: int, mode: str = "random") -> List[int]:
+        """
+        Выбрать вопросы банка для попытки.
+
+        Args:
+            count: Сколько вопросов выбрать
+            seed: Зерно выборки
+            mode: Режим выборки: random, topic или points
+
+        Returns:
+            ID выбранных вопросов в порядке банка
+        """
+        strata = self.strata.get(mode) or self.strata["random"]
+        return [self.questions[i].id for i in sample_positions(strata, count, seed)]
+
+
+_snapshots: "OrderedDict[int, TestSnapshot]" = OrderedDict()
+
+
+async def get_test_snapshot(test_id: int) -> Optional[TestSnapshot]:
+    """
+    Получить снимок теста из кэша или загрузить его из БД.
+
+    Args:
+        test_id: ID теста
+
+    Returns:
+        TestSnapshot или None, если тест не найден
+    """
+    snapshot = _snapshots.get(test_id)
+    if snapshot is not None:
+        _snapshots.move_to_end(test_id)
+        return snapshot
+
+    async with async_session() as session:
+        test = await session.get(Test, test_id)
+        if test is None:
+            return None
+
+        # Собственные вопросы теста и вопросы, подключённые из других тестов
+        own_questions = await session.execute(
+            select(Question.id, Question.question_type, Question.points, Question.topic, Question.order_num)
+            .where(Question.test_id == test_id)
+        )
+        linked_questions = await session.execute(
+            select(Question.id, Question.question_type, Question.points, Question.topic, TestQuestionLink.order_num)
+            .join(TestQuestionLink, TestQuestionLink.question_id == Question.id)
+            .where(TestQuestionLink.test_id == test_id)
+        )
+        questions = sorted(
+            [*own_questions.all(), *linked_questions.all()],
+            key=lambda row: (row[4] or 0, row[0])
+        )
+
+        options_by_question = {}
+        own_options = await session.execute(
+            select(Option.question_id, Option.id, Option.is_correct)
+            .join(Question, Option.question_id == Question.id)
+            .where(Question.test_id == test_id)
+            .order_by(Option.question_id, Option.id)
+        )
+        linked_options = await session.execute(
+            select(Option.question_id, Option.id, Option.is_correct)
+            .join(TestQuestionLink, Option.question_id == TestQuestionLink.question_id)
+            .where(TestQuestionLink.test_id == test_id)
+            .order_by(Option.question_id, Option.id)
+        )
+        for result in (own_options, linked_options):
+            for question_id, option_id, is_correct in result.all():
+                options_by_question.setdefault(question_id, []).append((option_id, is_correct))
+
+    metas = []
+    for question_id, question_type, points, topic, _ in questions:
+        options = options_by_question.get(question_id, ())
+        correct_mask = 0
+        for i, (_, is_correct) in enumerate(options):
+            if is_correct:
+                correct_mask |= 1 << i
+        metas.append(QuestionMeta(
+            question_id,
+            question_type or 'single',
+            float(points or 0),
+            tuple(option_id for option_id, _ in options),
+            correct_mask,
+            topic,
+        ))
+
+    strata = {"random": {None: tuple(range(len(metas)))}, "topic": {}, "points": {}}
+    for position, meta in enumerate(metas):
+        strata["topic"].setdefault(meta.topic, []).append(position)
+        strata["points"].setdefault(meta.points, []).append(position)
+    for mode in ("topic", "points"):
+        strata[mode] = {key: tuple(positions) for key, positions in strata[mode].items()}
+
+    snapshot = TestSnapshot(
+        test.id,
+        test.title,
+        test.time_limit,
+        tuple(metas),
+        {meta.id: meta for meta in metas},
+        strata,
+    )
+    _snapshots[test_id] = snapshot
+    if len(_snapshots) > SNAPSHOT_CACHE_SIZE:
+        _snapshots.popitem(last=False)
+    return snapshot
+
+
+def invalidate_test_snapshot(test_id: Optional[int] = None) -> None:
+    """
+    Сбросить снимок теста после изменения его вопросов.
+
+    Args:
+        test_id: ID теста; None — сбросить все снимки
+    """
+    if test_id is None:
+        _snapshots.clear()
+    else:
+        _snapshots.pop(test_id, None)
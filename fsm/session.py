@@ -0,0 +1,176 @@
+# fsm/session.py
+"""
+Компактное представление активной попытки прохождения теста в FSM.
+
+В данных FSM хранится один список из неизменяемых значений:
+ID теста и результата, номер текущего вопроса, порядок вопросов
+(array('I') в base64), маски выбранных вариантов (строка из чисел
+в шестнадцатеричной записи) и зерно перемешивания вариантов.
+Маски — целые Python произвольной ширины: количество вариантов
+в вопросе не ограничено 32 битами.
+Строки копируются хранилищем за O(1), поэтому размер данных
+не влияет на стоимость get_data/update_data.
+"""
+import base64
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+# Ключ данных попытки в FSM
+SESSION_KEY = "session"
+
+# Префикс упакованных масок (без него — прежний формат array('I') в base64)
+MASKS_PREFIX = "x"
+
+
+def _pack(values: array) -> str:
+    """Упаковать массив в строку base64."""
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _unpack(packed: str) -> array:
+    """Распаковать массив из строки base64."""
+    values = array("I")
+    values.frombytes(base64.b64decode(packed))
+    return values
+
+
+def _pack_masks(masks: List[int]) -> str:
+    """Упаковать маски выбора в строку."""
+    return MASKS_PREFIX + ",".join(format(mask, "x") for mask in masks)
+
+
+def _unpack_masks(packed: str) -> List[int]:
+    """Распаковать маски выбора (в том числе из прежнего формата)."""
+    if not packed.startswith(MASKS_PREFIX):
+        return _unpack(packed).tolist()
+    packed = packed[len(MASKS_PREFIX):]
+    return [int(mask, 16) for mask in packed.split(",")] if packed else []
+
+
+@lru_cache(maxsize=4096)
+def _unpack_order(packed: str) -> array:
+    """Распаковать порядок вопросов (не меняется в течение попытки)."""
+    return _unpack(packed)
+
+
+class TestSession:
+    """Активная попытка прохождения теста."""
+
+    __slots__ = ("test_id", "result_id", "current", "_order", "masks", "texts", "seed")
+
+    def __init__(
+        self,
+        test_id: int,
+        result_id: int,
+        current: int,
+        order: str,
+        masks: List[int],
+        texts: Dict[str, str],
+        seed: int = 0
+    ):
+        self.test_id = test_id
+        self.result_id = result_id
+        self.current = current
+        self._order = order
+        self.masks = masks
+        self.texts = texts
+        self.seed = seed
+
+    @classmethod
+    def start(
+        cls,
+        test_id: int,
+        result_id: int,
+        question_ids: Iterable[int],
+        seed: int = 0
+    ) -> "TestSession":
+        """
+        Создать новую попытку.
+
+        Args:
+            test_id: ID теста
+            result_id: ID результата (TestResult)
+            question_ids: ID вопросов в порядке показа
+            seed: Зерно перемешивания вариантов (0 — без перемешивания)
+
+        Returns:
+            TestSession
+        """
+        order = array("I", question_ids)
+        return cls(test_id, result_id, 0, _pack(order), [0] * len(order), {}, seed)
+
+    @classmethod
+    def load(cls, data: Dict[str, Any]) -> Optional["TestSession"]:
+        """
+        Восстановить попытку из данных FSM.
+
+        Args:
+            data: Данные FSM
+
+        Returns:
+            TestSession или None, если попытки нет
+        """
+        packed = data.get(SESSION_KEY)
+        if not packed:
+            return None
+        test_id, result_id, current, order, masks, texts, seed = packed
+        return cls(test_id, result_id, current, order, _unpack_masks(masks), dict(texts), seed)
+
+    def dump(self) -> Dict[str, Any]:
+        """
+        Упаковать попытку для сохранения в FSM.
+
+        Returns:
+            Словарь для state.update_data
+        """
+        return {
+            SESSION_KEY: [
+                self.test_id,
+                self.result_id,
+                self.current,
+                self._order,
+                _pack_masks(self.masks),
+                self.texts,
+                self.seed,
+            ]
+        }
+
+    @property
+    def order(self) -> array:
+        """ID вопросов в порядке показа."""
+        return _unpack_order(self._order)
+
+    @property
+    def total(self) -> int:
+        """Количество вопросов в попытке."""
+        return len(self.masks)
+
+    @property
+    def current_question_id(self) -> Optional[int]:
+        """ID текущего вопроса или None, если вопросы закончились."""
+        if 0 <= self.current < self.total:
+            return self.order[self.current]
+        return None
+
+    def position_of(self, question_id: int) -> int:
+        """
+        Найти позицию вопроса в попытке.
+
+        Args:
+            question_id: ID вопроса
+
+        Returns:
+            Позиция вопроса или -1, если вопроса нет в попытке
+        """
+        order = self.order
+        if self.current < len(order) and order[self.current] == question_id:
+            return self.current
+        try:
+            return order.index(question_id)
+        except ValueError:
+            return -1
+
+    def is_answered(self, position: int) -> bool:
+        """Дан ли ответ на вопрос в указанной позиции."""
+        return bool(self.masks[position]) or str(position) in self.texts
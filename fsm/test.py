@@ -20,6 +20,7 @@ class AdminTestCreation(StatesGroup):
     time_limit = State()
     scheduled_time = State()
     upload_file = State()
+    confirm_import = State()
     confirm = State()
 
 
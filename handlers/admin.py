@@ -3,24 +3,42 @@
 Обработчики административной панели бота.
 Управление пользователями и тестами.
 """
-from aiogram import Router, F
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from aiogram import Bot, Dispatcher, Router, F
+from aiogram.filters import Command, CommandObject
 from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
+    BufferedInputFile,
     CallbackQuery,
     Message
 )
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
+from sqlalchemy import func, select
 
-from db.models import User
+from db.models import Job, User
 from db.session import async_session
 from config.bot_config import ADMIN_ID
-from i18n.locales import get_text
+from i18n.locales import get_action, get_text
+from utils.edit_cache import edit_stats, edit_text_cached
+from middlewares.debounce import DEBOUNCE_WINDOW, debounce_stats
+from utils.profiler import StackSampler, UpdateCountdownMiddleware
+from utils.admin_jobs import JOB_DELETE_USERS, JOB_TITLES
+from utils.jobs import enqueue_job, list_jobs
 
 admin_router = Router()
 
+# Длительность профилирования по умолчанию и максимальная (секунды)
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 600
+
+# Задача текущего сеанса профилирования
+_profile_task: Optional[asyncio.Task] = None
+
 
 async def get_user_language(user_id: int) -> str:
     """
@@ -42,11 +60,7 @@ async def get_user_language(user_id: int) -> str:
 
 # ============ Админ-меню ============
 @admin_router.message(
-    F.text.in_([
-        "Управление тестами",
-        "Manage Tests",
-        "Testlarni boshqarish"
-    ])
+    F.text.func(get_action) == "btn_admin_panel"
 )
 async def admin_main_menu(message: Message) -> None:
     """
@@ -100,7 +114,8 @@ async def back_to_admin_menu(
     ])
 
     try:
-        await callback.message.edit_text(
+        await edit_text_cached(
+            callback.message,
             get_text("admin_main_title", lang),
             reply_markup=keyboard
         )
@@ -134,7 +149,8 @@ async def show_users(callback: CallbackQuery) -> None:
 
     if not users:
         try:
-            await callback.message.edit_text(
+            await edit_text_cached(
+                callback.message,
                 get_text("users_empty", lang),
                 reply_markup=InlineKeyboardMarkup(inline_keyboard=[
                     [InlineKeyboardButton(text=get_text("btn_back", lang), callback_data="admin_menu")]
@@ -253,26 +269,200 @@ async def delete_all_users(callback: CallbackQuery) -> None:
         return
 
     async with async_session() as session:
-        result = await session.execute(select(User))
-        users = result.scalars().all()
+        users_count = await session.scalar(select(func.count(User.id)))
+
+    if not users_count:
+        await callback.answer(get_text("users_empty", lang), show_alert=True)
+        return
+
+    # Удаление выполняется очередью задач, итог придёт в это сообщение
+    job_id = await enqueue_job(
+        JOB_DELETE_USERS,
+        {'lang': lang or 'ru'},
+        total=users_count,
+        chat_id=callback.message.chat.id,
+        message_id=callback.message.message_id
+    )
+    try:
+        await edit_text_cached(callback.message, f"⏳ Удаление пользователей поставлено в очередь (задача #{job_id})")
+    except TelegramBadRequest:
+        pass
+
+    await callback.answer()
+
+
+# ============ Служебная статистика ============
+@admin_router.message(Command("editstats"))
+async def show_edit_stats(message: Message) -> None:
+    """
+    Показать статистику подавленных редактирований и повторных нажатий.
+
+    Args:
+        message: Входящее сообщение
+    """
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    text = (
+        "✏️ Редактирование сообщений:\n"
+        f"• Запросов: {edit_stats['requested']}\n"
+        f"• Отправлено в API: {edit_stats['sent']}\n"
+        f"• Пропущено локально: {edit_stats['suppressed']}\n"
+        f"• Ответов «not modified»: {edit_stats['not_modified']}\n\n"
+        "👆 Нажатия кнопок теста:\n"
+        f"• Обработано: {debounce_stats['passed']}\n"
+        f"• Повторов во время обработки: {debounce_stats['in_flight']}\n"
+        f"• Повторов в окне {DEBOUNCE_WINDOW} с: {debounce_stats['debounced']}"
+    )
+    await message.answer(text)
+
+
+def _job_line(job) -> str:
+    """Строка задачи для списка /jobs."""
+    progress = f" {job.cursor or 0}/{job.total}" if job.total else ""
+    attempts = f", попытка {job.attempts}/{job.max_attempts}" if job.attempts else ""
+    return f"#{job.id} {JOB_TITLES.get(job.kind, job.kind)}: {job.status}{progress}{attempts}"
 
-        if not users:
-            await callback.answer(get_text("users_empty", lang), show_alert=True)
+
+@admin_router.message(Command("jobs"))
+async def show_jobs(message: Message, command: CommandObject) -> None:
+    """
+    Показать очередь фоновых задач.
+
+    /jobs — активные и последние задачи, /jobs <id> — подробности задачи.
+
+    Args:
+        message: Входящее сообщение
+        command: Команда с аргументами
+    """
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    if command.args:
+        try:
+            job_id = int(command.args.strip())
+        except ValueError:
+            await message.answer("Использование: /jobs или /jobs <id>")
             return
+        async with async_session() as session:
+            job = await session.get(Job, job_id)
+        if job is None:
+            await message.answer(f"Задача #{job_id} не найдена.")
+            return
+        lines = [
+            _job_line(job),
+            f"Приоритет: {job.priority or 0}",
+            f"Создана: {job.created_at:%d.%m.%Y %H:%M:%S}" if job.created_at else "",
+            f"Завершена: {job.finished_at:%d.%m.%Y %H:%M:%S}" if job.finished_at else "",
+            f"Повтор после: {job.run_after:%H:%M:%S}" if job.run_after and job.status == 'pending' else "",
+            f"Ошибка: {job.error}" if job.error else "",
+        ]
+        await message.answer("\n".join(line for line in lines if line))
+        return
 
-        for user in users:
-            await session.delete(user)
-        await session.commit()
+    jobs = await list_jobs()
+    if not jobs:
+        await message.answer("📭 Задач нет.")
+        return
+    text = "🗂 Фоновые задачи:\n" + "\n".join(_job_line(job) for job in jobs)
+    failed = [job for job in jobs if job.error and job.status == 'failed']
+    if failed:
+        text += "\n\n⚠️ Ошибки:\n" + "\n".join(f"#{job.id}: {job.error}" for job in failed)
+    await message.answer(text)
+
+
+async def _finish_profiling(
+    bot: Bot,
+    sampler: StackSampler,
+    done: asyncio.Event,
+    timeout: float,
+    dispatcher: Optional[Dispatcher] = None,
+    countdown: Optional[UpdateCountdownMiddleware] = None
+) -> None:
+    """
+    Дождаться конца сеанса профилирования и отправить результат администратору.
 
+    Args:
+        bot: Экземпляр бота
+        sampler: Запущенный профилировщик
+        done: Событие досрочного завершения (набрано нужное число обновлений)
+        timeout: Максимальная длительность сеанса в секундах
+        dispatcher: Диспетчер, если сеанс ограничен числом обновлений
+        countdown: Middleware счёта обновлений
+    """
     try:
-        await callback.message.answer(
-            get_text("all_users_deleted", lang),
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text=get_text("btn_back", lang), callback_data="admin_menu")]
-            ])
+        await asyncio.wait_for(done.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        if dispatcher is not None and countdown is not None:
+            dispatcher.update.outer_middleware.unregister(countdown)
+        await asyncio.to_thread(sampler.stop)
+
+    filename = f"profile_{datetime.now():%Y%m%d_%H%M%S}.folded"
+    await bot.send_document(
+        chat_id=ADMIN_ID,
+        document=BufferedInputFile(sampler.folded().encode("utf-8"), filename=filename),
+        caption=(
+            f"🔬 Профиль: {sampler.samples} снимков за {sampler.duration:.1f} с\n"
+            "Формат folded stacks (flamegraph.pl, speedscope)"
         )
-        await callback.message.delete()
-    except TelegramBadRequest:
-        await callback.answer(get_text("all_users_deleted", lang), show_alert=True)
+    )
 
-    await callback.answer()
+
+@admin_router.message(Command("profile"))
+async def start_profiling(
+    message: Message,
+    command: CommandObject,
+    dispatcher: Optional[Dispatcher] = None
+) -> None:
+    """
+    Включить семплирующее профилирование на N секунд или N обновлений.
+
+    /profile 30 — 30 секунд, /profile 200u — 200 обновлений
+    (но не дольше PROFILE_MAX_SECONDS).
+
+    Args:
+        message: Входящее сообщение
+        command: Команда с аргументами
+        dispatcher: Диспетчер (передаётся aiogram)
+    """
+    global _profile_task
+
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    if _profile_task is not None and not _profile_task.done():
+        await message.answer("🔬 Профилирование уже выполняется.")
+        return
+
+    arg = (command.args or str(PROFILE_DEFAULT_SECONDS)).strip().lower()
+    try:
+        if arg.endswith("u"):
+            updates, seconds = int(arg[:-1]), PROFILE_MAX_SECONDS
+        else:
+            updates, seconds = 0, float(arg)
+    except ValueError:
+        await message.answer("Использование: /profile <секунды> или /profile <N>u")
+        return
+    if arg.endswith("u") and updates <= 0:
+        await message.answer("Количество обновлений должно быть больше нуля.")
+        return
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        await message.answer(f"Длительность — от 1 до {PROFILE_MAX_SECONDS} секунд.")
+        return
+
+    done = asyncio.Event()
+    countdown = None
+    if updates and dispatcher is not None:
+        countdown = UpdateCountdownMiddleware(updates, done.set)
+        dispatcher.update.outer_middleware(countdown)
+
+    sampler = StackSampler()
+    sampler.start()
+    _profile_task = asyncio.create_task(
+        _finish_profiling(message.bot, sampler, done, seconds, dispatcher, countdown)
+    )
+
+    limit = f"{updates} обновлений (не дольше {seconds:.0f} с)" if countdown else f"{seconds:.0f} с"
+    await message.answer(f"🔬 Профилирование запущено: {limit}.")
@@ -2,7 +2,7 @@
 """
 Обработчики для администрирования тестирования.
 """
-import io
+import asyncio
 import json
 from datetime import datetime
 from aiogram import Router, F, types
@@ -16,34 +16,64 @@ from aiogram.types import (
     KeyboardButton,
     ReplyKeyboardRemove
 )
-import pandas as pd
-from sqlalchemy import select
-from docx import Document as DocxDocument
+from sqlalchemy import case, func, select
 
+from db.importer import DEDUPE_LINK, DEDUPE_MODES, DEDUPE_NONE, DEDUPE_SKIP
 from db.models import Test, Question, Option, TestResult, User
 from db.session import async_session
+from db.snapshot import invalidate_test_snapshot
 from fsm.test import AdminTestCreation, AdminQuestionCreation, AdminTestEdit
 from config.bot_config import ADMIN_ID
 from i18n.locales import get_text
 from keyboards.reply import main_menu
-from utils.word_parser import WordTestParser
+from utils.admin_jobs import (
+    JOB_DELETE_TEST, JOB_EXPORT_RESULTS, JOB_IMPORT, download_upload, remove_upload
+)
+from utils.jobs import PRIORITY_HIGH, PRIORITY_LOW, cancel_job, enqueue_job, retry_job
+from utils.question_upload import LEGACY_EXTENSIONS, UPLOAD_EXTENSIONS, upload_error_text, validate_upload
+from utils.edit_cache import edit_text_cached
+from utils.excel_template import (
+    TEMPLATE_FILENAME, get_template, remember_file_id, template_file_id, template_stats
+)
+from utils.sampling import SAMPLING_MODES
 
 admin_testing_router = Router()
 
 logger = logging.getLogger(__name__)
 
+# Описание форматов Word (если в документе не найдено вопросов)
+WORD_FORMAT_HELP = (
+    "⚠️ В документе не найдены вопросы в требуемом формате.\n\n"
+    "📌 **Поддерживаемые форматы:**\n\n"
+    "**Формат 1 - Текстовый (рекомендуется):**\n"
+    "1. Текст вопроса [multiple] [points=2]\n"
+    "*A) Правильный вариант\n"
+    "B) Вариант 2\n"
+    "+C) Ещё один правильный\n"
+    "D) Вариант 4\n\n"
+    "Варианты: A) … Z), a) …, 1) …; правильные — «*», «+» или жирный шрифт.\n"
+    "Теги: [single], [multiple], [text], [points=N].\n\n"
+    "**Формат 2 - Таблица:**\n"
+    "Колонки: question | type | points | options\n"
+    "options: *Правильный||Неправильный"
+)
+
+# Подписи режимов выборки вопросов из банка
+SAMPLING_LABELS = {
+    None: "все вопросы",
+    "random": "случайная",
+    "topic": "по темам",
+    "points": "по баллам",
+}
+
 
 async def safe_edit(message: types.Message | None, text: str, **kwargs):
-    """Try to edit message text; ignore 'message is not modified' errors."""
+    """Try to edit message text; identical edits are skipped without an API call."""
     if message is None:
         return
     try:
-        await message.edit_text(text, **kwargs)
+        await edit_text_cached(message, text, **kwargs)
     except TelegramBadRequest as e:
-        msg = str(e)
-        if 'message is not modified' in msg:
-            logger.debug('Edit skipped (not modified) for message id %s', getattr(message, 'message_id', None))
-            return
         logger.exception('TelegramBadRequest on edit_text: %s', e)
 
 
@@ -514,6 +544,7 @@ async def save_question_with_options(message: types.Message, state: FSMContext):
                 session.add(option)
 
             await session.commit()
+            invalidate_test_snapshot(test_id)
 
         # Показываем итоговую информацию
         result_text = f"✅ Вопрос сохранён!\n\n📝 Текст вопроса:\n{q_text}\n\n📋 Варианты ответа:\n"
@@ -559,6 +590,7 @@ async def save_question_without_options(message: types.Message, state: FSMContex
             )
             session.add(question)
             await session.commit()
+            invalidate_test_snapshot(test_id)
 
         # Показываем итоговую информацию
         result_text = f"✅ Текстовый вопрос сохранён!\n\n📝 Текст вопроса:\n{q_text}\n\nℹ️ Для этого вопроса пользователь должен будет ввести текстовый ответ."
@@ -752,20 +784,30 @@ async def set_scheduled_time(message: types.Message, state: FSMContext):
     await state.set_state(AdminTestCreation.confirm)
 
 
+async def finish_upload(message: types.Message, state: FSMContext, user_id: int, lang: str):
+    """Завершить загрузку и вернуть администратора в главное меню."""
+    await state.clear()
+    await message.answer(
+        "👤 Главное меню администратора:",
+        reply_markup=main_menu(user_id, lang)
+    )
+
+
 @admin_testing_router.message(AdminTestCreation.upload_file, F.content_type.in_({"document"}))
 async def handle_upload_file(message: types.Message, state: FSMContext):
-    """Обработать загруженный файл (Excel или Word) и создать вопросы."""
+    """
+    Проверить загруженный файл (Excel, CSV, JSON Lines или Word).
+
+    На этом шаге в БД ничего не записывается: администратор получает
+    отчёт о проверке и подтверждает загрузку кнопкой.
+    """
     lang = await get_user_language(message.from_user.id)
 
     data = await state.get_data()
     created_test_id = data.get('created_test_id')
     if not created_test_id:
         await message.answer(get_text("upload_failed", lang, error="test id missing in state"))
-        await state.clear()
-        await message.answer(
-            "👤 Главное меню администратора:",
-            reply_markup=main_menu(message.from_user.id, lang)
-        )
+        await finish_upload(message, state, message.from_user.id, lang)
         return
 
     # Получаем имя файла
@@ -777,304 +819,214 @@ async def handle_upload_file(message: types.Message, state: FSMContext):
 
     file_ext = file_name.lower().split('.')[-1]
 
-    # Скачиваем файл в память
-    bio = io.BytesIO()
-    try:
-        # Правильный способ для Aiogram 3.x
-        file = await message.bot.get_file(message.document.file_id)
-        await message.bot.download_file(file.file_path, bio)
-        bio.seek(0)
-    except Exception as e:
-        await message.answer(get_text("upload_failed", lang, error=str(e)))
-        await state.clear()
+    if file_ext in LEGACY_EXTENSIONS:
+        program, version = ("Word", "Word 97-2003") if file_ext == 'doc' else ("Excel", "Excel 97-2003")
+        new_ext = LEGACY_EXTENSIONS[file_ext]
+        await message.answer(
+            f"⚠️ **Файлы формата .{file_ext} ({version}) не поддерживаются.**\n\n"
+            f"Пожалуйста, откройте файл в {program}, нажмите «Файл» → «Сохранить как» и выберите формат **.{new_ext}**.\n"
+            f"После этого загрузите полученный .{new_ext} файл."
+        )
+        await finish_upload(message, state, message.from_user.id, lang)
+        return
+    if file_ext not in UPLOAD_EXTENSIONS:
+        await message.answer(
+            f"❌ Неподдерживаемый формат файла: .{file_ext}. Разрешены .xlsx, .csv, .jsonl, .docx"
+        )
+        await finish_upload(message, state, message.from_user.id, lang)
         return
 
+    path = None
     try:
-        if file_ext in ('xlsx', 'xls'):
-            await process_excel_upload(bio, created_test_id, message, lang)
-        elif file_ext == 'docx':
-            await process_word_upload(bio, created_test_id, message, lang)
-        elif file_ext == 'doc':
-            await message.answer(
-                "⚠️ **Файлы формата .doc (Word 97-2003) не поддерживаются.**\n\n"
-                "Пожалуйста, откройте файл в Word, нажмите «Файл» → «Сохранить как» и выберите формат **.docx**.\n"
-                "После этого загрузите полученный .docx файл."
-            )
-        else:
-            await message.answer(f"❌ Неподдерживаемый формат файла: .{file_ext}. Разрешены .xlsx, .docx")
+        path = await download_upload(message.bot, message.document.file_id, file_ext)
+        count, report = await asyncio.to_thread(validate_upload, path, file_ext)
     except Exception as e:
-        await message.answer(get_text("upload_failed", lang, error=str(e)))
-    finally:
-        await state.clear()
-        await message.answer(
-            "👤 Главное меню администратора:",
-            reply_markup=main_menu(message.from_user.id, lang)
-        )
+        remove_upload(path)
+        error = upload_error_text(e, file_ext)
+        if error is None:
+            logger.exception("Upload validation failed: %s", e)
+            error = str(e)
+        await message.answer(get_text("upload_failed", lang, error=error))
+        await finish_upload(message, state, message.from_user.id, lang)
+        return
 
+    if not report.ok:
+        await message.answer_document(
+            types.BufferedInputFile(
+                report.summary(limit=None).encode('utf-8'),
+                filename=f"import_report_{created_test_id}.txt"
+            ),
+            caption="📄 Отчёт о проверке файла"
+        )
 
-async def process_excel_upload(bio: io.BytesIO, test_id: int, message: types.Message, lang: str):
-    """Обработать Excel-файл и создать вопросы."""
-    try:
-        df = pd.read_excel(bio, sheet_name='Questions')
-    except (KeyError, ValueError):
-        bio.seek(0)
-        df = pd.read_excel(bio)
-
-    # Нормализуем колонки
-    required = {'question'}
-    cols_lower = [c.lower() for c in df.columns]
-    if not required.issubset(set(cols_lower)):
-        await message.answer(get_text("upload_failed", lang, error="Отсутствует обязательная колонка 'question'"))
+    if not count:
+        if file_ext == 'docx':
+            await message.answer(WORD_FORMAT_HELP)
+        else:
+            await message.answer(get_text("upload_failed", lang, error="в файле не найдено ни одного вопроса"))
+        remove_upload(path)
+        await finish_upload(message, state, message.from_user.id, lang)
         return
 
-    try:
-        async with async_session() as session:
-            test = await session.get(Test, test_id)
-            if not test:
-                raise RuntimeError('test not found')
-
-            for idx, row in df.iterrows():
-                row_data = {c.lower(): row[c] for c in df.columns}
-                q_text = str(row_data.get('question') or row_data.get('text') or '').strip()
-                if not q_text:
-                    continue
-                q_type = str(row_data.get('type') or 'single')
-                try:
-                    points = float(row_data.get('points')) if row_data.get('points') not in (None, '') else 1.0
-                except Exception:
-                    points = 1.0
-
-                question = Question(
-                    test_id=test.id,
-                    text=q_text,
-                    question_type=q_type,
-                    points=points,
-                    order_num=idx + 1
-                )
-                session.add(question)
-                await session.flush()
-
-                options_raw = row_data.get('options') or ''
-                for opt in str(options_raw).split('||'):
-                    opt = opt.strip()
-                    if not opt:
-                        continue
-                    is_correct = False
-                    if opt.startswith('*'):
-                        is_correct = True
-                        opt_text = opt.lstrip('*').strip()
-                    else:
-                        opt_text = opt
-                    option = Option(question_id=question.id, text=opt_text, is_correct=is_correct)
-                    session.add(option)
+    await state.update_data(
+        import_file_id=message.document.file_id,
+        import_file_ext=file_ext,
+        import_file_path=path,
+        import_count=count
+    )
+    await state.set_state(AdminTestCreation.confirm_import)
 
-            await session.commit()
-        await message.answer(get_text("upload_success", lang))
-    except Exception as e:
-        await message.answer(get_text("upload_failed", lang, error=str(e)))
+    summary = report.summary(limit=5)
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"✅ Загрузить {count} вопр.", callback_data=f"confirm_import_{DEDUPE_NONE}")],
+        [InlineKeyboardButton(text="♻️ Пропустить дубликаты", callback_data=f"confirm_import_{DEDUPE_SKIP}")],
+        [InlineKeyboardButton(text="🔗 Подключить из других тестов", callback_data=f"confirm_import_{DEDUPE_LINK}")],
+        [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_import")],
+    ])
+    await message.answer(
+        f"🔎 **Проверка файла завершена**\n\n"
+        f"📊 Вопросов к загрузке: {count}\n"
+        f"❌ Ошибок (строки будут пропущены): {len(report.errors)}\n"
+        f"⚠️ Предупреждений: {len(report.warnings)}"
+        + (f"\n\n{summary}" if summary else "")
+        + "\n\nЗагрузить вопросы в тест?\n"
+        "♻️ — не сохранять вопросы, которые уже есть в тесте или повторяются в файле;\n"
+        "🔗 — то же, а одинаковые вопросы других тестов подключить без копирования.",
+        reply_markup=keyboard
+    )
 
 
-async def process_word_upload(bio: io.BytesIO, test_id: int, message: types.Message, lang: str):
+@admin_testing_router.callback_query(F.data.startswith("confirm_import_"), AdminTestCreation.confirm_import)
+async def confirm_import(callback: types.CallbackQuery, state: FSMContext):
     """
-    Обработать .docx файл с вопросами.
-    
-    Поддерживаются два формата:
-    1. Таблица с колонками: question, type, points, options
-    2. Текстовый формат:
-       N. Текст вопроса
-       A) Вариант 1
-       B) Вариант 2
-       C) Вариант 3
-       D) Вариант 4
+    Запустить загрузку проверенного файла в БД.
+
+    Загрузка выполняется фоновой задачей: пачки сохраняются вместе
+    с курсором задачи, ход загрузки редактируется в этом сообщении,
+    а после сбоя или перезапуска бота загрузка продолжается с последней
+    сохранённой пачки. Режим обработки дубликатов передаётся в callback_data.
     """
-    doc = DocxDocument(bio)
-    tables = doc.tables
-    
-    # Сначала проверяем наличие таблицы
-    if tables and len(tables) > 0:
-        # Пытаемся обработать как таблицу
-        success = await process_word_table_format(bio, test_id, message, lang, tables)
-        if success:
-            return
-    
-    # Если таблицы нет или она не в ожидаемом формате, пытаемся обработать как текстовый формат
-    await process_word_text_format(bio, test_id, message, lang)
+    lang = await get_user_language(callback.from_user.id)
 
+    if callback.from_user.id != ADMIN_ID:
+        await callback.answer(get_text("no_access", lang), show_alert=True)
+        return
 
-async def process_word_table_format(bio: io.BytesIO, test_id: int, message: types.Message, lang: str, tables) -> bool:
-    """
-    Обработать Word документ в формате таблицы.
-    
-    Returns:
-        True если успешно обработано, False если таблица не в ожидаемом формате
-    """
-    table = tables[0]
-    if len(table.rows) < 2:
-        return False
-
-    # Извлекаем заголовки из первой строки
-    headers = [cell.text.strip().lower() for cell in table.rows[0].cells]
-    required = {'question'}
-    if not required.issubset(set(headers)):
-        return False
-
-    # Преобразуем строки таблицы в список словарей
-    rows_data = []
-    for row in table.rows[1:]:  # пропускаем заголовок
-        cells = [cell.text.strip() for cell in row.cells]
-        if not any(cells):  # пустая строка
-            continue
-        row_dict = {}
-        for i in range(min(len(headers), len(cells))):
-            row_dict[headers[i]] = cells[i]
-        rows_data.append(row_dict)
-
-    if not rows_data:
-        return False
+    dedupe = callback.data[len("confirm_import_"):]
+    if dedupe not in DEDUPE_MODES:
+        await callback.answer()
+        return
 
-    async with async_session() as session:
-        test = await session.get(Test, test_id)
-        if not test:
-            raise RuntimeError('test not found')
-
-        for idx, row_data in enumerate(rows_data):
-            q_text = row_data.get('question', '').strip()
-            if not q_text:
-                continue
-            q_type = row_data.get('type', 'single').strip()
-            try:
-                points = float(row_data.get('points', '1'))
-            except ValueError:
-                points = 1.0
+    data = await state.get_data()
+    await callback.answer()
+    await safe_edit(callback.message, "⏳ Загрузка вопросов…")
 
-            question = Question(
-                test_id=test.id,
-                text=q_text,
-                question_type=q_type,
-                points=points,
-                order_num=idx + 1
-            )
-            session.add(question)
-            await session.flush()
+    await enqueue_job(
+        JOB_IMPORT,
+        {
+            'test_id': data['created_test_id'],
+            'file_id': data['import_file_id'],
+            'file_ext': data['import_file_ext'],
+            'path': data.get('import_file_path'),
+            'dedupe': dedupe,
+            'lang': lang or 'ru',
+        },
+        total=data.get('import_count'),
+        chat_id=callback.message.chat.id,
+        message_id=callback.message.message_id
+    )
+    await finish_upload(callback.message, state, callback.from_user.id, lang)
 
-            options_raw = row_data.get('options', '')
-            for opt in options_raw.split('||'):
-                opt = opt.strip()
-                if not opt:
-                    continue
-                is_correct = False
-                opt_text = opt
-                if opt.startswith('*'):
-                    is_correct = True
-                    opt_text = opt.lstrip('*').strip()
-                option = Option(question_id=question.id, text=opt_text, is_correct=is_correct)
-                session.add(option)
 
-        await session.commit()
-    
-    await message.answer(get_text("upload_success", lang))
-    return True
+@admin_testing_router.callback_query(F.data == "cancel_import", AdminTestCreation.confirm_import)
+async def cancel_import(callback: types.CallbackQuery, state: FSMContext):
+    """Отменить загрузку проверенного файла."""
+    lang = await get_user_language(callback.from_user.id)
 
+    data = await state.get_data()
+    remove_upload(data.get('import_file_path'))
+    await safe_edit(
+        callback.message,
+        "❌ Загрузка отменена, вопросы не сохранены.\n"
+        "Тест создан без вопросов — их можно добавить через «📝 Добавить вопросы»."
+    )
+    await callback.answer()
+    await finish_upload(callback.message, state, callback.from_user.id, lang)
 
-async def process_word_text_format(bio: io.BytesIO, test_id: int, message: types.Message, lang: str):
-    """
-    Обработать Word документ в текстовом формате.
-    
-    Формат:
-    N. Текст вопроса
-    A) Вариант ответа
-    B) Вариант ответа
-    C) Вариант ответа
-    D) Вариант ответа
-    """
-    try:
-        # Используем WordTestParser для парсинга
-        bio.seek(0)
-        parser = WordTestParser(bio)
-        questions = parser.parse()
-        
-        if not questions:
-            await message.answer(
-                "⚠️ В документе не найдены вопросы в требуемом формате.\n\n"
-                "📌 **Поддерживаемые форматы:**\n\n"
-                "**Формат 1 - Текстовый (рекомендуется):**\n"
-                "1. Текст вопроса\n"
-                "A) Вариант 1\n"
-                "B) Вариант 2\n"
-                "C) Вариант 3\n"
-                "D) Вариант 4\n\n"
-                "**Формат 2 - Таблица:**\n"
-                "Колонки: question | type | points | options\n"
-                "options: *Правильный||Неправильный"
-            )
-            return
-        
-        # Сохраняем вопросы в БД
-        async with async_session() as session:
-            test = await session.get(Test, test_id)
-            if not test:
-                raise RuntimeError('test not found')
-
-            for idx, q in enumerate(questions):
-                question = Question(
-                    test_id=test.id,
-                    text=q['text'],
-                    question_type=q['type'],
-                    points=q['points'],
-                    order_num=q['order_num'] if 'order_num' in q else idx + 1
-                )
-                session.add(question)
-                await session.flush()
-
-                # Добавляем варианты ответов
-                for opt in q['options']:
-                    option = Option(
-                        question_id=question.id,
-                        text=opt['text'],
-                        is_correct=opt['is_correct']
-                    )
-                    session.add(option)
 
-            await session.commit()
+@admin_testing_router.callback_query(F.data.startswith("resume_job_"))
+async def resume_import_job(callback: types.CallbackQuery):
+    """Повторить задачу, завершившуюся ошибкой (загрузка продолжится с последней пачки)."""
+    lang = await get_user_language(callback.from_user.id)
 
-        await message.answer(
-            f"✅ **Тест успешно загружен!**\n\n"
-            f"📊 Загружено вопросов: {len(questions)}"
-        )
-        
-    except Exception as e:
-        logger.exception("Error processing word text format: %s", e)
-        await message.answer(
-            f"⚠️ Ошибка при обработке документа: {str(e)}\n\n"
-            "Пожалуйста, проверьте формат файла и попробуйте снова."
-        )
+    if callback.from_user.id != ADMIN_ID:
+        await callback.answer(get_text("no_access", lang), show_alert=True)
+        return
+
+    job_id = int(callback.data.split("_")[-1])
+    if await retry_job(job_id):
+        await callback.answer("🔁 Задача снова в очереди")
+    else:
+        await callback.answer("Задача уже выполняется или завершена", show_alert=True)
+
+
+@admin_testing_router.callback_query(F.data.startswith("cancel_job_"))
+async def cancel_import_job(callback: types.CallbackQuery):
+    """Отменить задачу; сохранённый ею прогресс (например, вопросы) остаётся."""
+    lang = await get_user_language(callback.from_user.id)
+
+    if callback.from_user.id != ADMIN_ID:
+        await callback.answer(get_text("no_access", lang), show_alert=True)
+        return
+
+    job = await cancel_job(int(callback.data.split("_")[-1]))
+    if job is None:
+        await callback.answer("Задача уже завершена", show_alert=True)
+        return
+    if job.kind == JOB_IMPORT:
+        text = f"✖️ Загрузка отменена. Сохранено записей: {job.cursor}" + (f" из {job.total}" if job.total else "")
+    else:
+        text = f"✖️ Задача #{job.id} отменена"
+    await safe_edit(callback.message, text)
+    await callback.answer()
 
 
 @admin_testing_router.callback_query(F.data == "download_excel_template")
 async def download_excel_template(callback: types.CallbackQuery):
-    """Отправить шаблон Excel для загрузки теста."""
-    lang = await get_user_language(callback.from_user.id)
+    """
+    Отправить шаблон Excel для загрузки теста.
 
-    # Создаём DataFrame шаблона
-    df = pd.DataFrame([
-        {
-            'question': 'Пример вопроса',
-            'type': 'single',
-            'points': 1,
-            'options': "*Правильный вариант||Неправильный вариант"
-        }
-    ])
+    Файл одинаков для всех языков (различается только подпись), строится
+    один раз и после первой отправки пересылается по file_id.
+    """
+    lang = await get_user_language(callback.from_user.id)
+    caption = get_text('download_template', lang)
 
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Questions', index=False)
-    output.seek(0)
+    content, content_hash = await get_template()
+    file_id = template_file_id(content_hash)
+    if file_id:
+        try:
+            await callback.message.bot.send_document(
+                chat_id=callback.from_user.id,
+                document=file_id,
+                caption=caption
+            )
+            template_stats["reused"] += 1
+            await callback.answer()
+            return
+        except TelegramBadRequest as e:
+            # file_id устарел — отправим файл заново
+            logger.warning("Cannot resend template by file_id: %s", e)
+            remember_file_id(content_hash, None)
 
-    await callback.message.bot.send_document(
+    sent = await callback.message.bot.send_document(
         chat_id=callback.from_user.id,
-        document=types.BufferedInputFile(file=output.read(), filename='template_questions.xlsx'),
-        caption=get_text('download_template', lang)
+        document=types.BufferedInputFile(file=content, filename=TEMPLATE_FILENAME),
+        caption=caption
     )
+    template_stats["uploads"] += 1
+    if sent.document:
+        remember_file_id(content_hash, sent.document.file_id)
 
     await callback.answer()
 
@@ -1121,7 +1073,13 @@ async def confirm_test_creation(callback: types.CallbackQuery, state: FSMContext
                 "- points (баллы)\n"
                 "- options (варианты через '||', правильный — со '*')\n\n"
                 "Пример строки таблицы:\n"
-                "| Какой язык? | single | 1 | *Python||Java||C++ |"
+                "| Какой язык? | single | 1 | *Python||Java||C++ |\n\n"
+                "Или текстом:\n"
+                "1. Какой язык? [points=2]\n"
+                "*A) Python\n"
+                "B) Java\n"
+                "Правильные варианты — «*», «+» или жирный шрифт; "
+                "теги [multiple], [text], [points=N]."
             )
             await safe_edit(callback.message, msg)
         else:
@@ -1231,6 +1189,8 @@ async def edit_test_menu(callback: types.CallbackQuery):
         [InlineKeyboardButton(text="✏️ Редактировать название", callback_data=f"edit_test_title_{test_id}")],
         [InlineKeyboardButton(text="✏️ Редактировать описание", callback_data=f"edit_test_description_{test_id}")],
         [InlineKeyboardButton(text="🔁 Включить/выключить", callback_data=f"toggle_test_active_{test_id}")],
+        [InlineKeyboardButton(text="🔀 Перемешивание вкл/выкл", callback_data=f"toggle_test_shuffle_{test_id}")],
+        [InlineKeyboardButton(text="🎲 Режим выборки вопросов", callback_data=f"cycle_test_sampling_{test_id}")],
         [InlineKeyboardButton(text="🗑 Удалить тест", callback_data=f"delete_test_{test_id}")],
         [InlineKeyboardButton(text="📝 Добавить вопросы", callback_data=f"add_to_test_{test_id}")],
         [InlineKeyboardButton(text=get_text("btn_back", lang), callback_data="list_all_tests")]
@@ -1242,6 +1202,8 @@ async def edit_test_menu(callback: types.CallbackQuery):
         f"• Описание: {test.description or 'нет'}\n"
         f"• Вопросов (ожидается): {test.total_questions}\n"
         f"• Активен: {'Да' if test.is_active else 'Нет'}\n"
+        f"• Перемешивание: {'Да' if test.shuffle else 'Нет'}\n"
+        f"• Выборка из банка: {SAMPLING_LABELS[test.sampling]}\n"
     )
 
     await safe_edit(callback.message, text, reply_markup=keyboard, parse_mode="HTML")
@@ -1268,6 +1230,53 @@ async def toggle_test_active(callback: types.CallbackQuery):
     await safe_edit(callback.message, f"Статус теста обновлён. Активен: {'Да' if test.is_active else 'Нет'}")
 
 
+@admin_testing_router.callback_query(F.data.startswith("toggle_test_shuffle_"))
+async def toggle_test_shuffle(callback: types.CallbackQuery):
+    """Включить/выключить перемешивание вопросов и вариантов ответа."""
+    if callback.from_user.id != ADMIN_ID:
+        await callback.answer("⛔ Нет доступа", show_alert=True)
+        return
+
+    test_id = int(callback.data.split("_")[-1])
+    async with async_session() as session:
+        test = await session.get(Test, test_id)
+        if not test:
+            await callback.answer("Тест не найден", show_alert=True)
+            return
+        test.shuffle = not bool(test.shuffle)
+        session.add(test)
+        await session.commit()
+
+    await callback.answer("Статус изменён")
+    await safe_edit(callback.message, f"Перемешивание вопросов обновлено. Включено: {'Да' if test.shuffle else 'Нет'}")
+
+
+@admin_testing_router.callback_query(F.data.startswith("cycle_test_sampling_"))
+async def cycle_test_sampling(callback: types.CallbackQuery):
+    """Переключить режим выборки вопросов из банка."""
+    if callback.from_user.id != ADMIN_ID:
+        await callback.answer("⛔ Нет доступа", show_alert=True)
+        return
+
+    test_id = int(callback.data.split("_")[-1])
+    async with async_session() as session:
+        test = await session.get(Test, test_id)
+        if not test:
+            await callback.answer("Тест не найден", show_alert=True)
+            return
+        current = SAMPLING_MODES.index(test.sampling) if test.sampling in SAMPLING_MODES else 0
+        test.sampling = SAMPLING_MODES[(current + 1) % len(SAMPLING_MODES)]
+        session.add(test)
+        await session.commit()
+
+    await callback.answer("Статус изменён")
+    await safe_edit(
+        callback.message,
+        f"Режим выборки обновлён: {SAMPLING_LABELS[test.sampling]}\n"
+        f"Вопросов в попытке: {test.total_questions}"
+    )
+
+
 @admin_testing_router.callback_query(F.data.startswith("delete_test_"))
 async def delete_test(callback: types.CallbackQuery):
     lang = await get_user_language(callback.from_user.id)
@@ -1283,25 +1292,16 @@ async def delete_test(callback: types.CallbackQuery):
             await callback.answer("Тест не найден", show_alert=True)
             return
 
-        # Удаляем вопросы, варианты и результаты вручную
-        questions_result = await session.execute(select(Question).where(Question.test_id == test_id))
-        questions = questions_result.scalars().all()
-        for q in questions:
-            opts_result = await session.execute(select(Option).where(Option.question_id == q.id))
-            opts = opts_result.scalars().all()
-            for o in opts:
-                await session.delete(o)
-            await session.delete(q)
-
-        results_result = await session.execute(select(TestResult).where(TestResult.test_id == test_id))
-        results = results_result.scalars().all()
-        for r in results:
-            await session.delete(r)
-
-        await session.delete(test)
-        await session.commit()
+    # Удаление выполняется очередью задач, итог придёт в это сообщение
+    job_id = await enqueue_job(
+        JOB_DELETE_TEST,
+        {'test_id': test_id},
+        priority=PRIORITY_LOW,
+        chat_id=callback.message.chat.id,
+        message_id=callback.message.message_id
+    )
 
-    await safe_edit(callback.message, "🗑 Тест удалён")
+    await safe_edit(callback.message, f"⏳ Удаление теста поставлено в очередь (задача #{job_id})")
     await callback.message.answer(
         "👤 Главное меню администратора:",
         reply_markup=main_menu(callback.from_user.id, lang)
@@ -1343,6 +1343,7 @@ async def handle_edit_title(message: types.Message, state: FSMContext):
         test.title = new_title
         session.add(test)
         await session.commit()
+        invalidate_test_snapshot(test_id)
 
     await message.answer(f"✅ Название теста обновлено: {new_title}")
     await state.clear()
@@ -1404,28 +1405,29 @@ async def show_test_statistics(callback: types.CallbackQuery):
     test_id = int(parts[-1])
     
     async with async_session() as session:
-        results_result = await session.execute(
-            select(TestResult).where(TestResult.test_id == test_id)
-        )
-        results = results_result.scalars().all()
+        # Агрегаты считает БД, строки результатов не загружаются
+        attempts, completed, avg_score = (await session.execute(
+            select(
+                func.count(TestResult.id),
+                func.count(TestResult.completed_at),
+                func.avg(case((TestResult.completed_at.isnot(None), TestResult.score)))
+            ).where(TestResult.test_id == test_id)
+        )).one()
         
         test_result = await session.execute(
             select(Test).where(Test.id == test_id)
         )
         test = test_result.scalar_one_or_none()
         
-        if not results:
+        if not attempts:
             await callback.answer(get_text("no_results_for_test", lang), show_alert=True)
             return
         
-        completed = [r for r in results if r.completed_at]
-        avg_score = sum(r.score for r in completed) / len(completed) if completed else 0
-        
         text = (
             f"📊 Статистика теста: {test.title}\n\n"
-            f"• Всего попыток: {len(results)}\n"
-            f"• Завершено: {len(completed)}\n"
-            f"• Средний балл: {avg_score:.1f}\n\n"
+            f"• Всего попыток: {attempts}\n"
+            f"• Завершено: {completed}\n"
+            f"• Средний балл: {avg_score or 0:.1f}\n\n"
             f"Действия:"
         )
         
@@ -1441,58 +1443,16 @@ async def show_test_statistics(callback: types.CallbackQuery):
 
 @admin_testing_router.callback_query(F.data.startswith("export_test_"))
 async def export_test_results(callback: types.CallbackQuery):
-    """Экспортировать результаты теста в Excel."""
+    """Поставить в очередь экспорт результатов теста в Excel."""
     lang = await get_user_language(callback.from_user.id)
 
     test_id = int(callback.data.split("_")[2])
-    
-    async with async_session() as session:
-        query = select(
-            TestResult,
-            User.name,
-            User.phone
-        ).join(
-            User, TestResult.user_id == User.id
-        ).where(
-            TestResult.test_id == test_id
-        )
-        
-        results = await session.execute(query)
-        rows = results.all()
-        
-        if not rows:
-            await callback.answer(get_text("no_data_export", lang), show_alert=True)
-            return
-        
-        data = []
-        for result, name, phone in rows:
-            data.append({
-                'ID': result.id,
-                'ФИО': name,
-                'Телефон': phone,
-                'Баллы': result.score,
-                'Макс. балл': result.max_score,
-                'Процент': (result.score / result.max_score * 100) if result.max_score > 0 else 0,
-                'Начало': result.started_at.strftime("%d.%m.%Y %H:%M") if result.started_at else '',
-                'Завершение': result.completed_at.strftime("%d.%m.%Y %H:%M") if result.completed_at else '',
-                'Статус': 'Завершено' if result.completed_at else 'В процессе'
-            })
-        
-        df = pd.DataFrame(data)
-        
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Результаты', index=False)
-        
-        output.seek(0)
-        
-        await callback.message.bot.send_document(
-            chat_id=callback.from_user.id,
-            document=types.BufferedInputFile(
-                file=output.read(),
-                filename=f"results_test_{test_id}.xlsx"
-            ),
-            caption=get_text("export_caption", lang, test_id=test_id)
-        )
-    
-    await callback.answer()
+
+    # Файл формируется очередью задач и придёт отдельным сообщением
+    await enqueue_job(
+        JOB_EXPORT_RESULTS,
+        {'test_id': test_id, 'lang': lang or 'ru'},
+        priority=PRIORITY_HIGH,
+        chat_id=callback.from_user.id
+    )
+    await callback.answer("⏳ Экспорт поставлен в очередь")
@@ -11,7 +11,7 @@ from sqlalchemy import select
 from db.models import User
 from db.session import async_session
 from fsm.auth import Auth
-from i18n.locales import get_text
+from i18n.locales import get_action, get_text
 from keyboards.reply import main_menu
 
 auth_router = Router()
@@ -37,7 +37,7 @@ async def get_user_language(user_id: int) -> str:
 
 @auth_router.message(Command("login"))
 @auth_router.message(
-    F.text.in_(["Авторизация", "Authorization", "Kirish"])
+    F.text.func(get_action) == "btn_auth"
 )
 async def start_auth(message: types.Message, state: FSMContext) -> None:
     """
@@ -99,9 +99,7 @@ async def process_phone_contact(
         await process_phone_number(message, state, phone, lang)
 
 
-@auth_router.message(Auth.phone, F.text == "✏️ Ввести вручную")
-@auth_router.message(Auth.phone, F.text == "✏️ Enter manually")
-@auth_router.message(Auth.phone, F.text == "✏️ Qo'lda kiritish")
+@auth_router.message(Auth.phone, F.text.func(get_action) == "enter_manual_btn")
 async def request_manual_phone(
     message: types.Message,
     state: FSMContext
@@ -200,7 +198,7 @@ async def process_phone_number(
 
 
 @auth_router.message(Command("logout"))
-@auth_router.message(F.text.in_(["Выход", "Logout", "Chiqish"]))
+@auth_router.message(F.text.func(get_action) == "btn_logout")
 async def logout(message: types.Message) -> None:
     """
     Выйти из системы (деактивировать пользователя).
@@ -11,7 +11,7 @@ from db.models import User
 from db.session import async_session
 from fsm.registration import Registration
 from config.bot_config import ADMIN_ID
-from i18n.locales import get_text
+from i18n.locales import get_action, get_text
 from keyboards.reply import main_menu  # Добавляем импорт
 
 registration_router = Router()
@@ -31,7 +31,7 @@ async def get_user_language(user_id: int) -> str:
 
 
 @registration_router.message(
-    F.text.in_(["Регистрация", "Registration", "Ro'yxatdan o'tish"])
+    F.text.func(get_action) == "btn_registration"
 )
 async def start_registration(message: types.Message, state: FSMContext) -> None:
     """
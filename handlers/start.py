@@ -9,7 +9,8 @@ from sqlalchemy import select
 from keyboards.reply import main_menu, language_keyboard
 from db.models import User
 from db.session import async_session
-from i18n.locales import get_text
+from i18n.locales import get_action, get_text
+from utils.edit_cache import edit_text_cached
 
 start_router = Router()
 
@@ -62,7 +63,7 @@ async def cmd_start(message: types.Message) -> None:
     )
 
 
-@start_router.message(F.text.in_(["Старт", "Start", "Boshlash"]))
+@start_router.message(F.text.func(get_action) == "btn_start")
 async def start_button_handler(message: types.Message) -> None:
     """
     Обработчик кнопки 'Старт' на разных языках.
@@ -90,7 +91,7 @@ async def start_button_handler(message: types.Message) -> None:
     )
 
 
-@start_router.message(F.text.in_(["🌐 Язык", "🌐 Language", "🌐 Til"]))
+@start_router.message(F.text.func(get_action) == "btn_language")
 async def language_menu(message: types.Message) -> None:
     """
     Обработчик выбора языка.
@@ -134,7 +135,7 @@ async def set_language(callback: types.CallbackQuery) -> None:
             session.add(new_user)
             await session.commit()
     
-    await callback.message.edit_text(get_text("language_changed", new_lang))
+    await edit_text_cached(callback.message, get_text("language_changed", new_lang))
     await callback.message.answer(
         get_text("welcome", new_lang),
         reply_markup=main_menu(callback.from_user.id, new_lang)
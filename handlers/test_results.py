@@ -9,7 +9,8 @@ from datetime import timedelta
 
 from db.models import User, TestResult, Test
 from db.session import async_session
-from i18n.locales import get_text
+from i18n.locales import get_action, get_text
+from utils.edit_cache import edit_text_cached
 
 results_router = Router()
 
@@ -25,7 +26,7 @@ async def get_user_language(user_id: int) -> str:
 
 
 @results_router.message(
-    F.text.in_(["📊 Мои результаты", "📊 My Results", "📊 Mening natijalarim"])
+    F.text.func(get_action) == "btn_my_results"
 )
 async def show_my_results(message: types.Message) -> None:
     """
@@ -162,7 +163,8 @@ async def view_result_detail(callback: types.CallbackQuery) -> None:
             ]
         ])
         
-        await callback.message.edit_text(
+        await edit_text_cached(
+            callback.message,
             text,
             reply_markup=keyboard,
             parse_mode="HTML"
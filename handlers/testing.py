@@ -6,24 +6,32 @@ import asyncio
 import json
 import logging
 from datetime import datetime
+from typing import NamedTuple, Optional, Set
 from aiogram import Router, F, types, Bot
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from sqlalchemy import select, and_
-from sqlalchemy.orm import selectinload
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy import select, update, and_
 
-from db.models import User, Test, Question, Option, TestResult
-from db.session import async_session
+from db.models import User, Test, TestResult
+from db.session import async_session, engine
+from db.snapshot import get_test_snapshot
 from fsm.test import Testing
-from i18n.locales import get_text
+from fsm.session import TestSession
+from utils.shuffle import new_seed, shuffled_order
+from utils.sampling import pack_ids, unpack_ids
+from i18n.locales import get_action, get_text
+from keyboards.question import get_question_view, render_question, prefetch_question_views
+from utils.edit_cache import edit_text_cached, remember_render
 from config.bot_config import ADMIN_ID
 
 testing_router = Router()
 
 logger = logging.getLogger(__name__)
 
+# Запущенные таймеры тестов (ссылки не дают сборщику мусора удалить задачи)
+timer_tasks: Set[asyncio.Task] = set()
+
 
 async def get_user_language(user_id: int) -> str:
     """Получить язык пользователя."""
@@ -106,6 +114,16 @@ async def start_test(callback: types.CallbackQuery, state: FSMContext):
             )
             return
         
+        # Получаем снимок теста
+        snapshot = await get_test_snapshot(test_id)
+        
+        if not snapshot or not snapshot.questions:
+            await callback.answer(
+                "В тесте пока нет вопросов",
+                show_alert=True
+            )
+            return
+        
         # Создаем или получаем существующий результат
         result_in_progress = await session.execute(
             select(TestResult).where(
@@ -123,49 +141,53 @@ async def start_test(callback: types.CallbackQuery, state: FSMContext):
                 user_id=user.id,
                 test_id=test_id,
                 max_score=test.max_score,
-                started_at=now
+                started_at=now,
+                shuffle_seed=new_seed() if test.shuffle else None
             )
+            
+            # Для банка вопросов выбираем total_questions вопросов на попытку
+            if test.sampling and test.total_questions and test.total_questions < len(snapshot.questions):
+                sampled_ids = snapshot.sample_ids(
+                    test.total_questions,
+                    test_result_obj.shuffle_seed or new_seed(),
+                    test.sampling
+                )
+                test_result_obj.question_ids = pack_ids(sampled_ids)
+            
             session.add(test_result_obj)
             await session.commit()
             await session.refresh(test_result_obj)
         
-        # Получаем вопросы теста
-        questions_result = await session.execute(
-            select(Question).where(
-                Question.test_id == test_id
-            ).order_by(Question.order_num)
-        )
-        questions = questions_result.scalars().all()
+        # Порядок вопросов определяется выборкой и зерном попытки
+        seed = test_result_obj.shuffle_seed or 0
+        question_ids = unpack_ids(test_result_obj.question_ids) or [q.id for q in snapshot.questions]
+        if seed:
+            question_ids = shuffled_order(question_ids, seed)
         
-        if not questions:
-            await callback.answer(
-                "В тесте пока нет вопросов",
-                show_alert=True
-            )
-            return
-        
-        # Сохраняем данные в state
-        await state.update_data(
-            test_id=test_id,
-            test_result_id=test_result_obj.id,
-            current_question=0,
-            questions=[q.id for q in questions],
-            answers={},
-            start_time=now.isoformat(),
-            time_limit=test.time_limit
-        )
+        # Сохраняем попытку в state
+        test_session = TestSession.start(test_id, test_result_obj.id, question_ids, seed)
+        await state.set_state(Testing.waiting_for_answer)
+        await state.update_data(**test_session.dump())
         
         # Запускаем таймер, если есть ограничение по времени
         if test.time_limit:
-            asyncio.create_task(test_timer(callback.from_user.id, state, test.time_limit, callback.message.chat.id, callback.message.bot))
+            timer_task = asyncio.create_task(test_timer(
+                callback.from_user.id,
+                state,
+                test.time_limit,
+                callback.message.chat.id,
+                callback.message.bot,
+                test_result_obj.id
+            ))
+            timer_tasks.add(timer_task)
+            timer_task.add_done_callback(timer_tasks.discard)
         
-        await state.set_state(Testing.waiting_for_answer)
-        await show_question(callback.message, state, lang)
+        await show_question(callback.message, state, lang, test_session)
     
     await callback.answer()
 
 
-@testing_router.message(F.text.in_(["Тесты", "Tests", "Testlar"]))
+@testing_router.message(F.text.func(get_action) == "btn_tests")
 async def list_available_tests(message: types.Message) -> None:
     """Показать список доступных тестов для пользователя."""
     lang = await get_user_language(message.from_user.id)
@@ -192,7 +214,7 @@ async def list_available_tests(message: types.Message) -> None:
     await message.answer(get_text("available_tests", lang), reply_markup=keyboard)
 
 
-@testing_router.message(F.text.in_(["Мои тесты", "My Tests", "Mening testlarim"]))
+@testing_router.message(F.text.func(get_action) == "btn_my_tests")
 async def list_my_tests(message: types.Message) -> None:
     """Показать список доступных (не пройденных) тестов для пользователя."""
     lang = await get_user_language(message.from_user.id)
@@ -246,27 +268,31 @@ async def navigate_question(callback: types.CallbackQuery, state: FSMContext):
         callback: Callback-запрос
         state: FSM контекст
     """
-    data = await state.get_data()
-    current_idx = data.get('current_question', 0)
-    questions = data.get('questions', [])
+    test_session = TestSession.load(await state.get_data())
 
-    if not questions:
+    if not test_session or not test_session.total:
         await callback.answer("Вопросы не найдены.", show_alert=True)
         return
 
     direction = callback.data.split("_")[-1]
 
     if direction == "next":
-        current_idx = min(current_idx + 1, len(questions) - 1)
+        test_session.current = min(test_session.current + 1, test_session.total - 1)
     elif direction == "prev":
-        current_idx = max(current_idx - 1, 0)
+        test_session.current = max(test_session.current - 1, 0)
 
-    await state.update_data(current_question=current_idx)
-    await show_question(callback.message, state)
+    await state.update_data(**test_session.dump())
+    lang = await get_user_language(callback.from_user.id)
+    await show_question(callback.message, state, lang, test_session)
     await callback.answer()
 
 
-async def show_question(message: types.Message, state: FSMContext, lang: str = "ru"):
+async def show_question(
+    message: types.Message,
+    state: FSMContext,
+    lang: str = "ru",
+    test_session: Optional[TestSession] = None
+):
     """
     Показать текущий вопрос.
     
@@ -274,134 +300,93 @@ async def show_question(message: types.Message, state: FSMContext, lang: str = "
         message: Сообщение
         state: FSM контекст
         lang: Язык интерфейса
+        test_session: Текущая попытка (если уже загружена из state)
     """
     if message is None:
         logger.error("Message is None in show_question")
         return
         
-    data = await state.get_data()
-    current_idx = data.get('current_question', 0)
-    questions = data.get('questions', [])
+    if test_session is None:
+        test_session = TestSession.load(await state.get_data())
+        if test_session is None:
+            logger.error("No test session in state")
+            return
+
+    question_id = test_session.current_question_id
     
-    if current_idx >= len(questions):
-        logger.error("Question index %s out of range %s", current_idx, len(questions))
-        await complete_test(message, state, lang)
+    if question_id is None:
+        logger.error("Question index %s out of range %s", test_session.current, test_session.total)
+        await complete_test(message, state, lang, test_session)
         return
-        
-    question_id = questions[current_idx]
-    answers = data.get('answers', {})
-    selected_for_q = answers.get(str(question_id), [])
 
-    async with async_session() as session:
+    try:
+        view = await get_question_view(question_id, lang)
+        if view is None:
+            logger.error("Question %s not found", question_id)
+            await message.answer("Ошибка: вопрос не найден.")
+            return
+
+        if not view.option_ids and view.question_type != 'text':
+            logger.warning("Question %s has no options", question_id)
+
+        text, markup, render_key = render_question(
+            view,
+            test_session.current,
+            test_session.total,
+            test_session.masks[test_session.current],
+            lang,
+            test_session.seed
+        )
+
+        # Пока студент отвечает, загружаем соседние вопросы
+        order = test_session.order
+        prefetch_question_views((
+            order[i] for i in (test_session.current + 1, test_session.current - 1)
+            if 0 <= i < len(order)
+        ), lang)
+
         try:
-            question_result = await session.execute(
-                select(Question)
-                .options(selectinload(Question.options))
-                .where(Question.id == question_id)
+            await edit_text_cached(
+                message, text, reply_markup=markup, fingerprint=render_key, parse_mode="HTML"
             )
-            question = question_result.scalar_one_or_none()
+        except TelegramBadRequest as e:
+            msg = str(e).lower()
+            if 'message to edit not found' in msg or 'message can\'t be edited' in msg:
+                sent = await message.answer(text, reply_markup=markup, parse_mode="HTML")
+                remember_render(sent.chat.id, sent.message_id, render_key)
+            else:
+                logger.exception('TelegramBadRequest while editing question %s', question_id)
+        except OSError as e:
+            logger.exception("OS error in show_question: %s", e)
 
-            if not question:
-                logger.error("Question %s not found", question_id)
-                await message.answer("Ошибка: вопрос не найден.")
-                return
+    except Exception as e:
+        logger.exception("Error in show_question: %s", e)
+        await message.answer("Произошла ошибка при загрузке вопроса.")
 
-            options = question.options
 
-            if not options and question.question_type != 'text':
-                logger.warning("Question %s has no options", question_id)
+async def go_to_next_question(
+    message: types.Message,
+    state: FSMContext,
+    test_session: TestSession,
+    lang: str = "ru"
+):
+    """
+    Перейти к следующему вопросу или завершить тест после последнего.
 
-            keyboard = []
-            
-            if question.question_type == 'text':
-                # Для текстовых вопросов
-                text = f"❓ <b>Вопрос {current_idx + 1} из {len(questions)}</b>\n\n"
-                text += f"{question.text}\n\n"
-                text += "✍️ <i>Введите ваш ответ текстом</i>"
-                
-                keyboard.append([
-                    InlineKeyboardButton(
-                        text="⏭ Пропустить",
-                        callback_data=f"skip_{question_id}"
-                    )
-                ])
-            else:
-                # Для вопросов с вариантами ответов
-                for i, option in enumerate(options, 1):
-                    prefix = "✅ " if option.id in selected_for_q else ""
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            text=f"{prefix}{i}. {option.text[:100]}",
-                            callback_data=f"answer_{question_id}_{option.id}"
-                        )
-                    ])
-
-                keyboard.append([
-                    InlineKeyboardButton(
-                        text="⏭ Пропустить",
-                        callback_data=f"skip_{question_id}"
-                    )
-                ])
-
-                if question.question_type == 'multiple':
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            text="✅ Готово",
-                            callback_data=f"finish_{question_id}"
-                        )
-                    ])
-
-                text = f"❓ <b>Вопрос {current_idx + 1} из {len(questions)}</b>\n\n"
-                text += f"{question.text}\n\n"
-
-                # Обновляем текстовые метки типов вопросов
-                if question.question_type == 'single':
-                    text += "📝 <i>(Несколько вариантов один ответ)</i>"
-                elif question.question_type == 'multiple':
-                    text += "📝 <i>(Несколько вариантов два ответа)</i>"
-
-            # Добавляем кнопки "Назад" и "Вперёд"
-            navigation_buttons = []
-            if current_idx > 0:
-                navigation_buttons.append(InlineKeyboardButton(
-                    text="⬅️ Назад",
-                    callback_data="navigate_prev"
-                ))
-            if current_idx < len(questions) - 1:
-                navigation_buttons.append(InlineKeyboardButton(
-                    text="Вперёд ➡️",
-                    callback_data="navigate_next"
-                ))
-            if navigation_buttons:
-                keyboard.append(navigation_buttons)
-
-            try:
-                await message.edit_text(
-                    text,
-                    reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
-                    parse_mode="HTML"
-                )
-            except TelegramBadRequest as e:
-                msg = str(e).lower()
-                if 'message is not modified' in msg:
-                    logger.debug('Edit skipped: message not modified for question %s', question_id)
-                elif 'message to edit not found' in msg or 'message can\'t be edited' in msg:
-                    await message.answer(
-                        text,
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
-                        parse_mode="HTML"
-                    )
-                else:
-                    logger.exception('TelegramBadRequest while editing question %s', question_id)
-            except OSError as e:
-                logger.exception("OS error in show_question: %s", e)
-                
-        except NoResultFound:
-            logger.error("Question with ID %s not found in the database.", question_id)
-            await message.answer("Ошибка: вопрос не найден.")
-        except Exception as e:
-            logger.exception("Error in show_question: %s", e)
-            await message.answer("Произошла ошибка при загрузке вопроса.")
+    Состояние попытки сохраняется одним вызовом update_data.
+
+    Args:
+        message: Сообщение с вопросом
+        state: FSM контекст
+        test_session: Текущая попытка
+        lang: Язык интерфейса
+    """
+    if test_session.current + 1 < test_session.total:
+        test_session.current += 1
+        await state.update_data(**test_session.dump())
+        await show_question(message, state, lang, test_session)
+    else:
+        await complete_test(message, state, lang, test_session)
 
 
 @testing_router.message(Testing.waiting_for_answer, F.text)
@@ -415,39 +400,29 @@ async def process_text_answer(message: types.Message, state: FSMContext):
     """
     lang = await get_user_language(message.from_user.id)
     
-    data = await state.get_data()
-    current_idx = data.get('current_question', 0)
-    questions = data.get('questions', [])
+    test_session = TestSession.load(await state.get_data())
+    if test_session is None:
+        return
+
+    question_id = test_session.current_question_id
+    if question_id is None:
+        return
+    
+    snapshot = await get_test_snapshot(test_session.test_id)
+    meta = snapshot.by_id.get(question_id) if snapshot else None
     
-    if current_idx >= len(questions):
+    if not meta or meta.question_type != 'text':
         return
-        
-    question_id = questions[current_idx]
     
-    async with async_session() as session:
-        question_result = await session.execute(
-            select(Question).where(Question.id == question_id)
-        )
-        question = question_result.scalar_one_or_none()
-        
-        if not question or question.question_type != 'text':
-            return
-        
-        # Сохраняем текстовый ответ
-        answers = data.get('answers', {})
-        answers[str(question_id)] = [message.text.strip()]
-        await state.update_data(answers=answers)
-        
-        # Переходим к следующему вопросу
-        if current_idx + 1 < len(questions):
-            await state.update_data(current_question=current_idx + 1)
-            
-            # Создаём временное сообщение для show_question
-            temp_msg = await message.answer("⏳ Загрузка следующего вопроса...")
-            await show_question(temp_msg, state, lang)
-        else:
-            temp_msg = await message.answer("⏳ Подсчёт результатов...")
-            await complete_test(temp_msg, state, lang)
+    # Сохраняем текстовый ответ
+    test_session.texts[str(test_session.current)] = message.text.strip()
+    
+    # Переходим к следующему вопросу (создаём временное сообщение для show_question)
+    if test_session.current + 1 < test_session.total:
+        temp_msg = await message.answer("⏳ Загрузка следующего вопроса...")
+    else:
+        temp_msg = await message.answer("⏳ Подсчёт результатов...")
+    await go_to_next_question(temp_msg, state, test_session, lang)
 
 
 @testing_router.callback_query(F.data.startswith("answer_"), Testing.waiting_for_answer)
@@ -470,43 +445,23 @@ async def process_answer(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer("Ошибка обработки ответа")
         return
     
-    data = await state.get_data()
-    current_idx = data.get('current_question', 0)
+    test_session = TestSession.load(await state.get_data())
+    snapshot = await get_test_snapshot(test_session.test_id) if test_session else None
+    meta = snapshot.by_id.get(question_id) if snapshot else None
+    position = test_session.position_of(question_id) if meta else -1
+    bit = meta.option_bit(option_id) if meta else 0
     
-    answers = data.get('answers', {})
-    question_key = str(question_id)
-    
-    if question_key not in answers:
-        answers[question_key] = []
+    if position < 0 or not bit:
+        await callback.answer("Ошибка: вопрос не найден")
+        return
     
-    async with async_session() as session:
-        question_result = await session.execute(
-            select(Question).where(Question.id == question_id)
-        )
-        question = question_result.scalar_one_or_none()
-        
-        if not question:
-            await callback.answer("Ошибка: вопрос не найден")
-            return
-        
-        if question.question_type == 'single':
-            answers[question_key] = [option_id]
-            await state.update_data(answers=answers)
-            
-            questions = data.get('questions', [])
-            if current_idx + 1 < len(questions):
-                await state.update_data(current_question=current_idx + 1)
-                await show_question(callback.message, state, lang)
-            else:
-                await complete_test(callback.message, state, lang)
-        else:
-            if option_id in answers[question_key]:
-                answers[question_key].remove(option_id)
-            else:
-                answers[question_key].append(option_id)
-            
-            await state.update_data(answers=answers)
-            await show_question(callback.message, state, lang)
+    if meta.question_type == 'single':
+        test_session.masks[position] = bit
+        await go_to_next_question(callback.message, state, test_session, lang)
+    else:
+        test_session.masks[position] ^= bit
+        await state.update_data(**test_session.dump())
+        await show_question(callback.message, state, lang, test_session)
     
     await callback.answer()
 
@@ -518,15 +473,9 @@ async def finish_question(callback: types.CallbackQuery, state: FSMContext):
     """
     lang = await get_user_language(callback.from_user.id)
     
-    data = await state.get_data()
-    current_idx = data.get('current_question', 0)
-    questions = data.get('questions', [])
-
-    if current_idx + 1 < len(questions):
-        await state.update_data(current_question=current_idx + 1)
-        await show_question(callback.message, state, lang)
-    else:
-        await complete_test(callback.message, state, lang)
+    test_session = TestSession.load(await state.get_data())
+    if test_session:
+        await go_to_next_question(callback.message, state, test_session, lang)
 
     await callback.answer()
 
@@ -542,15 +491,9 @@ async def skip_question(callback: types.CallbackQuery, state: FSMContext):
     """
     lang = await get_user_language(callback.from_user.id)
     
-    data = await state.get_data()
-    current_idx = data.get('current_question', 0)
-    questions = data.get('questions', [])
-    
-    if current_idx + 1 < len(questions):
-        await state.update_data(current_question=current_idx + 1)
-        await show_question(callback.message, state, lang)
-    else:
-        await complete_test(callback.message, state, lang)
+    test_session = TestSession.load(await state.get_data())
+    if test_session:
+        await go_to_next_question(callback.message, state, test_session, lang)
     
     await callback.answer()
 
@@ -640,111 +583,193 @@ async def send_results_to_admin(bot: Bot, user_id: int, test_result_id: int):
         logger.exception(f"Ошибка при отправке результатов администратору: {e}")
 
 
-async def complete_test(message: types.Message, state: FSMContext, lang: str = "ru"):
+class AttemptOutcome(NamedTuple):
+    """Итог завершённой попытки."""
+    result_id: int
+    user_id: int
+    score: float
+    max_score: float
+    title: Optional[str]
+
+
+async def finalize_attempt(test_session: TestSession) -> Optional[AttemptOutcome]:
+    """
+    Атомарно завершить попытку.
+
+    Результат записывается одним условным UPDATE, который срабатывает,
+    только пока попытка не завершена. Поэтому из нескольких конкурентных
+    завершений (ответ, пропуск, таймер) побеждает ровно одно.
+
+    Args:
+        test_session: Текущая попытка
+
+    Returns:
+        AttemptOutcome для победившего вызова, иначе None
+    """
+    snapshot = await get_test_snapshot(test_session.test_id)
+    total_score, max_possible_score, answers = score_session(test_session, snapshot)
+
+    stmt = (
+        update(TestResult)
+        .where(TestResult.id == test_session.result_id, TestResult.completed_at.is_(None))
+        .values(
+            score=total_score,
+            completed_at=datetime.now(),
+            answers_data=json.dumps(answers)
+        )
+    )
+
+    async with async_session() as session:
+        if engine.dialect.update_returning:
+            user_id = (await session.execute(stmt.returning(TestResult.user_id))).scalar_one_or_none()
+        else:
+            user_id = None
+            if (await session.execute(stmt)).rowcount:
+                user_id = await session.scalar(
+                    select(TestResult.user_id).where(TestResult.id == test_session.result_id)
+                )
+        await session.commit()
+
+    if user_id is None:
+        logger.info("TestResult %s already completed or missing", test_session.result_id)
+        return None
+
+    return AttemptOutcome(
+        test_session.result_id,
+        user_id,
+        total_score,
+        max_possible_score,
+        snapshot.title if snapshot else None
+    )
+
+
+async def announce_results(
+    message: types.Message,
+    state: FSMContext,
+    outcome: AttemptOutcome,
+    lang: str = "ru"
+):
+    """
+    Показать результаты студенту, отправить их администратору и очистить state.
+
+    Args:
+        message: Сообщение для вывода результатов
+        state: FSM контекст
+        outcome: Итог попытки
+        lang: Язык интерфейса
+    """
+    percentage = (outcome.score / outcome.max_score * 100) if outcome.max_score > 0 else 0
+    
+    text = "🎉 <b>Тестирование завершено!</b>\n\n"
+    text += "📊 <b>Результаты:</b>\n"
+    text += f"• Набрано баллов: <b>{outcome.score:.1f}</b> из {outcome.max_score:.1f}\n"
+    text += f"• Процент выполнения: <b>{percentage:.1f}%</b>\n"
+    text += f"• Оценка: <b>{get_grade(percentage)}</b>\n\n"
+    
+    if outcome.title:
+        text += f"📝 Тест: <i>{outcome.title}</i>\n\n"
+    
+    text += "✨ Спасибо за участие!"
+    
+    try:
+        await edit_text_cached(message, text, parse_mode="HTML")
+    except TelegramBadRequest as e:
+        logger.debug("Could not edit message: %s", e)
+        await message.answer(text, parse_mode="HTML")
+    
+    # Отправляем результаты администратору
+    await send_results_to_admin(message.bot, outcome.user_id, outcome.result_id)
+    
+    await state.clear()
+
+
+async def complete_test(
+    message: types.Message,
+    state: FSMContext,
+    lang: str = "ru",
+    test_session: Optional[TestSession] = None
+):
     """
     Завершить тест и подсчитать результаты.
+
+    Если попытку уже завершил другой обработчик (например, таймер),
+    результаты повторно не выводятся и не отправляются.
     
     Args:
         message: Сообщение
         state: FSM контекст
         lang: Язык интерфейса
+        test_session: Текущая попытка (если уже загружена из state)
     """
     if message is None:
         logger.error("Message is None in complete_test")
         return
         
-    data = await state.get_data()
-    answers = data.get('answers', {})
-    test_result_id = data.get('test_result_id')
+    if test_session is None:
+        test_session = TestSession.load(await state.get_data())
     
-    if not test_result_id:
-        logger.error("No test_result_id in state")
+    if not test_session:
+        logger.error("No test session in state")
         await message.answer("Ошибка: данные теста не найдены")
         await state.clear()
         return
     
+    outcome = await finalize_attempt(test_session)
+    if outcome is None:
+        await state.clear()
+        return
+
+    await announce_results(message, state, outcome, lang)
+
+
+def score_session(test_session: TestSession, snapshot) -> tuple:
+    """
+    Подсчитать баллы попытки по снимку теста.
+
+    Учитываются только вопросы, на которые дан ответ.
+
+    Args:
+        test_session: Попытка прохождения теста
+        snapshot: Снимок теста (TestSnapshot)
+
+    Returns:
+        Кортеж (набранные баллы, максимум баллов, ответы в формате answers_data)
+    """
     total_score = 0.0
     max_possible_score = 0.0
-    
-    async with async_session() as session:
-        for question_key, selected_options in answers.items():
-            question_id = int(question_key)
-            
-            question_result = await session.execute(
-                select(Question).where(Question.id == question_id)
-            )
-            question = question_result.scalar_one_or_none()
-            
-            if not question:
-                logger.warning("Question %s not found during scoring", question_id)
-                continue
-            
-            max_possible_score += float(question.points)
-            
-            if question.question_type == 'text':
-                # Для текстовых вопросов - не оцениваем автоматически
-                continue
-            
-            correct_options_result = await session.execute(
-                select(Option.id).where(
-                    and_(
-                        Option.question_id == question_id,
-                        Option.is_correct == True
-                    )
-                )
-            )
-            correct_options = {row[0] for row in correct_options_result.all()}
-            
-            if question.question_type == 'single':
-                if selected_options and selected_options[0] in correct_options:
-                    total_score += float(question.points)
-            elif question.question_type == 'multiple':
-                selected_set = set(selected_options)
-                if selected_set == correct_options:
-                    total_score += float(question.points)
-                elif selected_set.issubset(correct_options) and selected_set:
-                    total_score += float(question.points) * len(selected_set) / len(correct_options)
-        
-        test_result = await session.get(TestResult, test_result_id)
-        user_id = None
-        if test_result:
-            test_result.score = total_score
-            test_result.completed_at = datetime.now()
-            test_result.answers_data = json.dumps(answers)
-            user_id = test_result.user_id
-            await session.commit()
-        else:
-            logger.error("TestResult %s not found", test_result_id)
-        
-        test_result_obj = await session.execute(
-            select(Test).where(Test.id == data.get('test_id'))
-        )
-        test = test_result_obj.scalar_one_or_none()
-        
-        percentage = (total_score / max_possible_score * 100) if max_possible_score > 0 else 0
-        
-        text = "🎉 <b>Тестирование завершено!</b>\n\n"
-        text += "📊 <b>Результаты:</b>\n"
-        text += f"• Набрано баллов: <b>{total_score:.1f}</b> из {max_possible_score:.1f}\n"
-        text += f"• Процент выполнения: <b>{percentage:.1f}%</b>\n"
-        text += f"• Оценка: <b>{get_grade(percentage)}</b>\n\n"
-        
-        if test:
-            text += f"📝 Тест: <i>{test.title}</i>\n\n"
-        
-        text += "✨ Спасибо за участие!"
-        
-        try:
-            await message.edit_text(text, parse_mode="HTML")
-        except TelegramBadRequest as e:
-            logger.debug("Could not edit message: %s", e)
-            await message.answer(text, parse_mode="HTML")
-    
-    # Отправляем результаты администратору
-    if user_id:
-        await send_results_to_admin(message.bot, user_id, test_result_id)
-    
-    await state.clear()
+    answers = {}
+    by_id = snapshot.by_id if snapshot else {}
+
+    for position, question_id in enumerate(test_session.order):
+        if not test_session.is_answered(position):
+            continue
+
+        meta = by_id.get(question_id)
+        if not meta:
+            logger.warning("Question %s not found during scoring", question_id)
+            continue
+
+        max_possible_score += meta.points
+
+        if meta.question_type == 'text':
+            # Для текстовых вопросов - не оцениваем автоматически
+            answers[str(question_id)] = [test_session.texts.get(str(position), "")]
+            continue
+
+        selected = test_session.masks[position]
+        answers[str(question_id)] = meta.option_ids_for(selected)
+        correct = meta.correct_mask
+
+        if meta.question_type == 'single':
+            if selected & correct:
+                total_score += meta.points
+        elif meta.question_type == 'multiple':
+            if selected == correct:
+                total_score += meta.points
+            elif selected & ~correct == 0:
+                total_score += meta.points * bin(selected).count("1") / bin(correct).count("1")
+
+    return total_score, max_possible_score, answers
 
 
 def get_grade(percentage: float) -> str:
@@ -761,7 +786,7 @@ def get_grade(percentage: float) -> str:
         return "1 (Плохо)"
 
 
-async def test_timer(user_id: int, state: FSMContext, minutes: int, chat_id: int, bot):
+async def test_timer(user_id: int, state: FSMContext, minutes: int, chat_id: int, bot, result_id: int):
     """
     Таймер для теста.
     
@@ -771,17 +796,26 @@ async def test_timer(user_id: int, state: FSMContext, minutes: int, chat_id: int
         minutes: Время в минутах
         chat_id: ID чата
         bot: Экземпляр бота
+        result_id: ID результата попытки, для которой запущен таймер
     """
     await asyncio.sleep(minutes * 60)
     
     try:
         current_state = await state.get_state()
-        if current_state == Testing.waiting_for_answer.state:
-            lang = await get_user_language(user_id)
-            
-            # Создаём временное сообщение
-            temp_msg = await bot.send_message(chat_id, "⏰ Время вышло! Подсчёт результатов...")
-            await complete_test(temp_msg, state, lang)
-            await bot.send_message(chat_id, "⏰ Тест автоматически завершен по истечении времени.")
+        if current_state != Testing.waiting_for_answer.state:
+            return
+
+        test_session = TestSession.load(await state.get_data())
+        if test_session is None or test_session.result_id != result_id:
+            return
+
+        outcome = await finalize_attempt(test_session)
+        if outcome is None:
+            return
+
+        lang = await get_user_language(user_id)
+        temp_msg = await bot.send_message(chat_id, "⏰ Время вышло! Подсчёт результатов...")
+        await announce_results(temp_msg, state, outcome, lang)
+        await bot.send_message(chat_id, "⏰ Тест автоматически завершен по истечении времени.")
     except Exception as e:
         logger.exception("Error in test_timer: %s", e)
@@ -3,7 +3,9 @@
 Модуль локализации для мультиязычной поддержки бота.
 Поддерживает русский, английский и узбекский языки.
 """
-from typing import Any
+import string
+import sys
+from typing import Any, Optional
 
 # Доступные языки
 AVAILABLE_LANGUAGES = {
@@ -76,6 +78,16 @@ TRANSLATIONS = {
         "test_started": "✅ Тест начат!",
         "test_locked": "🔒 Этот тест еще недоступен. Дождитесь назначенного времени.",
 
+        # Прохождение теста
+        "question_header": "❓ <b>Вопрос {num} из {total}</b>",
+        "hint_text_answer": "✍️ <i>Введите ваш ответ текстом</i>",
+        "hint_single": "📝 <i>(Несколько вариантов один ответ)</i>",
+        "hint_multiple": "📝 <i>(Несколько вариантов два ответа)</i>",
+        "btn_skip": "⏭ Пропустить",
+        "btn_done": "✅ Готово",
+        "btn_prev": "⬅️ Назад",
+        "btn_next": "Вперёд ➡️",
+
         # Мои тесты
         "not_registered": "⚠️ Вы не зарегистрированы. Используйте /register.",
         "no_my_tests": "📭 У вас пока нет доступных тестов.",
@@ -105,7 +117,7 @@ TRANSLATIONS = {
         "enter_time_limit": "Введите лимит времени в минутах (0 - без ограничения):",
         "enter_scheduled_time": "Введите дату и время начала теста (ДД.ММ.ГГГГ ЧЧ:ММ или '-' для немедленного):",
         "invalid_format_datetime": "Неверный формат. Используйте ДД.MM.ГГГГ ЧЧ:ММ или '-'",
-        "send_excel_file": "Отправьте файл Excel (.xlsx) с вопросами (лист 'Questions' с колонками: question,type,points,options).",
+        "send_excel_file": "Отправьте файл Excel (.xlsx) с вопросами (лист 'Questions' с колонками: question,type,points,options). Также принимаются .csv (UTF-8, те же колонки) и .jsonl (один объект JSON на строку).",
         "upload_success": "✅ Тест и вопросы успешно загружены из Excel.",
         "upload_failed": "⚠️ Не удалось обработать файл Excel: {error}",
         "download_template": "Шаблон Excel отправлен.",
@@ -193,6 +205,16 @@ TRANSLATIONS = {
         "test_started": "✅ Test started!",
         "test_locked": "🔒 This test is not available yet. Wait for the scheduled time.",
 
+        # Taking a test
+        "question_header": "❓ <b>Question {num} of {total}</b>",
+        "hint_text_answer": "✍️ <i>Type your answer</i>",
+        "hint_single": "📝 <i>(Choose one answer)</i>",
+        "hint_multiple": "📝 <i>(Choose several answers)</i>",
+        "btn_skip": "⏭ Skip",
+        "btn_done": "✅ Done",
+        "btn_prev": "⬅️ Back",
+        "btn_next": "Next ➡️",
+
         # My tests
         "not_registered": "⚠️ You are not registered. Use /register.",
         "no_my_tests": "📭 You don't have any available tests yet.",
@@ -222,7 +244,7 @@ TRANSLATIONS = {
         "enter_time_limit": "Enter time limit in minutes (0 - unlimited):",
         "enter_scheduled_time": "Enter scheduled start (DD.MM.YYYY HH:MM or '-' for immediate):",
         "invalid_format_datetime": "Invalid format. Use DD.MM.YYYY HH:MM or '-'",
-        "send_excel_file": "Send an Excel file (.xlsx) with questions (sheet 'Questions' with columns: question,type,points,options).",
+        "send_excel_file": "Send an Excel file (.xlsx) with questions (sheet 'Questions' with columns: question,type,points,options). You can also send .csv (UTF-8, same columns) or .jsonl (one JSON object per line).",
         "upload_success": "✅ Test and questions successfully uploaded from Excel.",
         "upload_failed": "⚠️ Failed to process Excel file: {error}",
         "download_template": "Template sent.",
@@ -310,6 +332,16 @@ TRANSLATIONS = {
         "test_started": "✅ Test boshlandi!",
         "test_locked": "🔒 Bu test hali mavjud emas. Rejalashtirilgan vaqtni kuting.",
 
+        # Testni topshirish
+        "question_header": "❓ <b>Savol {num} / {total}</b>",
+        "hint_text_answer": "✍️ <i>Javobingizni matn sifatida kiriting</i>",
+        "hint_single": "📝 <i>(Bitta javobni tanlang)</i>",
+        "hint_multiple": "📝 <i>(Bir nechta javobni tanlang)</i>",
+        "btn_skip": "⏭ O'tkazib yuborish",
+        "btn_done": "✅ Tayyor",
+        "btn_prev": "⬅️ Orqaga",
+        "btn_next": "Oldinga ➡️",
+
         # Mening testlarim
         "not_registered": "⚠️ Siz ro'yxatdan o'tmagansiz. /register dan foydalaning.",
         "no_my_tests": "📭 Sizda hozircha mavjud testlar yo'q.",
@@ -339,7 +371,7 @@ TRANSLATIONS = {
         "enter_time_limit": "Vaqt cheklovini daqiqalarda kiriting (0 - cheksiz):",
         "enter_scheduled_time": "Test boshlanish vaqtini kiriting (DD.MM.YYYY HH:MM yoki '-' uchun):",
         "invalid_format_datetime": "Noto'g'ri format. DD.MM.YYYY HH:MM yoki '-' ishlating",
-        "send_excel_file": "Savollar bilan Excel faylini yuboring (.xlsx) (sahifa 'Questions' ustunlar: question,type,points,options).",
+        "send_excel_file": "Savollar bilan Excel faylini yuboring (.xlsx) (sahifa 'Questions' ustunlar: question,type,points,options). Shuningdek .csv (UTF-8, shu ustunlar) va .jsonl (har qatorda bitta JSON obyekt) qabul qilinadi.",
         "upload_success": "✅ Test va savollar Excel-dan muvaffaqiyatli yuklandi.",
         "upload_failed": "⚠️ Excel faylini qayta ishlashda xatolik: {error}",
         "download_template": "Shablon yuborildi.",
@@ -371,6 +403,47 @@ TRANSLATIONS = {
 }
 
 
+def _compile_catalog():
+    """
+    Скомпилировать каталог переводов.
+
+    Для каждого языка строится полный словарь (с подстановкой русского
+    текста для отсутствующих ключей), строки интернируются, а для шаблонов
+    заранее извлекаются имена полей форматирования.
+
+    Returns:
+        Кортеж (каталог, поля шаблонов, обратный индекс кнопок)
+    """
+    formatter = string.Formatter()
+    catalog = {}
+    fields = {}
+    button_actions = {}
+
+    base = TRANSLATIONS["ru"]
+    for lang, strings in TRANSLATIONS.items():
+        merged = {key: sys.intern(text) for key, text in base.items()}
+        merged.update((key, sys.intern(text)) for key, text in strings.items())
+        catalog[lang] = merged
+
+        lang_fields = {}
+        for key, text in merged.items():
+            names = tuple(
+                name for _, name, _, _ in formatter.parse(text) if name
+            )
+            if names:
+                lang_fields[key] = names
+        fields[lang] = lang_fields
+
+        for key, text in merged.items():
+            if key.startswith("btn_") or key.endswith("_btn"):
+                button_actions.setdefault(text, key)
+
+    return catalog, fields, button_actions
+
+
+_CATALOG, _TEMPLATE_FIELDS, BUTTON_ACTIONS = _compile_catalog()
+
+
 def get_text(key: str, lang: str = "ru", **kwargs: Any) -> str:
     """
     Получить локализованный текст.
@@ -383,18 +456,32 @@ def get_text(key: str, lang: str = "ru", **kwargs: Any) -> str:
     Returns:
         Локализованная строка с подставленными параметрами
     """
-    if lang not in TRANSLATIONS:
+    catalog = _CATALOG.get(lang)
+    if catalog is None:
         lang = "ru"
+        catalog = _CATALOG["ru"]
 
-    text = TRANSLATIONS[lang].get(
-        key,
-        TRANSLATIONS["ru"].get(key, key)
-    )
+    text = catalog.get(key, key)
 
-    if kwargs:
+    if kwargs and key in _TEMPLATE_FIELDS[lang]:
         try:
             return text.format(**kwargs)
         except (KeyError, ValueError):
             return text
 
     return text
+
+
+def get_action(text: str) -> Optional[str]:
+    """
+    Определить ключ кнопки по её тексту на любом языке.
+
+    Используется в фильтрах вида ``F.text.func(get_action) == "btn_tests"``.
+
+    Args:
+        text: Текст нажатой кнопки
+
+    Returns:
+        Ключ кнопки или None, если текст не является кнопкой
+    """
+    return BUTTON_ACTIONS.get(text)
@@ -0,0 +1,315 @@
+# keyboards/question.py
+"""
+Кэш отрисовки вопросов теста.
+
+Неизменяемые части сообщения с вопросом (текст, кнопки вариантов,
+служебные кнопки) строятся один раз для пары (вопрос, язык).
+При каждом показе к ним применяется только отметка ✅ выбранных
+вариантов и строка навигации. Соседние вопросы загружаются в фоне,
+пока студент отвечает на текущий.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from db.models import Question
+from db.session import async_session
+from i18n.locales import get_text
+from utils.shuffle import option_permutation
+
+logger = logging.getLogger(__name__)
+
+# Максимальное количество вопросов в кэше отрисовки
+VIEW_CACHE_SIZE = 4096
+
+
+class QuestionView(NamedTuple):
+    """Предварительно отрисованные неизменяемые части вопроса."""
+    question_id: int
+    question_type: str
+    body: str
+    option_ids: Tuple[int, ...]
+    option_texts: Tuple[str, ...]
+    option_buttons: Tuple[Tuple[InlineKeyboardButton, InlineKeyboardButton], ...]
+    tail_rows: Tuple[Tuple[InlineKeyboardButton, ...], ...]
+
+
+_views: "OrderedDict[Tuple[int, str], QuestionView]" = OrderedDict()
+_shuffled: "OrderedDict[Tuple[int, tuple], tuple]" = OrderedDict()
+_inflight: Dict[Tuple[int, str], asyncio.Task] = {}
+
+# Счётчики кэша отрисовки
+view_stats: Dict[str, int] = {
+    "hits": 0,            # отрисовка найдена в кэше
+    "misses": 0,          # вопрос загружен из БД при показе
+    "prefetch_waits": 0,  # показ дождался фоновой загрузки
+    "prefetched": 0,      # вопросов загружено предвыборкой
+}
+
+
+def _option_buttons(
+    question_id: int,
+    option_ids: Tuple[int, ...],
+    option_texts: Tuple[str, ...],
+    display_order: Iterable[int]
+) -> Tuple[Tuple[InlineKeyboardButton, InlineKeyboardButton], ...]:
+    """
+    Построить пары кнопок (обычная, отмеченная) в порядке показа.
+
+    Args:
+        question_id: ID вопроса
+        option_ids: ID вариантов в исходном порядке
+        option_texts: Тексты вариантов в исходном порядке
+        display_order: Индексы вариантов для каждой позиции на экране
+
+    Returns:
+        Кортеж пар кнопок
+    """
+    buttons = []
+    for number, index in enumerate(display_order, 1):
+        label = f"{number}. {option_texts[index]}"
+        callback_data = f"answer_{question_id}_{option_ids[index]}"
+        buttons.append((
+            InlineKeyboardButton(text=label, callback_data=callback_data),
+            InlineKeyboardButton(text=f"✅ {label}", callback_data=callback_data),
+        ))
+    return tuple(buttons)
+
+
+def _shuffled_option_buttons(view: QuestionView, permutation: Tuple[int, ...]) -> tuple:
+    """Кнопки вариантов в перемешанном порядке (с кэшированием)."""
+    key = (view.question_id, permutation)
+    buttons = _shuffled.get(key)
+    if buttons is None:
+        buttons = _option_buttons(view.question_id, view.option_ids, view.option_texts, permutation)
+        _shuffled[key] = buttons
+        if len(_shuffled) > VIEW_CACHE_SIZE:
+            _shuffled.popitem(last=False)
+    return buttons
+
+
+def build_question_view(question: Question, lang: str = "ru") -> QuestionView:
+    """
+    Построить неизменяемые части отрисовки вопроса.
+
+    Args:
+        question: Вопрос с загруженными вариантами ответа
+        lang: Язык интерфейса
+
+    Returns:
+        QuestionView
+    """
+    question_id = question.id
+    skip_row = (
+        InlineKeyboardButton(
+            text=get_text("btn_skip", lang),
+            callback_data=f"skip_{question_id}"
+        ),
+    )
+
+    if question.question_type == 'text':
+        body = f"{question.text}\n\n{get_text('hint_text_answer', lang)}"
+        return QuestionView(question_id, question.question_type, body, (), (), (), (skip_row,))
+
+    options = sorted(question.options, key=lambda o: o.id)
+    option_texts = tuple(option.text[:100] for option in options)
+    option_ids = tuple(option.id for option in options)
+    option_buttons = _option_buttons(question_id, option_ids, option_texts, range(len(options)))
+
+    tail_rows = [skip_row]
+    if question.question_type == 'multiple':
+        tail_rows.append((
+            InlineKeyboardButton(
+                text=get_text("btn_done", lang),
+                callback_data=f"finish_{question_id}"
+            ),
+        ))
+
+    body = f"{question.text}\n\n"
+    if question.question_type == 'single':
+        body += get_text("hint_single", lang)
+    elif question.question_type == 'multiple':
+        body += get_text("hint_multiple", lang)
+
+    return QuestionView(
+        question_id,
+        question.question_type,
+        body,
+        option_ids,
+        option_texts,
+        option_buttons,
+        tuple(tail_rows),
+    )
+
+
+def _store_view(view: QuestionView, lang: str) -> None:
+    """Поместить отрисовку вопроса в кэш."""
+    key = (view.question_id, lang)
+    _views[key] = view
+    _views.move_to_end(key)
+    if len(_views) > VIEW_CACHE_SIZE:
+        _views.popitem(last=False)
+
+
+async def _load_views(question_ids: List[int], lang: str) -> None:
+    """
+    Загрузить вопросы одним запросом и поместить их отрисовки в кэш.
+
+    Args:
+        question_ids: ID вопросов
+        lang: Язык интерфейса
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(Question)
+            .options(selectinload(Question.options))
+            .where(Question.id.in_(question_ids))
+        )
+        questions = result.scalars().all()
+
+    for question in questions:
+        _store_view(build_question_view(question, lang), lang)
+
+
+async def get_question_view(question_id: int, lang: str = "ru") -> Optional[QuestionView]:
+    """
+    Получить отрисовку вопроса из кэша или загрузить её из БД.
+
+    Если вопрос уже загружается предвыборкой, ожидается её завершение.
+
+    Args:
+        question_id: ID вопроса
+        lang: Язык интерфейса
+
+    Returns:
+        QuestionView или None, если вопрос не найден
+    """
+    key = (question_id, lang)
+    view = _views.get(key)
+    if view is not None:
+        _views.move_to_end(key)
+        view_stats["hits"] += 1
+        return view
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        try:
+            await asyncio.shield(pending)
+        except Exception:
+            logger.debug("Prefetch of question %s failed, loading directly", question_id)
+        view = _views.get(key)
+        if view is not None:
+            view_stats["prefetch_waits"] += 1
+            return view
+
+    view_stats["misses"] += 1
+    await _load_views([question_id], lang)
+    return _views.get(key)
+
+
+def prefetch_question_views(question_ids: Iterable[int], lang: str = "ru") -> None:
+    """
+    Загрузить отрисовки вопросов в фоне, если их ещё нет в кэше.
+
+    Args:
+        question_ids: ID вопросов (например, следующий и предыдущий)
+        lang: Язык интерфейса
+    """
+    missing = [
+        question_id for question_id in dict.fromkeys(question_ids)
+        if (question_id, lang) not in _views and (question_id, lang) not in _inflight
+    ]
+    if not missing:
+        return
+
+    task = asyncio.create_task(_load_views(missing, lang))
+    for question_id in missing:
+        _inflight[(question_id, lang)] = task
+    view_stats["prefetched"] += len(missing)
+
+    def _done(finished: asyncio.Task) -> None:
+        for question_id in missing:
+            _inflight.pop((question_id, lang), None)
+        if not finished.cancelled() and finished.exception() is not None:
+            logger.warning("Prefetch of questions %s failed: %s", missing, finished.exception())
+
+    task.add_done_callback(_done)
+
+
+def invalidate_question_views(question_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Сбросить кэш отрисовки вопросов.
+
+    Args:
+        question_ids: ID вопросов для сброса; None — сбросить всё
+    """
+    if question_ids is None:
+        _views.clear()
+        _shuffled.clear()
+        return
+    ids = set(question_ids)
+    for key in [key for key in _views if key[0] in ids]:
+        del _views[key]
+    for key in [key for key in _shuffled if key[0] in ids]:
+        del _shuffled[key]
+
+
+@lru_cache(maxsize=None)
+def _navigation_row(lang: str, has_prev: bool, has_next: bool) -> Tuple[InlineKeyboardButton, ...]:
+    """Строка кнопок «Назад» / «Вперёд»."""
+    row = []
+    if has_prev:
+        row.append(InlineKeyboardButton(text=get_text("btn_prev", lang), callback_data="navigate_prev"))
+    if has_next:
+        row.append(InlineKeyboardButton(text=get_text("btn_next", lang), callback_data="navigate_next"))
+    return tuple(row)
+
+
+def render_question(
+    view: QuestionView,
+    index: int,
+    total: int,
+    selected_mask: int = 0,
+    lang: str = "ru",
+    seed: int = 0
+) -> Tuple[str, InlineKeyboardMarkup, tuple]:
+    """
+    Отрисовать вопрос для текущего состояния выбора.
+
+    Args:
+        view: Предварительно отрисованный вопрос
+        index: Порядковый номер вопроса (с нуля)
+        total: Количество вопросов в тесте
+        selected_mask: Маска выбранных вариантов (бит i — i-й вариант по ID)
+        lang: Язык интерфейса
+        seed: Зерно перемешивания вариантов (0 — исходный порядок)
+
+    Returns:
+        Кортеж (текст, клавиатура, ключ отрисовки)
+    """
+    if seed and view.option_ids:
+        permutation = option_permutation(seed, view.question_id, len(view.option_ids))
+        option_buttons = _shuffled_option_buttons(view, permutation)
+    else:
+        permutation = range(len(view.option_ids))
+        option_buttons = view.option_buttons
+
+    keyboard = [
+        [buttons[selected_mask >> option_index & 1]]
+        for option_index, buttons in zip(permutation, option_buttons)
+    ]
+    keyboard.extend(list(row) for row in view.tail_rows)
+
+    navigation = _navigation_row(lang, index > 0, index < total - 1)
+    if navigation:
+        keyboard.append(list(navigation))
+
+    text = f"{get_text('question_header', lang, num=index + 1, total=total)}\n\n{view.body}"
+    render_key = (view.question_id, lang, index, total, selected_mask, seed)
+    return text, InlineKeyboardMarkup(inline_keyboard=keyboard), render_key
@@ -3,6 +3,8 @@
 Модуль клавиатур для бота.
 Содержит функции для создания reply и inline клавиатур.
 """
+from functools import lru_cache
+
 from aiogram.types import (
     KeyboardButton,
     InlineKeyboardButton,
@@ -12,7 +14,7 @@ from aiogram.types import (
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
 from config.bot_config import ADMIN_ID
-from i18n.locales import get_text, AVAILABLE_LANGUAGES
+from i18n.locales import get_text, AVAILABLE_LANGUAGES, TRANSLATIONS
 
 
 def _is_admin(user_id: int) -> bool:
@@ -37,11 +39,30 @@ def main_menu(user_id: int, lang: str = "ru") -> ReplyKeyboardMarkup:
     Создать главное меню для пользователя.
     
     Меню отличается для администраторов и обычных пользователей.
+    Клавиатура строится один раз для каждой пары (язык, роль)
+    и затем переиспользуется.
     
     Args:
         user_id: Telegram ID пользователя
         lang: Код языка интерфейса
         
+    Returns:
+        ReplyKeyboardMarkup с кнопками главного меню
+    """
+    if lang not in TRANSLATIONS:
+        lang = "ru"
+    return _build_main_menu(lang, _is_admin(user_id))
+
+
+@lru_cache(maxsize=None)
+def _build_main_menu(lang: str, is_admin: bool) -> ReplyKeyboardMarkup:
+    """
+    Построить главное меню для языка и роли.
+    
+    Args:
+        lang: Код языка интерфейса
+        is_admin: Является ли пользователь администратором
+        
     Returns:
         ReplyKeyboardMarkup с кнопками главного меню
     """
@@ -54,7 +75,7 @@ def main_menu(user_id: int, lang: str = "ru") -> ReplyKeyboardMarkup:
     builder.row(KeyboardButton(text=get_text("btn_registration", lang)))
     builder.row(KeyboardButton(text=get_text("btn_auth", lang)))
 
-    if _is_admin(user_id):
+    if is_admin:
         # Кнопки для администратора
         builder.row(
             KeyboardButton(text=get_text("btn_admin_panel", lang))
@@ -71,6 +92,7 @@ def main_menu(user_id: int, lang: str = "ru") -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=False)
 
 
+@lru_cache(maxsize=None)
 def language_keyboard() -> InlineKeyboardMarkup:
     """
     Создать клавиатуру для выбора языка.
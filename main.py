@@ -4,12 +4,23 @@
 """
 import asyncio
 import sys
+from typing import Optional
 from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from config.bot_config import API_TOKEN
-from db.session import engine
+from config.bot_config import (
+    API_TOKEN,
+    JOBS_CONCURRENCY,
+    METRICS_HOST,
+    METRICS_PORT,
+    TRACE_FILE,
+    TRACE_SAMPLE_RATE,
+    TRACE_SLOW_MS,
+)
+from db.session import async_session, engine
 from db.models import Base
+from db.schema import upgrade_schema
 from handlers.start import start_router
 from handlers.auth import auth_router
 from handlers.registration import registration_router
@@ -17,23 +28,62 @@ from handlers.tests import tests_router
 from handlers.my_tests import my_tests_router
 from handlers.admin import admin_router
 from handlers.admin_testing import admin_testing_router
+from handlers.testing import timer_tasks
+from keyboards.question import view_stats
+from middlewares.debounce import CallbackDebounceMiddleware, debounce_stats
+from middlewares.metrics import UpdateMetricsMiddleware, HandlerMetricsMiddleware
+from middlewares.tracing import BotApiTracingMiddleware, HandlerTracingMiddleware, UpdateTracingMiddleware
+from middlewares.user_lock import UserLockMiddleware, lock_stats
+from utils.edit_cache import edit_stats
+from utils.excel_template import template_stats
+from utils.admin_jobs import cleanup_uploads
+from utils.jobs import JobQueue, job_stats
+from utils.metrics import instrument_engine, register_gauge, register_stats, start_metrics_server
+from utils.tracing import JsonLinesExporter, instrument_engine as instrument_tracing
 
 
 async def create_tables():
     """Создать таблицы в базе данных."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
 
 
-async def main():
-    """Основная функция запуска бота."""
-    # Создаем таблицы
-    await create_tables()
-    
-    # Инициализация бота и диспетчера
-    bot = Bot(token=API_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+def create_dispatcher(
+    storage: Optional[BaseStorage] = None,
+    metrics: bool = False,
+    trace_exporter: Optional[JsonLinesExporter] = None
+) -> Dispatcher:
+    """
+    Создать диспетчер с middlewares и роутерами бота.
+
+    Args:
+        storage: Хранилище FSM (по умолчанию MemoryStorage)
+        metrics: Собирать метрики обработки обновлений
+        trace_exporter: Экспортер трасс (None — трассировка выключена)
+
+    Returns:
+        Dispatcher
+    """
+    dp = Dispatcher(storage=storage or MemoryStorage())
+
+    if trace_exporter is not None:
+        dp.update.outer_middleware(UpdateTracingMiddleware(trace_exporter))
+        dp.message.middleware(HandlerTracingMiddleware())
+        dp.callback_query.middleware(HandlerTracingMiddleware())
+
+    if metrics:
+        # Время обновления включает ожидание блокировки пользователя
+        dp.update.outer_middleware(UpdateMetricsMiddleware())
+        dp.message.middleware(HandlerMetricsMiddleware())
+        dp.callback_query.middleware(HandlerMetricsMiddleware())
+        if isinstance(dp.storage, MemoryStorage):
+            register_gauge("bot_fsm_storage_keys", "Keys in the FSM memory storage", lambda: len(dp.storage.storage))
+
+    # Повторные нажатия отбрасываются до ожидания блокировки пользователя
+    dp.update.outer_middleware(CallbackDebounceMiddleware())
+    # Обновления одного пользователя обрабатываются по очереди
+    dp.update.outer_middleware(UserLockMiddleware())
     
     # Регистрируем роутеры
     dp.include_router(start_router)
@@ -43,6 +93,48 @@ async def main():
     dp.include_router(my_tests_router) 
     dp.include_router(admin_router)
     dp.include_router(admin_testing_router)
+    return dp
+
+
+def setup_metrics() -> None:
+    """Подключить учёт SQL-запросов и опубликовать счётчики модулей."""
+    instrument_engine(engine)
+    register_gauge("bot_active_test_timers", "Running test timer tasks", lambda: len(timer_tasks))
+    register_stats("bot_edits", edit_stats, "Message edits")
+    register_stats("bot_question_views", view_stats, "Question render cache")
+    register_stats("bot_callbacks", debounce_stats, "Test button callbacks")
+    register_stats("bot_user_lock", lock_stats, "Per-user update lock")
+    register_stats("bot_jobs", job_stats, "Background jobs")
+    register_stats("bot_excel_template", template_stats, "Excel template sends")
+
+
+async def main():
+    """Основная функция запуска бота."""
+    # Создаем таблицы
+    await create_tables()
+    
+    # Трассировка обновлений
+    trace_exporter = None
+    if TRACE_FILE:
+        trace_exporter = JsonLinesExporter(TRACE_FILE, TRACE_SAMPLE_RATE, TRACE_SLOW_MS)
+        instrument_tracing(engine)
+    
+    # Инициализация бота и диспетчера
+    bot = Bot(token=API_TOKEN)
+    dp = create_dispatcher(metrics=bool(METRICS_PORT), trace_exporter=trace_exporter)
+    if trace_exporter:
+        bot.session.middleware(BotApiTracingMiddleware())
+
+    metrics_runner = None
+    if METRICS_PORT:
+        setup_metrics()
+        metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+    
+    # Очередь фоновых задач; прерванные прошлой остановкой задачи продолжаются
+    job_queue = JobQueue(bot, JOBS_CONCURRENCY)
+    await job_queue.start()
+    async with async_session() as session:
+        await cleanup_uploads(session)
     
     try:
         # Запуск бота
@@ -52,6 +144,11 @@ async def main():
     except KeyboardInterrupt:
         print("\nПолучен сигнал остановки. Завершение работы...")
     finally:
+        await job_queue.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        if trace_exporter:
+            trace_exporter.close()
         await bot.session.close()
         print("Бот успешно остановлен.")
 
@@ -0,0 +1,18 @@
+# middlewares/__init__.py
+"""Промежуточные обработчики (middlewares) бота."""
+from .debounce import CallbackDebounceMiddleware, debounce_stats
+from .user_lock import UserLockMiddleware, lock_stats
+from .metrics import UpdateMetricsMiddleware, HandlerMetricsMiddleware
+from .tracing import UpdateTracingMiddleware, HandlerTracingMiddleware, BotApiTracingMiddleware
+
+__all__ = [
+    'CallbackDebounceMiddleware',
+    'debounce_stats',
+    'UserLockMiddleware',
+    'lock_stats',
+    'UpdateMetricsMiddleware',
+    'HandlerMetricsMiddleware',
+    'UpdateTracingMiddleware',
+    'HandlerTracingMiddleware',
+    'BotApiTracingMiddleware',
+]
@@ -0,0 +1,101 @@
+# middlewares/debounce.py
+"""
+Подавление повторных нажатий на кнопки теста.
+
+Повторный callback с теми же данными от того же пользователя
+отбрасывается, если первый ещё обрабатывается или был обработан
+менее DEBOUNCE_WINDOW секунд назад. На отброшенный callback сразу
+отправляется пустой ответ, чтобы у кнопки пропал индикатор загрузки.
+
+Middleware регистрируется на уровне обновлений раньше UserLockMiddleware:
+повтор отбрасывается, не дожидаясь блокировки пользователя, которую
+держит обработка первого нажатия.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple, Union
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+# Префиксы callback data, для которых действует защита от повторов
+DEBOUNCE_PREFIXES = ("answer_", "skip_", "finish_", "navigate_")
+
+# Окно (в секундах), в течение которого одинаковый callback считается повтором
+DEBOUNCE_WINDOW = 0.7
+
+# Максимальное количество запомненных нажатий
+DEBOUNCE_CACHE_SIZE = 10000
+
+# Счётчики нажатий
+debounce_stats: Dict[str, int] = {
+    "passed": 0,     # передано обработчику
+    "in_flight": 0,  # отброшено: такой же callback ещё обрабатывается
+    "debounced": 0,  # отброшено: такой же callback только что обработан
+}
+
+
+class CallbackDebounceMiddleware(BaseMiddleware):
+    """Отбрасывает повторные нажатия на одну и ту же кнопку."""
+
+    def __init__(
+        self,
+        prefixes: Tuple[str, ...] = DEBOUNCE_PREFIXES,
+        window: float = DEBOUNCE_WINDOW
+    ):
+        self.prefixes = prefixes
+        self.window = window
+        self._in_flight: Set[Tuple[int, int, str]] = set()
+        self._recent: "OrderedDict[Tuple[int, int, str], float]" = OrderedDict()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Union[Update, CallbackQuery],
+        data: Dict[str, Any]
+    ) -> Any:
+        callback = event.callback_query if isinstance(event, Update) else event
+        callback_data = (callback.data or "") if callback is not None else ""
+        if not callback_data.startswith(self.prefixes):
+            return await handler(event, data)
+
+        message_id = callback.message.message_id if callback.message else 0
+        key = (callback.from_user.id, message_id, callback_data)
+
+        if key in self._in_flight:
+            return await self._drop(callback, "in_flight")
+
+        finished_at = self._recent.get(key)
+        if finished_at is not None and time.monotonic() - finished_at < self.window:
+            return await self._drop(callback, "debounced")
+
+        debounce_stats["passed"] += 1
+        self._in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
+            self._recent[key] = time.monotonic()
+            self._recent.move_to_end(key)
+            if len(self._recent) > DEBOUNCE_CACHE_SIZE:
+                self._recent.popitem(last=False)
+
+    @staticmethod
+    async def _drop(event: CallbackQuery, reason: str) -> None:
+        """
+        Отбросить повторный callback, ответив на него.
+
+        Args:
+            event: Повторный callback
+            reason: Причина (ключ счётчика debounce_stats)
+        """
+        debounce_stats[reason] += 1
+        logger.debug("Dropped duplicate callback %r from %s (%s)", event.data, event.from_user.id, reason)
+        try:
+            await event.answer()
+        except TelegramBadRequest:
+            pass
@@ -0,0 +1,75 @@
+# middlewares/metrics.py
+"""
+Сбор метрик обработки обновлений.
+
+UpdateMetricsMiddleware (outer middleware диспетчера) измеряет время
+обработки обновления, считает ошибки и SQL-запросы, выполненные
+за время обработки. HandlerMetricsMiddleware (inner middleware)
+измеряет время работы конкретного обработчика.
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import (
+    db_queries_per_update,
+    db_seconds_per_update,
+    handler_errors_total,
+    handler_seconds,
+    update_db_usage,
+    update_errors_total,
+    update_seconds,
+    updates_total,
+)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Метрики обновлений: количество, время, ошибки, SQL-запросы."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        usage = [0, 0.0]
+        token = update_db_usage.set(usage)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            update_errors_total.inc(type=update_type)
+            raise
+        finally:
+            update_seconds.observe(time.perf_counter() - started, type=update_type)
+            updates_total.inc(type=update_type)
+            db_queries_per_update.observe(usage[0])
+            db_seconds_per_update.observe(usage[1])
+            update_db_usage.reset(token)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Метрики обработчиков: время и ошибки по роутеру и функции."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        router = getattr(callback, "__module__", "unknown").rsplit(".", 1)[-1]
+        name = getattr(callback, "__name__", "unknown")
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors_total.inc(router=router, handler=name)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, router=router, handler=name)
@@ -0,0 +1,74 @@
+# middlewares/tracing.py
+"""
+Спаны обновлений, обработчиков и вызовов Bot API.
+
+UpdateTracingMiddleware (outer middleware диспетчера) открывает
+трассу на каждое обновление и передаёт её экспортеру.
+HandlerTracingMiddleware (inner middleware) добавляет спан обработчика,
+BotApiTracingMiddleware (middleware сессии бота) — спан каждого
+вызова Bot API.
+"""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from utils.tracing import JsonLinesExporter, start_span, start_trace
+
+
+class UpdateTracingMiddleware(BaseMiddleware):
+    """Корневой спан обновления."""
+
+    def __init__(self, exporter: JsonLinesExporter):
+        self.exporter = exporter
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        attributes = {
+            "update.type": event.event_type if isinstance(event, Update) else type(event).__name__,
+            "user.id": user.id if user else None,
+        }
+        root = None
+        try:
+            with start_trace("update", **attributes) as root:
+                return await handler(event, data)
+        finally:
+            if root is not None:
+                self.exporter.export(root)
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """Спан обработчика."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        callback = getattr(data.get("handler"), "callback", None)
+        name = f"{getattr(callback, '__module__', '?')}.{getattr(callback, '__name__', '?')}"
+        attributes = {"callback.data": event.data} if hasattr(event, "data") else {}
+        with start_span(f"handler {name}", **attributes):
+            return await handler(event, data)
+
+
+class BotApiTracingMiddleware(BaseRequestMiddleware):
+    """Спан вызова Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Any:
+        with start_span(f"bot.{method.__api_method__}"):
+            return await make_request(bot, method)
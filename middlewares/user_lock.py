@@ -0,0 +1,66 @@
+# middlewares/user_lock.py
+"""
+Последовательная обработка обновлений одного пользователя.
+
+aiogram обрабатывает обновления конкурентно, поэтому два быстрых
+нажатия одного пользователя могут одновременно читать и записывать
+данные FSM. Middleware берёт блокировку пользователя на время
+обработки обновления: обновления одного пользователя выполняются
+по очереди, разных пользователей — параллельно.
+
+Блокировки хранятся в WeakValueDictionary и удаляются, как только
+их никто не удерживает и не ожидает, так что память ограничена
+числом пользователей с обновлениями в обработке.
+"""
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+# Счётчики блокировок
+lock_stats: Dict[str, int] = {
+    "acquired": 0,   # обновлений обработано под блокировкой
+    "contended": 0,  # обновлений ждали завершения предыдущего
+}
+
+
+class UserLockMiddleware(BaseMiddleware):
+    """Сериализует обработку обновлений каждого пользователя."""
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _lock_for(self, key: int) -> asyncio.Lock:
+        """Получить (или создать) блокировку пользователя."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    @property
+    def active_locks(self) -> int:
+        """Количество блокировок, которые сейчас удерживаются или ожидаются."""
+        return len(self._locks)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        chat = data.get("event_chat")
+        if user is None and chat is None:
+            return await handler(event, data)
+
+        key = user.id if user is not None else chat.id
+        lock = self._lock_for(key)
+        if lock.locked():
+            lock_stats["contended"] += 1
+
+        async with lock:
+            lock_stats["acquired"] += 1
+            return await handler(event, data)
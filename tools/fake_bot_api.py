@@ -0,0 +1,141 @@
+# tools/fake_bot_api.py
+"""
+Имитация Telegram Bot API для локальных прогонов бота.
+
+FakeSession подменяет HTTP-сессию aiogram: запросы к API не уходят
+в сеть, а получают правдоподобные ответы (сообщения, True).
+Ответы проходят обычную валидацию aiogram, поэтому обработчики
+получают настоящие объекты Message с привязкой к боту.
+"""
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Message
+
+# Бот, от имени которого отвечает имитация getMe
+FAKE_BOT_USER = {"id": 123456, "is_bot": True, "first_name": "EduTester", "username": "edutester_bot"}
+
+# Методы API, возвращающие Message
+MESSAGE_METHODS = frozenset({
+    "sendMessage", "sendDocument", "sendPhoto", "editMessageText", "editMessageReplyMarkup",
+})
+
+
+class FakeSession(BaseSession):
+    """HTTP-сессия aiogram, отвечающая без обращения к сети."""
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: Искусственная задержка ответа API в секундах
+        """
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.last_message_id: Dict[int, int] = {}
+        self._message_id = 0
+
+    def _message(self, method: TelegramMethod) -> Dict[str, Any]:
+        """Построить сообщение, которое вернул бы API."""
+        chat_id = int(getattr(method, "chat_id", 0) or 0)
+        message_id = getattr(method, "message_id", None)
+        if message_id is None:
+            self._message_id += 1
+            message_id = self._message_id
+        self.last_message_id[chat_id] = message_id
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": FAKE_BOT_USER,
+            "text": getattr(method, "text", None) or "",
+        }
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod,
+        timeout: Optional[int] = None
+    ) -> Any:
+        api_method = method.__api_method__
+        self.calls[api_method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if api_method in MESSAGE_METHODS:
+            result: Any = self._message(method)
+        elif api_method == "getMe":
+            result = FAKE_BOT_USER
+        else:
+            result = True
+
+        response = self.check_response(bot, method, 200, json.dumps({"ok": True, "result": result}))
+        return response.result
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def fake_message(bot: Bot, chat_id: int, text: str = "", message_id: int = 1) -> Message:
+    """
+    Построить входящее сообщение, привязанное к боту.
+
+    Args:
+        bot: Бот с FakeSession
+        chat_id: ID чата (совпадает с ID пользователя)
+        text: Текст сообщения
+        message_id: ID сообщения
+
+    Returns:
+        Message
+    """
+    return Message.model_validate({
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"},
+        "text": text,
+    }, context={"bot": bot})
+
+
+def fake_callback(bot: Bot, user_id: int, data: str, message_id: int = 1) -> CallbackQuery:
+    """
+    Построить нажатие inline-кнопки, привязанное к боту.
+
+    Args:
+        bot: Бот с FakeSession
+        user_id: ID пользователя
+        data: Данные кнопки
+        message_id: ID сообщения с кнопкой
+
+    Returns:
+        CallbackQuery
+    """
+    return CallbackQuery.model_validate({
+        "id": f"{user_id}-{message_id}-{data}",
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+        "chat_instance": str(user_id),
+        "data": data,
+        "message": {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "text": "…",
+        },
+    }, context={"bot": bot})
@@ -0,0 +1,348 @@
+# tools/load_test.py
+"""
+Нагрузочный прогон бота на синтетических студентах.
+
+Диспетчер из main.py получает синтетические обновления (начало теста,
+нажатия вариантов, текстовые ответы, срабатывание таймера) от тысяч
+виртуальных студентов. Bot API имитируется FakeSession, база —
+временный файл SQLite.
+
+Отчёт: задержка обработки обновлений (p50/p95/p99), пропускная
+способность, число SQL-запросов на обновление, вызовы Bot API
+и прирост памяти.
+
+Запуск:
+    python -m tools.load_test --students 2000 --questions 30
+    python -m tools.load_test --students 500 --json report.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List
+
+# Настройки должны быть заданы до импорта модулей бота
+_db_path = os.path.join(tempfile.mkdtemp(prefix="edutester-load-"), "load.db")
+os.environ.setdefault("TOKEN", "123456:LOAD-TEST-TOKEN")
+os.environ.setdefault("SQLALCHEMY_URL", f"sqlite+aiosqlite:///{_db_path}")
+os.environ.setdefault("SQLALCHEMY_ECHO", "0")
+os.environ.setdefault("ADMIN_ID", "1")
+
+from aiogram import Bot  # noqa: E402
+from aiogram.fsm.context import FSMContext  # noqa: E402
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.types import Update  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from db.models import User, Test, Question, Option  # noqa: E402
+from db.session import async_session, engine  # noqa: E402
+from db.snapshot import get_test_snapshot  # noqa: E402
+from fsm.session import TestSession  # noqa: E402
+from handlers.testing import test_timer  # noqa: E402
+from main import create_dispatcher, create_tables  # noqa: E402
+from tools.fake_bot_api import FakeSession  # noqa: E402
+
+# Счётчик SQL-запросов текущего обновления
+_queries: contextvars.ContextVar = contextvars.ContextVar("load_test_queries", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Перцентиль по методу ближайшего ранга."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def seed(students: int, questions: int) -> int:
+    """
+    Заполнить БД пользователями и тестом.
+
+    Args:
+        students: Количество студентов
+        questions: Количество вопросов в тесте
+
+    Returns:
+        ID созданного теста
+    """
+    await create_tables()
+    async with async_session() as session:
+        test = Test(
+            title="Нагрузочный тест",
+            total_questions=questions,
+            is_active=True,
+        )
+        session.add(test)
+        await session.flush()
+
+        for number in range(questions):
+            roll = number % 10
+            question_type = "text" if roll == 9 else "multiple" if roll >= 7 else "single"
+            question = Question(
+                test_id=test.id,
+                text=f"Вопрос {number + 1}: " + "текст вопроса " * 8,
+                question_type=question_type,
+                points=2.0,
+                order_num=number,
+            )
+            session.add(question)
+            await session.flush()
+            if question_type != "text":
+                for option_number in range(4):
+                    session.add(Option(
+                        question_id=question.id,
+                        text=f"Вариант {option_number + 1}",
+                        is_correct=option_number == 0 or (question_type == "multiple" and option_number == 1),
+                    ))
+
+        session.add_all(
+            User(
+                user_id=1_000_000 + number,
+                name=f"Студент {number}",
+                phone=f"+998{number:09d}",
+                language="ru",
+                is_active=True,
+            )
+            for number in range(students)
+        )
+        await session.commit()
+        return test.id
+
+
+class LoadTest:
+    """Прогон виртуальных студентов через диспетчер."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.api = FakeSession(latency=args.api_latency / 1000)
+        self.bot = Bot(token=os.environ["TOKEN"], session=self.api)
+        self.dp = create_dispatcher()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.queries: Dict[str, List[int]] = defaultdict(list)
+        self.errors = 0
+        self._update_id = 0
+
+    def _next_update_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    async def _measure(self, kind: str, awaitable) -> None:
+        """Выполнить обработку и записать её задержку и число запросов."""
+        counter = [0]
+        token = _queries.set(counter)
+        started = time.perf_counter()
+        try:
+            await awaitable
+        except Exception:
+            self.errors += 1
+        finally:
+            self.latencies[kind].append(time.perf_counter() - started)
+            self.queries[kind].append(counter[0])
+            _queries.reset(token)
+
+    def _user(self, tg_id: int) -> dict:
+        return {"id": tg_id, "is_bot": False, "first_name": f"Student{tg_id}", "language_code": "ru"}
+
+    async def callback(self, kind: str, tg_id: int, data: str) -> None:
+        """Отправить синтетическое нажатие inline-кнопки."""
+        update = Update.model_validate({
+            "update_id": self._next_update_id(),
+            "callback_query": {
+                "id": str(self._update_id),
+                "from": self._user(tg_id),
+                "chat_instance": str(tg_id),
+                "data": data,
+                "message": {
+                    "message_id": self.api.last_message_id.get(tg_id, 1),
+                    "date": int(time.time()),
+                    "chat": {"id": tg_id, "type": "private"},
+                    "text": "…",
+                },
+            },
+        }, context={"bot": self.bot})
+        await self._measure(kind, self.dp.feed_update(self.bot, update))
+
+    async def message(self, kind: str, tg_id: int, text: str) -> None:
+        """Отправить синтетическое текстовое сообщение."""
+        update = Update.model_validate({
+            "update_id": self._next_update_id(),
+            "message": {
+                "message_id": self._next_update_id(),
+                "date": int(time.time()),
+                "chat": {"id": tg_id, "type": "private"},
+                "from": self._user(tg_id),
+                "text": text,
+            },
+        }, context={"bot": self.bot})
+        await self._measure(kind, self.dp.feed_update(self.bot, update))
+
+    async def think(self) -> None:
+        """Пауза студента между ответами."""
+        if self.args.think_time:
+            await asyncio.sleep(random.random() * self.args.think_time / 1000)
+
+    async def student(self, number: int, test_id: int) -> None:
+        """
+        Пройти тест одним виртуальным студентом.
+
+        Args:
+            number: Номер студента
+            test_id: ID теста
+        """
+        rng = random.Random(number)
+        tg_id = 1_000_000 + number
+        key = StorageKey(bot_id=self.bot.id, chat_id=tg_id, user_id=tg_id)
+        state = FSMContext(storage=self.dp.storage, key=key)
+        timer_at = -1
+        if self.args.questions > 1 and rng.random() < self.args.timer_share:
+            timer_at = rng.randrange(1, self.args.questions)
+
+        await self.callback("start_test", tg_id, f"start_test_{test_id}")
+        snapshot = await get_test_snapshot(test_id)
+
+        answered = 0
+        while True:
+            test_session = TestSession.load(await state.get_data())
+            if test_session is None:
+                break
+
+            if answered == timer_at:
+                # Время вышло: таймер завершает попытку
+                await self._measure(
+                    "timer",
+                    test_timer(tg_id, state, 0, tg_id, self.bot, test_session.result_id)
+                )
+                break
+
+            await self.think()
+            meta = snapshot.by_id[test_session.current_question_id]
+            if meta.question_type == "text":
+                await self.message("text_answer", tg_id, "Ответ студента")
+            elif meta.question_type == "single":
+                option_id = rng.choice(meta.option_ids)
+                await self.callback("answer", tg_id, f"answer_{meta.id}_{option_id}")
+                if rng.random() < self.args.double_tap:
+                    await self.callback("answer", tg_id, f"answer_{meta.id}_{option_id}")
+            else:
+                for option_id in rng.sample(meta.option_ids, 2):
+                    await self.callback("answer", tg_id, f"answer_{meta.id}_{option_id}")
+                await self.callback("finish", tg_id, f"finish_{meta.id}")
+            answered += 1
+
+    async def run(self) -> dict:
+        """Выполнить прогон и вернуть отчёт."""
+        test_id = await seed(self.args.students, self.args.questions)
+        await get_test_snapshot(test_id)
+
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def limited(number: int) -> None:
+            async with semaphore:
+                await self.student(number, test_id)
+
+        if self.args.memory:
+            tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0] if self.args.memory else 0
+
+        started = time.perf_counter()
+        await asyncio.gather(*(limited(number) for number in range(self.args.students)))
+        elapsed = time.perf_counter() - started
+
+        report = self._report(elapsed)
+        if self.args.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report["memory"] = {
+                "growth_kb": round((current - memory_before) / 1024, 1),
+                "peak_kb": round(peak / 1024, 1),
+            }
+        await self.bot.session.close()
+        await engine.dispose()
+        return report
+
+    def _report(self, elapsed: float) -> dict:
+        """Собрать отчёт по записанным измерениям."""
+        all_latencies = sorted(value for values in self.latencies.values() for value in values)
+        all_queries = [value for values in self.queries.values() for value in values]
+
+        def summary(latencies: List[float], queries: List[int]) -> dict:
+            latencies = sorted(latencies)
+            return {
+                "count": len(latencies),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "queries_mean": round(statistics.fmean(queries), 2) if queries else 0,
+                "queries_max": max(queries, default=0),
+            }
+
+        return {
+            "students": self.args.students,
+            "questions": self.args.questions,
+            "elapsed_s": round(elapsed, 2),
+            "updates_per_s": round(len(all_latencies) / elapsed, 1) if elapsed else 0,
+            "errors": self.errors,
+            "total": summary(all_latencies, all_queries),
+            "by_kind": {
+                kind: summary(self.latencies[kind], self.queries[kind])
+                for kind in sorted(self.latencies)
+            },
+            "api_calls": dict(self.api.calls),
+        }
+
+
+def print_report(report: dict) -> None:
+    """Вывести отчёт в читаемом виде."""
+    total = report["total"]
+    print(f"Студентов: {report['students']}, вопросов: {report['questions']}")
+    print(f"Обновлений: {total['count']} за {report['elapsed_s']} с "
+          f"({report['updates_per_s']} обновлений/с), ошибок: {report['errors']}")
+    print(f"{'тип':<12}{'кол-во':>8}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}{'SQL ср.':>9}{'SQL макс':>9}")
+    for kind, row in [("всего", total), *report["by_kind"].items()]:
+        print(f"{kind:<12}{row['count']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['queries_mean']:>9}{row['queries_max']:>9}")
+    print("Вызовы Bot API: " + ", ".join(f"{name}={count}" for name, count in sorted(report["api_calls"].items())))
+    if "memory" in report:
+        print(f"Память: прирост {report['memory']['growth_kb']} КБ, пик {report['memory']['peak_kb']} КБ")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон EduTester")
+    parser.add_argument("--students", type=int, default=1000, help="количество виртуальных студентов")
+    parser.add_argument("--questions", type=int, default=20, help="количество вопросов в тесте")
+    parser.add_argument("--concurrency", type=int, default=500, help="студентов одновременно")
+    parser.add_argument("--think-time", type=float, default=0, help="макс. пауза между ответами, мс")
+    parser.add_argument("--api-latency", type=float, default=0, help="задержка ответа Bot API, мс")
+    parser.add_argument("--double-tap", type=float, default=0.05, help="доля повторных нажатий")
+    parser.add_argument("--timer-share", type=float, default=0.1, help="доля попыток, завершаемых таймером")
+    parser.add_argument("--memory", action="store_true", help="измерять память (tracemalloc)")
+    parser.add_argument("--json", metavar="PATH", help="сохранить отчёт в JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(LoadTest(args).run())
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
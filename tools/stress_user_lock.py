@@ -0,0 +1,143 @@
+# tools/stress_user_lock.py
+"""
+Нагрузочная проверка UserLockMiddleware.
+
+Много пользователей одновременно присылают пачки обновлений.
+Обработчик читает и записывает общее состояние с паузой посередине,
+как process_answer с данными FSM. Проверяется, что:
+  • ни одно обновление пользователя не потеряно (нет гонок);
+  • у каждого пользователя одновременно обрабатывается одно обновление;
+  • разные пользователи обрабатываются параллельно;
+  • после обработки не остаётся удерживаемых блокировок;
+  • повторные нажатия (CallbackDebounceMiddleware перед блокировкой)
+    получают ответ, пока первое нажатие ещё держит блокировку.
+
+Запуск:
+    python -m tools.stress_user_lock [пользователей] [обновлений]
+"""
+import asyncio
+import gc
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from middlewares.debounce import CallbackDebounceMiddleware, debounce_stats
+from middlewares.user_lock import UserLockMiddleware, lock_stats
+
+
+async def run(users: int = 200, updates_per_user: int = 50) -> None:
+    """
+    Выполнить нагрузочную проверку.
+
+    Args:
+        users: Количество пользователей
+        updates_per_user: Количество обновлений от каждого пользователя
+    """
+    middleware = UserLockMiddleware()
+    counters = {user_id: 0 for user_id in range(users)}
+    running = {user_id: 0 for user_id in range(users)}
+    peak = {"per_user": 0, "total": 0, "current": 0}
+
+    async def handler(event, data):
+        user_id = data["event_from_user"].id
+        running[user_id] += 1
+        peak["current"] += 1
+        peak["per_user"] = max(peak["per_user"], running[user_id])
+        peak["total"] = max(peak["total"], peak["current"])
+
+        value = counters[user_id]
+        await asyncio.sleep(random.random() / 1000)
+        counters[user_id] = value + 1
+
+        peak["current"] -= 1
+        running[user_id] -= 1
+
+    tasks = [
+        middleware(handler, None, {"event_from_user": SimpleNamespace(id=user_id), "event_chat": None})
+        for user_id in range(users)
+        for _ in range(updates_per_user)
+    ]
+    random.shuffle(tasks)
+
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    del tasks
+    gc.collect()
+
+    lost = sum(updates_per_user - value for value in counters.values())
+    print(f"Обновлений: {users * updates_per_user} за {elapsed:.2f} с")
+    print(f"Ожидали блокировку: {lock_stats['contended']}")
+    print(f"Пиковая параллельность: {peak['total']} (на пользователя: {peak['per_user']})")
+    print(f"Потеряно обновлений: {lost}")
+    print(f"Оставшихся блокировок: {middleware.active_locks}")
+
+    assert lost == 0, "обновления пользователя потеряны"
+    assert peak["per_user"] == 1, "обновления одного пользователя выполнялись одновременно"
+    assert users == 1 or peak["total"] > 1, "разные пользователи обрабатывались последовательно"
+    assert middleware.active_locks == 0, "блокировки не освобождены"
+    print("OK")
+
+
+async def run_duplicates(users: int = 200, duplicates: int = 5) -> None:
+    """
+    Проверить, что повторы отбрасываются, не дожидаясь блокировки.
+
+    Первое нажатие каждого пользователя держит блокировку, пока все
+    его повторы не получат ответ. Если повтор ждёт блокировку, проверка
+    завершается по таймауту.
+
+    Args:
+        users: Количество пользователей
+        duplicates: Количество повторных нажатий от каждого пользователя
+    """
+    debounce = CallbackDebounceMiddleware()
+    user_lock = UserLockMiddleware()
+    answered = {user_id: 0 for user_id in range(users)}
+    all_answered = {user_id: asyncio.Event() for user_id in range(users)}
+    handled = {user_id: 0 for user_id in range(users)}
+    dropped_before = debounce_stats["in_flight"]
+
+    def tap(user_id: int) -> SimpleNamespace:
+        async def answer():
+            answered[user_id] += 1
+            if answered[user_id] == duplicates:
+                all_answered[user_id].set()
+        return SimpleNamespace(
+            data=f"answer_{user_id}_1",
+            from_user=SimpleNamespace(id=user_id),
+            message=SimpleNamespace(message_id=1),
+            answer=answer,
+        )
+
+    async def handler(event, data):
+        user_id = data["event_from_user"].id
+        handled[user_id] += 1
+        # Блокировка удерживается, пока повторы не получат ответ
+        await all_answered[user_id].wait()
+
+    async def locked(event, data):
+        return await user_lock(handler, event, data)
+
+    async def press(user_id: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        data = {"event_from_user": SimpleNamespace(id=user_id), "event_chat": None}
+        await debounce(locked, tap(user_id), data)
+
+    tasks = [press(user_id, 0) for user_id in range(users)]
+    tasks += [press(user_id, 0.01) for user_id in range(users) for _ in range(duplicates)]
+    await asyncio.wait_for(asyncio.gather(*tasks), 10)
+
+    print(f"Повторов отброшено во время обработки: {debounce_stats['in_flight'] - dropped_before}")
+    assert all(count == 1 for count in handled.values()), "повтор дошёл до обработчика"
+    assert all(count == duplicates for count in answered.values()), "повтор остался без ответа"
+    assert user_lock.active_locks == 0, "блокировки не освобождены"
+    print("OK")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(run(*args))
+    asyncio.run(run_duplicates(*args[:1]))
@@ -0,0 +1,44 @@
+# tools/trace_report.py
+"""
+Просмотр самых медленных трасс из файла JSON Lines.
+
+Запуск:
+    python -m tools.trace_report traces.jsonl [количество]
+"""
+import json
+import sys
+from typing import Dict, List
+
+
+def print_trace(trace: dict) -> None:
+    """Вывести трассу деревом спанов с длительностями."""
+    spans = trace["spans"]
+    children: Dict[str, List[dict]] = {}
+    for span in spans:
+        children.setdefault(span["parentSpanId"], []).append(span)
+
+    print(f"{trace['durationMs']:.1f} мс  {trace['traceId']}")
+
+    def walk(parent_id: str, depth: int) -> None:
+        for span in sorted(children.get(parent_id, ()), key=lambda s: s["startTimeUnixNano"]):
+            duration = (span["endTimeUnixNano"] - span["startTimeUnixNano"]) / 1_000_000
+            status = "  ✗ " + span["status"]["message"] if "status" in span else ""
+            detail = span["attributes"].get("statement") or span["attributes"].get("callback.data") or ""
+            print(f"  {'  ' * depth}{duration:8.2f} мс  {span['name']}  {detail}{status}")
+            walk(span["spanId"], depth + 1)
+
+    walk("", 0)
+    print()
+
+
+def main(argv: List[str]) -> None:
+    path = argv[0]
+    limit = int(argv[1]) if len(argv) > 1 else 10
+    with open(path, encoding="utf-8") as f:
+        traces = [json.loads(line) for line in f if line.strip()]
+    for trace in sorted(traces, key=lambda t: t["durationMs"], reverse=True)[:limit]:
+        print_trace(trace)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
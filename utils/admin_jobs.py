@@ -0,0 +1,301 @@
+# utils/admin_jobs.py
+"""
+Тяжёлые операции администратора, выполняемые очередью задач.
+
+Импорт вопросов, экспорт результатов, удаление теста и удаление всех
+пользователей не выполняются в обработчиках: обработчик ставит задачу
+в очередь (utils.jobs) и сразу отвечает, а итог приходит сообщением.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.importer import ImportStats, bulk_insert_questions
+from db.models import Job, Option, Question, Test, TestQuestionLink, TestResult, User
+from db.snapshot import invalidate_test_snapshot
+from i18n.locales import get_text
+from keyboards.question import invalidate_question_views
+from utils.jobs import ACTIVE_STATUSES, JobError, job_handler, notify_job
+from utils.question_upload import open_upload, upload_error_text
+
+logger = logging.getLogger(__name__)
+
+# Виды задач
+JOB_IMPORT = 'import'
+JOB_EXPORT_RESULTS = 'export_results'
+JOB_DELETE_TEST = 'delete_test'
+JOB_DELETE_USERS = 'delete_users'
+
+# Подписи видов задач для /jobs
+JOB_TITLES = {
+    JOB_IMPORT: "Загрузка вопросов",
+    JOB_EXPORT_RESULTS: "Экспорт результатов",
+    JOB_DELETE_TEST: "Удаление теста",
+    JOB_DELETE_USERS: "Удаление пользователей",
+}
+
+# Сообщение с прогрессом загрузки обновляется не чаще, чем раз в столько записей
+IMPORT_PROGRESS_ROWS = 2000
+
+# Каталог загруженных файлов, ожидающих импорта
+UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "edutester-uploads")
+
+# Файлы без активной задачи удаляются через сутки
+UPLOAD_TTL = 24 * 3600
+
+
+async def download_upload(bot: Bot, file_id: str, file_ext: str) -> str:
+    """
+    Скачать файл из Telegram во временный каталог.
+
+    Файл записывается на диск по частям и не держится в памяти целиком.
+
+    Args:
+        bot: Экземпляр бота
+        file_id: file_id документа
+        file_ext: Расширение файла
+
+    Returns:
+        Путь к скачанному файлу
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}.{file_ext}")
+    file = await bot.get_file(file_id)
+    await bot.download_file(file.file_path, destination=path)
+    return path
+
+
+def remove_upload(path: Optional[str]) -> None:
+    """Удалить скачанный файл, если он есть."""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def cleanup_uploads(session: AsyncSession) -> None:
+    """
+    Удалить устаревшие файлы, не относящиеся к активным загрузкам.
+
+    Args:
+        session: Сессия БД
+    """
+    if not os.path.isdir(UPLOAD_DIR):
+        return
+    result = await session.execute(
+        select(Job.payload).where(Job.kind == JOB_IMPORT, Job.status.in_(ACTIVE_STATUSES))
+    )
+    keep = {json.loads(payload).get('path') for payload in result.scalars()}
+    deadline = time.time() - UPLOAD_TTL
+    for name in os.listdir(UPLOAD_DIR):
+        path = os.path.join(UPLOAD_DIR, name)
+        if path not in keep and os.path.getmtime(path) < deadline:
+            remove_upload(path)
+
+
+def _skip(iterator: Iterator, count: int) -> None:
+    """Пропустить count записей итератора."""
+    next(islice(iterator, count, count), None)
+
+
+def _progress_text(job: Job) -> str:
+    """Текст сообщения о ходе загрузки."""
+    total = f" из {job.total}" if job.total else ""
+    return f"⏳ Загрузка вопросов: {job.cursor}{total}"
+
+
+def _stats_text(stats: ImportStats) -> str:
+    """Итоги загрузки для сообщения."""
+    return (
+        f"📊 Загружено вопросов: {stats.inserted}"
+        + (f"\n🔗 Подключено из других тестов: {stats.linked}" if stats.linked else "")
+        + (f"\n♻️ Пропущено дубликатов: {stats.skipped}" if stats.skipped else "")
+    )
+
+
+@job_handler(JOB_IMPORT, limit=1)
+async def run_import(bot: Bot, session: AsyncSession, job: Job, payload: Dict[str, Any]) -> str:
+    """
+    Загрузить вопросы из файла (с продолжением с сохранённой пачки).
+
+    Каждая пачка сохраняется вместе с курсором задачи. При повторном
+    запуске источник читается заново, а уже сохранённые записи
+    пропускаются.
+
+    Payload: test_id, file_id, file_ext, path, dedupe, lang.
+    """
+    test_id = payload['test_id']
+    file_ext = payload['file_ext']
+    previous = ImportStats(*json.loads(job.result)) if job.result else ImportStats(0, 0, 0)
+    start = job.cursor or 0
+    next_progress = start + IMPORT_PROGRESS_ROWS
+
+    async def on_batch(stats: ImportStats) -> None:
+        nonlocal next_progress
+        job.cursor = start + stats.processed
+        job.result = json.dumps([before + now for before, now in zip(previous, stats)])
+        await session.commit()
+        if job.cursor >= next_progress:
+            next_progress = job.cursor + IMPORT_PROGRESS_ROWS
+            await notify_job(bot, job, _progress_text(job))
+
+    path = payload.get('path')
+    if not path or not os.path.exists(path):
+        path = await download_upload(bot, payload['file_id'], file_ext)
+        payload['path'] = path
+        job.payload = json.dumps(payload)
+        await session.commit()
+
+    await notify_job(bot, job, _progress_text(job))
+    try:
+        with open(path, 'rb') as source:
+            try:
+                records, _ = await asyncio.to_thread(open_upload, source, file_ext)
+                iterator = iter(records)
+                if start:
+                    await asyncio.to_thread(_skip, iterator, start)
+                await bulk_insert_questions(
+                    session, test_id, iterator, dedupe=payload['dedupe'], on_batch=on_batch
+                )
+            except Exception as e:
+                error = upload_error_text(e, file_ext)
+                if error is not None:
+                    raise JobError(error) from e
+                raise
+    finally:
+        invalidate_test_snapshot(test_id)
+
+    remove_upload(path)
+    stats = ImportStats(*json.loads(job.result)) if job.result else previous
+    return f"{get_text('upload_success', payload.get('lang', 'ru'))}\n\n{_stats_text(stats)}"
+
+
+def _results_workbook(data: List[Dict[str, Any]]) -> bytes:
+    """Сформировать .xlsx с результатами теста."""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        pd.DataFrame(data).to_excel(writer, sheet_name='Результаты', index=False)
+    return output.getvalue()
+
+
+@job_handler(JOB_EXPORT_RESULTS, limit=2)
+async def run_export_results(bot: Bot, session: AsyncSession, job: Job, payload: Dict[str, Any]) -> str:
+    """
+    Выгрузить результаты теста в Excel и отправить файл администратору.
+
+    Payload: test_id, lang.
+    """
+    test_id = payload['test_id']
+    lang = payload.get('lang', 'ru')
+
+    results = await session.execute(
+        select(TestResult, User.name, User.phone)
+        .join(User, TestResult.user_id == User.id)
+        .where(TestResult.test_id == test_id)
+    )
+    rows = results.all()
+    if not rows:
+        raise JobError(get_text("no_data_export", lang))
+
+    data = []
+    for result, name, phone in rows:
+        data.append({
+            'ID': result.id,
+            'ФИО': name,
+            'Телефон': phone,
+            'Баллы': result.score,
+            'Макс. балл': result.max_score,
+            'Процент': (result.score / result.max_score * 100) if result.max_score > 0 else 0,
+            'Начало': result.started_at.strftime("%d.%m.%Y %H:%M") if result.started_at else '',
+            'Завершение': result.completed_at.strftime("%d.%m.%Y %H:%M") if result.completed_at else '',
+            'Статус': 'Завершено' if result.completed_at else 'В процессе'
+        })
+
+    content = await asyncio.to_thread(_results_workbook, data)
+    await bot.send_document(
+        chat_id=job.chat_id,
+        document=BufferedInputFile(file=content, filename=f"results_test_{test_id}.xlsx"),
+        caption=get_text("export_caption", lang, test_id=test_id)
+    )
+    return f"✅ Экспорт результатов теста #{test_id} готов: {len(data)} строк."
+
+
+@job_handler(JOB_DELETE_TEST, limit=1)
+async def run_delete_test(bot: Bot, session: AsyncSession, job: Job, payload: Dict[str, Any]) -> str:
+    """
+    Удалить тест с вопросами, вариантами и результатами.
+
+    Вопросы, подключённые к другим тестам, передаются первому из них.
+
+    Payload: test_id.
+    """
+    test_id = payload['test_id']
+    test = await session.get(Test, test_id)
+    if not test:
+        raise JobError("Тест не найден")
+    title = test.title
+
+    # Подключения чужих вопросов к этому тесту просто удаляем
+    await session.execute(delete(TestQuestionLink).where(TestQuestionLink.test_id == test_id))
+
+    # Вопросы, подключённые к другим тестам, передаём первому из них
+    shared_result = await session.execute(
+        select(TestQuestionLink)
+        .join(Question, TestQuestionLink.question_id == Question.id)
+        .where(Question.test_id == test_id)
+        .order_by(TestQuestionLink.id)
+    )
+    new_owners = {}
+    for link in shared_result.scalars().all():
+        if link.question_id not in new_owners:
+            new_owners[link.question_id] = link
+    for question_id, link in new_owners.items():
+        await session.execute(
+            update(Question)
+            .where(Question.id == question_id)
+            .values(test_id=link.test_id, order_num=link.order_num)
+        )
+        await session.delete(link)
+
+    own_ids = select(Question.id).where(Question.test_id == test_id)
+    question_ids = list((await session.execute(own_ids)).scalars())
+    await session.execute(delete(Option).where(Option.question_id.in_(own_ids)))
+    await session.execute(delete(Question).where(Question.test_id == test_id))
+    await session.execute(delete(TestResult).where(TestResult.test_id == test_id))
+    await session.execute(delete(Test).where(Test.id == test_id))
+    await session.commit()
+
+    invalidate_test_snapshot(test_id)
+    for link in new_owners.values():
+        invalidate_test_snapshot(link.test_id)
+    invalidate_question_views(question_ids)
+    return f"🗑 Тест «{title}» удалён"
+
+
+@job_handler(JOB_DELETE_USERS, limit=1)
+async def run_delete_users(bot: Bot, session: AsyncSession, job: Job, payload: Dict[str, Any]) -> str:
+    """
+    Удалить всех пользователей (результаты тестов остаются без владельца).
+
+    Payload: lang.
+    """
+    await session.execute(update(TestResult).values(user_id=None))
+    result = await session.execute(delete(User))
+    await session.commit()
+    logger.info("Deleted %s users", result.rowcount)
+    return get_text("all_users_deleted", payload.get('lang', 'ru'))
@@ -0,0 +1,56 @@
+# utils/content_hash.py
+"""
+Хэш содержимого вопроса для поиска дубликатов.
+
+Хэшируется нормализованное содержимое: текст вопроса, тип, баллы,
+тема и набор вариантов с отметками правильности. Регистр, лишние
+пробелы и порядок вариантов на хэш не влияют.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Dict, Optional
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Нормализовать текст для сравнения.
+
+    Args:
+        text: Исходный текст
+
+    Returns:
+        Текст в NFKC без учёта регистра и с одиночными пробелами
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def question_hash(record: Dict) -> str:
+    """
+    Вычислить хэш содержимого вопроса.
+
+    Args:
+        record: Запись вопроса (text, type, points, topic, options)
+
+    Returns:
+        SHA-256 в шестнадцатеричном виде
+    """
+    options = sorted(
+        (normalize_text(option['text']), bool(option['is_correct']))
+        for option in record.get('options') or ()
+    )
+    payload = [
+        normalize_text(record['text']),
+        record.get('type') or 'single',
+        float(record.get('points') or 0),
+        normalize_text(record.get('topic')),
+        options,
+    ]
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
@@ -0,0 +1,152 @@
+# utils/docx_reader.py
+"""
+Потоковое чтение .docx без построения DOM документа.
+
+word/document.xml читается из zip-архива через iterparse. Абзацы
+и строки таблиц выдаются по мере разбора, обработанные элементы
+сразу удаляются из дерева, поэтому память не растёт с размером
+документа.
+"""
+import zipfile
+from typing import IO, BinaryIO, Iterator, List, NamedTuple, Union
+from xml.etree import ElementTree
+
+# Пространство имён WordprocessingML
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_BODY = W + "body"
+_PARAGRAPH = W + "p"
+_TABLE = W + "tbl"
+_ROW = W + "tr"
+_CELL = W + "tc"
+_RUN = W + "r"
+_RUN_PROPERTIES = W + "rPr"
+_BOLD = W + "b"
+_VAL = W + "val"
+_TEXT = W + "t"
+_TAB = W + "tab"
+_BREAKS = (W + "br", W + "cr")
+
+
+class DocxFormatError(ValueError):
+    """Архив не является документом .docx (нет word/document.xml)."""
+
+
+class Paragraph(NamedTuple):
+    """Абзац вне таблиц."""
+    text: str
+    bold: bool = False
+
+
+class TableRow(NamedTuple):
+    """Строка таблицы верхнего уровня."""
+    table_index: int
+    cells: List[str]
+
+
+def paragraph_text(paragraph: ElementTree.Element) -> str:
+    """
+    Собрать текст абзаца (как Paragraph.text в python-docx).
+
+    Args:
+        paragraph: Элемент w:p
+
+    Returns:
+        Текст абзаца
+    """
+    parts = []
+    for node in paragraph.iter():
+        tag = node.tag
+        if tag == _TEXT:
+            parts.append(node.text or "")
+        elif tag == _TAB:
+            parts.append("\t")
+        elif tag in _BREAKS:
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _run_is_bold(run: ElementTree.Element) -> bool:
+    """Выделен ли фрагмент абзаца жирным (w:b без w:val="0")."""
+    properties = run.find(_RUN_PROPERTIES)
+    bold = properties.find(_BOLD) if properties is not None else None
+    return bold is not None and bold.get(_VAL, "1").lower() not in ("0", "false", "off")
+
+
+def paragraph_is_bold(paragraph: ElementTree.Element) -> bool:
+    """
+    Выделен ли жирным весь видимый текст абзаца.
+
+    Args:
+        paragraph: Элемент w:p
+
+    Returns:
+        True, если все фрагменты с непробельным текстом жирные
+    """
+    has_text = False
+    for run in paragraph.iter(_RUN):
+        if not "".join(node.text or "" for node in run.iter(_TEXT)).strip():
+            continue
+        if not _run_is_bold(run):
+            return False
+        has_text = True
+    return has_text
+
+
+def cell_text(cell: ElementTree.Element) -> str:
+    """Текст ячейки таблицы: абзацы через перевод строки."""
+    return "\n".join(paragraph_text(paragraph) for paragraph in cell.iter(_PARAGRAPH))
+
+
+def _open_document(archive: zipfile.ZipFile) -> IO[bytes]:
+    """Открыть word/document.xml архива."""
+    try:
+        return archive.open("word/document.xml")
+    except KeyError as e:
+        raise DocxFormatError("в архиве нет word/document.xml") from e
+
+
+def iter_blocks(source: Union[str, BinaryIO]) -> Iterator[Union[Paragraph, TableRow]]:
+    """
+    Перебрать абзацы и строки таблиц документа в порядке следования.
+
+    Абзацы внутри таблиц входят в текст ячеек и отдельно не выдаются.
+
+    Args:
+        source: Путь к .docx или файловый объект
+
+    Yields:
+        Paragraph или TableRow
+
+    Raises:
+        DocxFormatError: В архиве нет word/document.xml
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+    with zipfile.ZipFile(source) as archive, _open_document(archive) as document:
+        body = None
+        tables: List[ElementTree.Element] = []
+        table_index = -1
+
+        for event, element in ElementTree.iterparse(document, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == _TABLE:
+                    tables.append(element)
+                    if len(tables) == 1:
+                        table_index += 1
+                elif tag == _BODY:
+                    body = element
+                continue
+
+            if tag == _PARAGRAPH and not tables:
+                yield Paragraph(paragraph_text(element), paragraph_is_bold(element))
+                body.clear()
+            elif tag == _ROW and len(tables) == 1:
+                yield TableRow(table_index, [cell_text(cell) for cell in element.iterfind(_CELL)])
+                tables[0].clear()
+            elif tag == _TABLE:
+                tables.pop()
+                if not tables:
+                    body.clear()
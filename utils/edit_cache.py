@@ -0,0 +1,133 @@
+# utils/edit_cache.py
+"""
+Подавление повторных редактирований сообщений.
+
+Для каждого чата запоминается отпечаток (текст + клавиатура) последней
+отрисовки сообщения. Если новая отрисовка совпадает с уже показанной,
+вызов edit_text к Bot API не выполняется.
+
+Все редактирования сообщений идут через edit_text_cached; код, который
+редактирует сообщение в обход кэша, должен вызвать forget_render,
+иначе следующее редактирование обратно к прежнему виду будет пропущено.
+"""
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+
+logger = logging.getLogger(__name__)
+
+# Максимальное количество запомненных сообщений
+EDIT_CACHE_SIZE = 10000
+
+_last_render: "OrderedDict[Tuple[int, int], Hashable]" = OrderedDict()
+
+# Счётчики редактирований
+edit_stats: Dict[str, int] = {
+    "requested": 0,     # всего запросов на редактирование
+    "sent": 0,          # выполнено вызовов edit_text
+    "suppressed": 0,    # пропущено локально (вызов API сэкономлен)
+    "not_modified": 0,  # Telegram ответил «message is not modified»
+}
+
+
+def render_fingerprint(text: str, reply_markup: Any = None, parse_mode: Optional[str] = None) -> Hashable:
+    """
+    Вычислить отпечаток отрисовки сообщения.
+
+    Args:
+        text: Текст сообщения
+        reply_markup: Клавиатура сообщения
+        parse_mode: Режим разметки
+
+    Returns:
+        Отпечаток — сам кортеж (текст, клавиатура, режим разметки), а не его
+        хэш, чтобы коллизия хэшей не приводила к пропуску редактирования
+    """
+    markup_key: Hashable = None
+    if isinstance(reply_markup, types.InlineKeyboardMarkup):
+        markup_key = tuple(
+            tuple((b.text, b.callback_data, b.url) for b in row)
+            for row in reply_markup.inline_keyboard
+        )
+    elif reply_markup is not None:
+        markup_key = repr(reply_markup)
+    return text, markup_key, parse_mode
+
+
+def remember_render(chat_id: int, message_id: int, fingerprint: Hashable) -> None:
+    """
+    Запомнить отпечаток последней отрисовки сообщения.
+
+    Args:
+        chat_id: ID чата
+        message_id: ID сообщения
+        fingerprint: Отпечаток отрисовки
+    """
+    key = (chat_id, message_id)
+    _last_render[key] = fingerprint
+    _last_render.move_to_end(key)
+    if len(_last_render) > EDIT_CACHE_SIZE:
+        _last_render.popitem(last=False)
+
+
+def forget_render(chat_id: int, message_id: int) -> None:
+    """
+    Забыть отрисовку сообщения, отредактированного в обход кэша.
+
+    Args:
+        chat_id: ID чата
+        message_id: ID сообщения
+    """
+    _last_render.pop((chat_id, message_id), None)
+
+
+async def edit_text_cached(
+    message: types.Message,
+    text: str,
+    reply_markup: Any = None,
+    fingerprint: Optional[Hashable] = None,
+    **kwargs: Any
+) -> bool:
+    """
+    Отредактировать сообщение, если его содержимое изменилось.
+
+    Ошибка «message is not modified» обрабатывается здесь же,
+    остальные TelegramBadRequest пробрасываются вызывающему коду.
+
+    Args:
+        message: Редактируемое сообщение
+        text: Новый текст
+        reply_markup: Новая клавиатура
+        fingerprint: Готовый отпечаток отрисовки (если вычислен заранее)
+        **kwargs: Дополнительные параметры edit_text
+
+    Returns:
+        True, если сообщение было отредактировано
+    """
+    if fingerprint is None:
+        fingerprint = render_fingerprint(text, reply_markup, kwargs.get("parse_mode"))
+
+    chat_id = message.chat.id
+    message_id = message.message_id
+    edit_stats["requested"] += 1
+
+    if _last_render.get((chat_id, message_id)) == fingerprint:
+        edit_stats["suppressed"] += 1
+        logger.debug("Edit suppressed locally for message %s in chat %s", message_id, chat_id)
+        return False
+
+    try:
+        await message.edit_text(text, reply_markup=reply_markup, **kwargs)
+    except TelegramBadRequest as e:
+        if 'message is not modified' in str(e).lower():
+            edit_stats["not_modified"] += 1
+            remember_render(chat_id, message_id, fingerprint)
+            return False
+        raise
+
+    edit_stats["sent"] += 1
+    remember_render(chat_id, message_id, fingerprint)
+    return True
@@ -0,0 +1,91 @@
+# utils/excel_template.py
+"""
+Шаблон Excel для загрузки вопросов.
+
+Файл шаблона строится один раз за время работы бота (openpyxl в режиме
+write_only, без pandas). После первой отправки Telegram возвращает
+file_id документа, и дальше шаблон отправляется по нему — без повторной
+передачи файла.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from openpyxl import Workbook
+
+from utils.table_import import OPTION_SEPARATOR, QUESTIONS_SHEET
+
+logger = logging.getLogger(__name__)
+
+# Имя файла шаблона
+TEMPLATE_FILENAME = 'template_questions.xlsx'
+
+# Строки шаблона: заголовок и пример вопроса
+TEMPLATE_ROWS = (
+    ('question', 'type', 'points', 'options'),
+    ('Пример вопроса', 'single', 1, OPTION_SEPARATOR.join(("*Правильный вариант", "Неправильный вариант"))),
+)
+
+# file_id отправленного шаблона по хэшу его содержимого
+_file_ids: Dict[str, str] = {}
+
+# Счётчики отправки шаблона
+template_stats: Dict[str, int] = {
+    "uploads": 0,   # шаблон отправлен файлом
+    "reused": 0,    # шаблон отправлен по file_id
+}
+
+
+@lru_cache(maxsize=1)
+def template_bytes() -> Tuple[bytes, str]:
+    """
+    Построить шаблон (один раз за время работы).
+
+    Returns:
+        Кортеж (содержимое .xlsx, sha256 содержимого)
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(QUESTIONS_SHEET)
+    for row in TEMPLATE_ROWS:
+        sheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    content = output.getvalue()
+    return content, hashlib.sha256(content).hexdigest()
+
+
+async def get_template() -> Tuple[bytes, str]:
+    """Получить шаблон; первое построение выполняется в отдельном потоке."""
+    if template_bytes.cache_info().currsize:
+        return template_bytes()
+    return await asyncio.to_thread(template_bytes)
+
+
+def template_file_id(content_hash: str) -> Optional[str]:
+    """
+    Получить file_id ранее отправленного шаблона.
+
+    Args:
+        content_hash: Хэш содержимого шаблона
+
+    Returns:
+        file_id или None, если шаблон ещё не отправлялся
+    """
+    return _file_ids.get(content_hash)
+
+
+def remember_file_id(content_hash: str, file_id: Optional[str]) -> None:
+    """
+    Запомнить file_id отправленного шаблона (None — забыть).
+
+    Args:
+        content_hash: Хэш содержимого шаблона
+        file_id: file_id документа из ответа Telegram
+    """
+    if file_id:
+        _file_ids[content_hash] = file_id
+    else:
+        _file_ids.pop(content_hash, None)
@@ -0,0 +1,62 @@
+# utils/import_report.py
+"""
+Отчёт о проверке импортируемых вопросов.
+
+Ошибки означают, что вопрос (строка) пропущен; предупреждения —
+что вопрос загружен, но, возможно, не так, как задумывал автор.
+Каждая запись привязана к месту в исходном файле (строка, абзац).
+"""
+from typing import List, NamedTuple, Optional
+
+
+class ReportEntry(NamedTuple):
+    """Запись отчёта."""
+    location: int
+    message: str
+
+
+class ImportReport:
+    """Ошибки и предупреждения, собранные при разборе файла."""
+
+    def __init__(self, location_label: str = "строка"):
+        """
+        Args:
+            location_label: Как называть место в файле (строка, абзац)
+        """
+        self.location_label = location_label
+        self.errors: List[ReportEntry] = []
+        self.warnings: List[ReportEntry] = []
+
+    def error(self, location: int, message: str) -> None:
+        """Добавить ошибку (вопрос пропущен)."""
+        self.errors.append(ReportEntry(location, message))
+
+    def warning(self, location: int, message: str) -> None:
+        """Добавить предупреждение."""
+        self.warnings.append(ReportEntry(location, message))
+
+    @property
+    def ok(self) -> bool:
+        """Нет ни ошибок, ни предупреждений."""
+        return not self.errors and not self.warnings
+
+    def summary(self, limit: Optional[int] = 10) -> str:
+        """
+        Сформировать текст отчёта для администратора.
+
+        Args:
+            limit: Максимум записей каждого вида в тексте (None — все)
+
+        Returns:
+            Текст отчёта (пустая строка, если замечаний нет)
+        """
+        lines = []
+        for title, entries in (("❌ Ошибки", self.errors), ("⚠️ Предупреждения", self.warnings)):
+            if not entries:
+                continue
+            lines.append(f"{title} ({len(entries)}):")
+            for entry in entries[:limit]:
+                lines.append(f"• {self.location_label} {entry.location}: {entry.message}")
+            if limit is not None and len(entries) > limit:
+                lines.append(f"• … и ещё {len(entries) - limit}")
+        return "\n".join(lines)
@@ -0,0 +1,455 @@
+# utils/jobs.py
+"""
+Очередь фоновых задач администратора.
+
+Задачи хранятся в таблице jobs и выполняются воркерами JobQueue
+в порядке приоритета. Одновременно выполняется не больше задач, чем
+воркеров, и не больше лимита для каждого вида задач. Упавшая задача
+повторяется с экспоненциальной задержкой до max_attempts раз;
+JobError означает ошибку, повторять которую бессмысленно.
+
+Исполнитель задачи может сохранять прогресс в job.cursor и job.result
+(коммитом сессии задачи): после повтора или перезапуска бота задача
+продолжается с места остановки. Ход и итог задачи показываются
+в сообщении job.message_id чата job.chat_id.
+"""
+import asyncio
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Job
+from db.session import async_session
+from utils.edit_cache import forget_render
+
+logger = logging.getLogger(__name__)
+
+# Статусы задач
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (JOB_PENDING, JOB_RUNNING)
+
+# Приоритеты (больше — раньше)
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+# Попыток выполнения по умолчанию
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Задержка перед первым повтором (секунды), далее удваивается
+RETRY_DELAY = 5.0
+
+# Как часто воркер проверяет отложенные задачи (секунды)
+POLL_INTERVAL = 5.0
+
+# Исполнитель задачи: (bot, session, job, payload) -> текст итогового уведомления
+JobHandler = Callable[[Bot, AsyncSession, Job, Dict[str, Any]], Awaitable[Optional[str]]]
+
+_handlers: Dict[str, JobHandler] = {}
+_limits: Dict[str, int] = {}
+_queue: Optional["JobQueue"] = None
+
+# Счётчики выполнения задач
+job_stats: Dict[str, int] = {
+    "enqueued": 0,   # поставлено в очередь
+    "done": 0,       # выполнено
+    "retried": 0,    # отложено для повтора после ошибки
+    "failed": 0,     # завершилось ошибкой
+    "cancelled": 0,  # отменено администратором
+}
+
+
+class JobError(Exception):
+    """Ошибка задачи, которую не нужно повторять (например, неверный файл)."""
+
+
+def job_handler(kind: str, limit: Optional[int] = None) -> Callable[[JobHandler], JobHandler]:
+    """
+    Зарегистрировать исполнитель задач вида kind.
+
+    Args:
+        kind: Вид задачи
+        limit: Максимум одновременно выполняемых задач этого вида
+
+    Returns:
+        Декоратор
+    """
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        if limit:
+            _limits[kind] = limit
+        return handler
+    return decorator
+
+
+async def enqueue_job(
+    kind: str,
+    payload: Dict[str, Any],
+    priority: int = PRIORITY_NORMAL,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    total: Optional[int] = None,
+    chat_id: Optional[int] = None,
+    message_id: Optional[int] = None
+) -> int:
+    """
+    Поставить задачу в очередь.
+
+    Args:
+        kind: Вид задачи
+        payload: Параметры задачи (сериализуются в JSON)
+        priority: Приоритет
+        max_attempts: Сколько раз пытаться выполнить задачу
+        total: Объём работы, если известен (для прогресса)
+        chat_id: Чат для уведомлений
+        message_id: Сообщение, которое редактируется по ходу задачи
+
+    Returns:
+        ID задачи
+    """
+    async with async_session() as session:
+        job = Job(
+            kind=kind,
+            status=JOB_PENDING,
+            priority=priority,
+            payload=json.dumps(payload),
+            cursor=0,
+            total=total,
+            attempts=0,
+            max_attempts=max_attempts,
+            chat_id=chat_id,
+            message_id=message_id,
+        )
+        session.add(job)
+        await session.commit()
+        job_id = job.id
+
+    job_stats["enqueued"] += 1
+    if _queue is not None:
+        _queue.wake()
+    return job_id
+
+
+async def retry_job(job_id: int) -> bool:
+    """
+    Снова поставить в очередь задачу, завершившуюся ошибкой.
+
+    Args:
+        job_id: ID задачи
+
+    Returns:
+        True, если задача поставлена в очередь
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JOB_FAILED)
+            .values(status=JOB_PENDING, attempts=0, run_after=None, finished_at=None)
+        )
+        await session.commit()
+    if result.rowcount != 1:
+        return False
+    if _queue is not None:
+        _queue.wake()
+    return True
+
+
+async def cancel_job(job_id: int) -> Optional[Job]:
+    """
+    Отменить задачу. Сохранённый задачей прогресс остаётся в БД.
+
+    Args:
+        job_id: ID задачи
+
+    Returns:
+        Задача или None, если она не найдена либо уже завершена
+    """
+    if _queue is not None:
+        _queue.cancel(job_id)
+
+    async with async_session() as session:
+        job = await session.get(Job, job_id)
+        if job is None or job.status in (JOB_DONE, JOB_CANCELLED):
+            return None
+        job.status = JOB_CANCELLED
+        job.finished_at = datetime.utcnow()
+        await session.commit()
+    job_stats["cancelled"] += 1
+    return job
+
+
+async def list_jobs(limit: int = 10) -> List[Job]:
+    """
+    Получить активные и последние завершённые задачи.
+
+    Args:
+        limit: Сколько завершённых задач показать
+
+    Returns:
+        Список задач (сначала активные)
+    """
+    async with async_session() as session:
+        active = await session.execute(
+            select(Job)
+            .where(Job.status.in_(ACTIVE_STATUSES))
+            .order_by(func.coalesce(Job.priority, 0).desc(), Job.id)
+        )
+        finished = await session.execute(
+            select(Job)
+            .where(Job.status.notin_(ACTIVE_STATUSES))
+            .order_by(Job.id.desc())
+            .limit(limit)
+        )
+        return [*active.scalars().all(), *finished.scalars().all()]
+
+
+def retry_keyboard(job_id: int) -> InlineKeyboardMarkup:
+    """Кнопки для задачи, завершившейся ошибкой."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🔁 Продолжить", callback_data=f"resume_job_{job_id}")],
+        [InlineKeyboardButton(text="✖️ Отменить", callback_data=f"cancel_job_{job_id}")],
+    ])
+
+
+async def notify_job(
+    bot: Bot,
+    job: Job,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+) -> None:
+    """
+    Показать состояние задачи администратору.
+
+    Редактируется сообщение задачи; если его нет или оно удалено,
+    отправляется новое. Ошибки Telegram задачу не прерывают.
+
+    Args:
+        bot: Экземпляр бота
+        job: Задача
+        text: Текст сообщения
+        reply_markup: Клавиатура
+    """
+    if not job.chat_id:
+        return
+    try:
+        if job.message_id:
+            # Сообщение редактируется по chat_id/message_id, в обход кэша отрисовок
+            forget_render(job.chat_id, job.message_id)
+            try:
+                await bot.edit_message_text(
+                    text,
+                    chat_id=job.chat_id,
+                    message_id=job.message_id,
+                    reply_markup=reply_markup
+                )
+                return
+            except TelegramBadRequest as e:
+                if 'message is not modified' in str(e).lower():
+                    return
+                logger.debug("Cannot edit message of job %s: %s", job.id, e)
+        await bot.send_message(job.chat_id, text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        logger.warning("Cannot notify about job %s: %s", job.id, e)
+
+
+class JobQueue:
+    """Воркеры, выполняющие задачи из таблицы jobs."""
+
+    def __init__(self, bot: Bot, concurrency: int = 2):
+        """
+        Args:
+            bot: Экземпляр бота (для уведомлений и отправки файлов)
+            concurrency: Количество воркеров
+        """
+        self.bot = bot
+        self.concurrency = max(1, concurrency)
+        self._workers: List[asyncio.Task] = []
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._running_kinds: Counter = Counter()
+        self._claim_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+
+    async def start(self) -> int:
+        """
+        Запустить воркеры.
+
+        Задачи, выполнявшиеся при прошлой остановке бота, снова ставятся
+        в очередь и продолжаются с сохранённого прогресса.
+
+        Returns:
+            Количество возобновлённых задач
+        """
+        global _queue
+
+        async with async_session() as session:
+            result = await session.execute(
+                update(Job).where(Job.status == JOB_RUNNING).values(status=JOB_PENDING)
+            )
+            await session.commit()
+        if result.rowcount:
+            logger.info("Resuming %s interrupted jobs", result.rowcount)
+
+        _queue = self
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{number}")
+            for number in range(self.concurrency)
+        ]
+        return result.rowcount
+
+    async def stop(self) -> None:
+        """Остановить воркеры; прерванные задачи продолжатся при следующем запуске."""
+        global _queue
+
+        if _queue is self:
+            _queue = None
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def wake(self) -> None:
+        """Сообщить воркерам о новой задаче."""
+        self._wakeup.set()
+
+    def cancel(self, job_id: int) -> bool:
+        """Прервать выполняемую задачу."""
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    @property
+    def running(self) -> int:
+        """Количество выполняемых задач."""
+        return len(self._tasks)
+
+    async def _worker(self) -> None:
+        """Брать задачи из очереди и выполнять их."""
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self._claim()
+            except Exception as e:
+                logger.exception("Cannot claim a job: %s", e)
+                claimed = None
+
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, kind = claimed
+            task = asyncio.create_task(self._execute(job_id))
+            self._tasks[job_id] = task
+            try:
+                await asyncio.wait([task])
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._tasks.pop(job_id, None)
+                self._running_kinds[kind] -= 1
+                # Освободился слот вида задач — задачу могут взять другие воркеры
+                self._wakeup.set()
+
+    async def _claim(self) -> Optional[Tuple[int, str]]:
+        """Занять следующую задачу с учётом приоритета и лимитов."""
+        async with self._claim_lock:
+            saturated = [kind for kind, limit in _limits.items() if self._running_kinds[kind] >= limit]
+            query = (
+                select(Job.id, Job.kind)
+                .where(
+                    Job.status == JOB_PENDING,
+                    (Job.run_after.is_(None)) | (Job.run_after <= datetime.utcnow())
+                )
+                .order_by(func.coalesce(Job.priority, 0).desc(), Job.id)
+                .limit(1)
+            )
+            if saturated:
+                query = query.where(Job.kind.notin_(saturated))
+
+            async with async_session() as session:
+                row = (await session.execute(query)).first()
+                if row is None:
+                    return None
+                # Условный UPDATE: задачу не возьмут дважды и другие процессы
+                result = await session.execute(
+                    update(Job)
+                    .where(Job.id == row.id, Job.status == JOB_PENDING)
+                    .values(status=JOB_RUNNING, attempts=func.coalesce(Job.attempts, 0) + 1)
+                )
+                await session.commit()
+            if result.rowcount != 1:
+                return None
+            self._running_kinds[row.kind] += 1
+            return row.id, row.kind
+
+    async def _execute(self, job_id: int) -> None:
+        """Выполнить задачу и записать результат."""
+        async with async_session() as session:
+            job = await session.get(Job, job_id)
+            if job is None:
+                return
+            payload = json.loads(job.payload or '{}')
+            handler = _handlers.get(job.kind)
+            try:
+                if handler is None:
+                    raise JobError(f"неизвестный вид задачи «{job.kind}»")
+                text = await handler(self.bot, session, job, payload)
+                job.status = JOB_DONE
+                job.error = None
+                job.finished_at = datetime.utcnow()
+                await session.commit()
+            except asyncio.CancelledError:
+                await session.rollback()
+                raise
+            except Exception as e:
+                await session.rollback()
+                await session.refresh(job)
+                self._fail(job, e)
+                await session.commit()
+                if job.status == JOB_FAILED:
+                    await notify_job(
+                        self.bot,
+                        job,
+                        f"⚠️ Задача #{job.id} не выполнена: {job.error}",
+                        retry_keyboard(job.id)
+                    )
+                return
+
+        job_stats["done"] += 1
+        logger.info("Job %s (%s) done", job_id, job.kind)
+        if text:
+            await notify_job(self.bot, job, text)
+
+    def _fail(self, job: Job, error: Exception) -> None:
+        """Отложить задачу для повтора или отметить её как упавшую."""
+        job.error = str(error) or type(error).__name__
+        attempts = job.attempts or 1
+        if not isinstance(error, JobError) and attempts < (job.max_attempts or DEFAULT_MAX_ATTEMPTS):
+            delay = RETRY_DELAY * 2 ** (attempts - 1)
+            job.status = JOB_PENDING
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            job_stats["retried"] += 1
+            logger.warning("Job %s (%s) failed, retry in %.0f s: %s", job.id, job.kind, delay, error)
+            return
+
+        if not isinstance(error, JobError):
+            logger.error("Job %s (%s) failed: %s", job.id, job.kind, error, exc_info=error)
+        job.status = JOB_FAILED
+        job.finished_at = datetime.utcnow()
+        job_stats["failed"] += 1
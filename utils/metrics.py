@@ -0,0 +1,237 @@
+# utils/metrics.py
+"""
+Метрики бота в формате Prometheus.
+
+Реестр хранит счётчики и гистограммы в памяти процесса; запись
+в них — несколько операций со словарём. Значения, которые дёшево
+вычислить в момент опроса (размер хранилища FSM, занятость пула
+соединений, активные таймеры), собираются функциями-коллекторами.
+Эндпоинт /metrics отдаётся встроенным HTTP-сервером aiohttp.
+"""
+import contextvars
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержки (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Границы корзин гистограммы числа SQL-запросов на обновление
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    """Отформатировать метки в синтаксисе Prometheus."""
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Монотонный счётчик с метками."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels.items())
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами и метками."""
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        # метки -> [счётчики корзин..., +Inf, сумма]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels.items())
+        counts = self._values.get(key)
+        if counts is None:
+            counts = self._values[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket = _format_labels(labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            cumulative += counts[-2]
+            bucket = _format_labels(labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+# Метрики обновлений и обработчиков
+updates_total = Counter("bot_updates_total", "Processed updates by type")
+update_errors_total = Counter("bot_update_errors_total", "Updates that raised an exception, by type")
+update_seconds = Histogram("bot_update_seconds", "Update processing time by type")
+handler_seconds = Histogram("bot_handler_seconds", "Handler execution time by router and handler")
+handler_errors_total = Counter("bot_handler_errors_total", "Handler exceptions by router and handler")
+
+# Метрики базы данных
+db_queries_total = Counter("bot_db_queries_total", "Executed SQL statements")
+db_query_seconds = Histogram("bot_db_query_seconds", "SQL statement execution time")
+db_queries_per_update = Histogram(
+    "bot_db_queries_per_update", "SQL statements executed while handling one update", QUERY_BUCKETS
+)
+db_seconds_per_update = Histogram("bot_db_seconds_per_update", "SQL time spent while handling one update")
+
+_registry = [
+    updates_total, update_errors_total, update_seconds, handler_seconds, handler_errors_total,
+    db_queries_total, db_query_seconds, db_queries_per_update, db_seconds_per_update,
+]
+
+# Коллекторы: имя метрики -> (тип, описание, функция, возвращающая значение)
+_collectors: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+
+# Счётчики текущего обновления: [число запросов, время запросов]
+update_db_usage: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "update_db_usage", default=None
+)
+
+
+def register_gauge(name: str, documentation: str, collect: Callable[[], float]) -> None:
+    """
+    Зарегистрировать метрику, значение которой вычисляется при опросе.
+
+    Args:
+        name: Имя метрики
+        documentation: Описание
+        collect: Функция, возвращающая текущее значение
+    """
+    _collectors[name] = ("gauge", documentation, collect)
+
+
+def register_counter(name: str, documentation: str, collect: Callable[[], float]) -> None:
+    """
+    Зарегистрировать монотонный счётчик, значение которого читается при опросе.
+
+    Args:
+        name: Имя метрики (с суффиксом _total)
+        documentation: Описание
+        collect: Функция, возвращающая текущее значение
+    """
+    _collectors[name] = ("counter", documentation, collect)
+
+
+def render_metrics() -> str:
+    """Сформировать ответ /metrics в текстовом формате Prometheus."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.expose())
+    for name, (kind, documentation, collect) in _collectors.items():
+        try:
+            value = collect()
+        except Exception:
+            logger.exception("Metric collector %s failed", name)
+            continue
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Подключить учёт SQL-запросов и занятости пула соединений.
+
+    Args:
+        engine: Асинхронный движок SQLAlchemy
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_queries_total.inc()
+        db_query_seconds.observe(elapsed)
+        usage = update_db_usage.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        # Упавший запрос не доходит до after_cursor_execute
+        conn = exception_context.connection
+        starts = conn.info.get("query_start") if conn is not None else None
+        if starts:
+            starts.pop()
+
+    pool = sync_engine.pool
+    if hasattr(pool, "checkedout"):
+        register_gauge("bot_db_pool_checked_out", "Connections checked out of the pool", pool.checkedout)
+    if hasattr(pool, "size"):
+        register_gauge("bot_db_pool_size", "Configured connection pool size", pool.size)
+
+
+def register_stats(prefix: str, stats: Dict[str, int], documentation: str) -> None:
+    """
+    Опубликовать словарь счётчиков модуля (edit_stats, view_stats и т.п.).
+
+    Значения словарей только растут, поэтому публикуются как counter
+    с суффиксом _total (например, bot_jobs_done_total).
+
+    Args:
+        prefix: Префикс имён метрик
+        stats: Словарь счётчиков
+        documentation: Описание группы
+    """
+    for key in stats:
+        register_counter(f"{prefix}_{key}_total", f"{documentation}: {key}", lambda key=key: stats[key])
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """
+    Запустить HTTP-сервер с эндпоинтом /metrics.
+
+    Args:
+        host: Адрес прослушивания
+        port: Порт
+
+    Returns:
+        AppRunner (для остановки через cleanup)
+    """
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Metrics endpoint listening on http://%s:%s/metrics", host, port)
+    return runner
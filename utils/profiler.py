@@ -0,0 +1,107 @@
+# utils/profiler.py
+"""
+Профилирование работающего бота по требованию.
+
+StackSampler — фоновый поток, который через равные интервалы снимает
+стеки всех потоков процесса (sys._current_frames) и считает одинаковые
+стеки. Результат выводится в формате «folded stacks»
+(кадр;кадр;кадр количество), который понимают flamegraph.pl,
+speedscope и inferno.
+
+Пока профилирование выключено, поток не запущен и обработка
+обновлений не меняется: middleware для счёта обновлений
+регистрируется только на время сеанса.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+# Интервал между снимками стеков (секунды)
+SAMPLE_INTERVAL = 0.005
+
+# Максимальная глубина стека в снимке
+MAX_STACK_DEPTH = 128
+
+
+class StackSampler:
+    """Семплирующий профилировщик стеков всех потоков."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Запустить поток семплирования."""
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановить поток семплирования и дождаться его завершения."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.monotonic()
+
+    @property
+    def duration(self) -> float:
+        """Длительность сеанса в секундах."""
+        return (self.stopped_at or time.monotonic()) - self.started_at
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.stacks[self._fold(names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _fold(thread_name: str, frame) -> str:
+        """Свернуть стек в строку «поток;внешний кадр;...;внутренний кадр»."""
+        frames = []
+        while frame is not None and len(frames) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+    def folded(self) -> str:
+        """Результат в формате folded stacks."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class UpdateCountdownMiddleware(BaseMiddleware):
+    """Вызывает on_done после обработки заданного числа обновлений."""
+
+    def __init__(self, updates: int, on_done: Callable[[], Any]):
+        self.remaining = updates
+        self.on_done = on_done
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        try:
+            return await handler(event, data)
+        finally:
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.on_done()
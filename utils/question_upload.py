@@ -0,0 +1,116 @@
+# utils/question_upload.py
+"""
+Чтение загруженных файлов с вопросами.
+
+Файл любого поддерживаемого формата (Excel, CSV, JSON Lines, Word)
+открывается как последовательность записей вопросов в формате
+WordTestParser.get_questions_as_db_format() и отчёт о проверке.
+Порядок записей детерминирован, поэтому прерванную загрузку можно
+продолжить, пропустив уже сохранённые записи.
+"""
+import csv
+import zipfile
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+from xml.etree import ElementTree
+
+from openpyxl.utils.exceptions import InvalidFileException
+
+from utils.docx_reader import DocxFormatError
+from utils.import_report import ImportReport
+from utils.table_import import (
+    ImportFormatError,
+    iter_csv_records,
+    iter_excel_records,
+    iter_jsonl_records,
+    iter_table_records,
+)
+from utils.word_parser import WordTestParser
+
+# Потоковые читатели табличных форматов по расширению файла
+TABLE_READERS = {
+    'xlsx': iter_excel_records,
+    'csv': iter_csv_records,
+    'jsonl': iter_jsonl_records,
+    'ndjson': iter_jsonl_records,
+}
+
+# Все поддерживаемые расширения
+UPLOAD_EXTENSIONS = (*TABLE_READERS, 'docx')
+
+# Устаревшие форматы: расширение -> формат, в котором нужно сохранить файл
+LEGACY_EXTENSIONS = {
+    'doc': 'docx',
+    'xls': 'xlsx',
+}
+
+
+def open_upload(source: BinaryIO, file_ext: str) -> Tuple[Iterable[Dict], ImportReport]:
+    """
+    Открыть загруженный файл как источник записей вопросов.
+
+    Табличные форматы читаются лениво. Документ Word разбирается
+    целиком: сначала проверяется первая таблица (колонки question,
+    type, points, options), затем текстовый формат.
+
+    Args:
+        source: Файловый объект
+        file_ext: Расширение файла
+
+    Returns:
+        Кортеж (записи вопросов, отчёт о проверке)
+    """
+    if file_ext in TABLE_READERS:
+        report = ImportReport()
+        return TABLE_READERS[file_ext](source, report), report
+
+    parser = WordTestParser(source)
+    parser.parse()
+    if parser.table_rows:
+        report = ImportReport()
+        try:
+            records = list(iter_table_records(parser.table_rows, report))
+        except ImportFormatError:
+            records = []
+        if records:
+            return records, report
+    return parser.get_questions_as_db_format(), parser.report
+
+
+def validate_upload(path: str, file_ext: str) -> Tuple[int, ImportReport]:
+    """
+    Проверить файл без записи в БД.
+
+    Args:
+        path: Путь к файлу
+        file_ext: Расширение файла
+
+    Returns:
+        Кортеж (количество вопросов к загрузке, отчёт о проверке)
+    """
+    with open(path, 'rb') as source:
+        records, report = open_upload(source, file_ext)
+        return sum(1 for _ in records), report
+
+
+def upload_error_text(error: Exception, file_ext: str) -> Optional[str]:
+    """
+    Описать ошибку чтения файла для администратора.
+
+    Args:
+        error: Исключение
+        file_ext: Расширение файла
+
+    Returns:
+        Текст ошибки или None, если ошибка не связана с форматом файла
+    """
+    if isinstance(error, ImportFormatError):
+        return str(error)
+    if isinstance(error, UnicodeDecodeError):
+        return "файл должен быть в кодировке UTF-8"
+    if isinstance(error, (zipfile.BadZipFile, InvalidFileException, DocxFormatError, ElementTree.ParseError)):
+        if file_ext == 'docx':
+            return "файл не является документом .docx"
+        return "файл не является книгой .xlsx"
+    if isinstance(error, csv.Error):
+        return f"некорректный CSV ({error})"
+    return None
@@ -0,0 +1,85 @@
+# utils/sampling.py
+"""
+Выборка вопросов из банка для отдельной попытки.
+
+Выборка выполняется по снимку теста в памяти: случайные позиции
+выбираются за O(k) без сортировки всей таблицы в БД.
+"""
+import random
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Поддерживаемые режимы выборки
+SAMPLING_MODES = (None, "random", "topic", "points")
+
+
+def pack_ids(question_ids: Sequence[int]) -> bytes:
+    """Упаковать ID вопросов для хранения в TestResult.question_ids."""
+    return array("I", question_ids).tobytes()
+
+
+def unpack_ids(packed: Optional[bytes]) -> List[int]:
+    """Распаковать ID вопросов из TestResult.question_ids."""
+    if not packed:
+        return []
+    values = array("I")
+    values.frombytes(packed)
+    return values.tolist()
+
+
+def _allocate(sizes: Dict[object, int], count: int) -> Dict[object, int]:
+    """
+    Распределить количество вопросов между группами пропорционально их размеру.
+
+    Используется метод наибольших остатков; квота группы не превышает её размер.
+
+    Args:
+        sizes: Размеры групп
+        count: Сколько вопросов нужно выбрать
+
+    Returns:
+        Количество вопросов для каждой группы
+    """
+    total = sum(sizes.values())
+    quotas = {key: size * count / total for key, size in sizes.items()}
+    allocation = {key: min(int(quota), sizes[key]) for key, quota in quotas.items()}
+
+    remaining = count - sum(allocation.values())
+    by_remainder = sorted(sizes, key=lambda key: quotas[key] - int(quotas[key]), reverse=True)
+    while remaining > 0:
+        progressed = False
+        for key in by_remainder:
+            if remaining == 0:
+                break
+            if allocation[key] < sizes[key]:
+                allocation[key] += 1
+                remaining -= 1
+                progressed = True
+        if not progressed:
+            break
+    return allocation
+
+
+def sample_positions(
+    strata: Dict[object, Tuple[int, ...]],
+    count: int,
+    seed: int
+) -> List[int]:
+    """
+    Выбрать позиции вопросов из групп банка.
+
+    Args:
+        strata: Позиции вопросов по группам (одна группа — простая выборка)
+        count: Сколько вопросов нужно выбрать
+        seed: Зерно выборки
+
+    Returns:
+        Отсортированный список выбранных позиций
+    """
+    rng = random.Random(seed)
+    allocation = _allocate({key: len(positions) for key, positions in strata.items()}, count)
+    chosen = []
+    for key, positions in strata.items():
+        chosen.extend(rng.sample(positions, allocation[key]))
+    chosen.sort()
+    return chosen
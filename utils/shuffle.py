@@ -0,0 +1,50 @@
+# utils/shuffle.py
+"""
+Детерминированное перемешивание вопросов и вариантов ответа.
+
+Порядок полностью определяется зерном попытки, поэтому его не нужно
+хранить: достаточно одного числа TestResult.shuffle_seed.
+"""
+import random
+import secrets
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+
+def new_seed() -> int:
+    """Сгенерировать зерно перемешивания для новой попытки."""
+    return secrets.randbits(31) or 1
+
+
+def shuffled_order(question_ids: Sequence[int], seed: int) -> List[int]:
+    """
+    Перемешать вопросы теста.
+
+    Args:
+        question_ids: ID вопросов в исходном порядке
+        seed: Зерно попытки
+
+    Returns:
+        ID вопросов в порядке показа
+    """
+    order = list(question_ids)
+    random.Random(seed).shuffle(order)
+    return order
+
+
+@lru_cache(maxsize=8192)
+def option_permutation(seed: int, question_id: int, count: int) -> Tuple[int, ...]:
+    """
+    Получить порядок показа вариантов ответа.
+
+    Args:
+        seed: Зерно попытки
+        question_id: ID вопроса
+        count: Количество вариантов
+
+    Returns:
+        Кортеж индексов вариантов (в исходном порядке по ID) для каждой позиции
+    """
+    permutation = list(range(count))
+    random.Random(seed * 1000003 + question_id).shuffle(permutation)
+    return tuple(permutation)
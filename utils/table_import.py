@@ -0,0 +1,306 @@
+# utils/table_import.py
+"""
+Импорт вопросов из табличных файлов.
+
+Строка таблицы (Excel, CSV, таблица Word) или объект JSON Lines
+с колонками question, type, points, options, topic превращается
+в запись вопроса в формате WordTestParser.get_questions_as_db_format().
+Колонки сопоставляются с заголовком один раз; строки читаются лениво,
+замечания по строкам собираются в ImportReport.
+"""
+import codecs
+import csv
+import json
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Sequence
+
+from openpyxl import load_workbook
+
+from utils.import_report import ImportReport
+
+# Допустимые типы вопросов
+QUESTION_TYPES = ('single', 'multiple', 'text')
+
+# Колонки таблицы вопросов (question может называться text)
+COLUMNS = ('question', 'type', 'points', 'options', 'topic')
+
+# Разделитель вариантов ответа в колонке options
+OPTION_SEPARATOR = '||'
+
+# Лист Excel с вопросами (если его нет — первый лист)
+QUESTIONS_SHEET = 'Questions'
+
+# Баллы по умолчанию
+DEFAULT_POINTS = 1.0
+
+# Допустимые разделители колонок CSV
+CSV_DELIMITERS = ',;\t'
+
+
+class ImportFormatError(ValueError):
+    """Файл не соответствует формату импорта (например, нет колонки question)."""
+
+
+def map_columns(header: Sequence[Any]) -> Dict[str, int]:
+    """
+    Сопоставить колонки формата с позициями в заголовке.
+
+    Args:
+        header: Значения строки заголовка
+
+    Returns:
+        Словарь «колонка -> индекс»
+
+    Raises:
+        ImportFormatError: Нет колонки question (или text)
+    """
+    positions = {}
+    for index, value in enumerate(header):
+        name = str(value).strip().lower() if value is not None else ''
+        if name == 'text':
+            name = 'question'
+        if name in COLUMNS and name not in positions:
+            positions[name] = index
+    if 'question' not in positions:
+        raise ImportFormatError("Отсутствует обязательная колонка 'question'")
+    return positions
+
+
+def _cell(row: Sequence[Any], positions: Dict[str, int], column: str) -> str:
+    """Значение колонки строки в виде очищенной строки."""
+    index = positions.get(column)
+    if index is None or index >= len(row) or row[index] is None:
+        return ''
+    value = row[index]
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def record_from_row(
+    row: Sequence[Any],
+    positions: Dict[str, int],
+    order_num: int,
+    location: int,
+    report: ImportReport
+) -> Optional[Dict]:
+    """
+    Преобразовать строку таблицы в запись вопроса.
+
+    Args:
+        row: Значения ячеек строки
+        positions: Сопоставление колонок (map_columns)
+        order_num: Порядковый номер вопроса
+        location: Номер строки в файле (для отчёта)
+        report: Отчёт о проверке
+
+    Returns:
+        Запись вопроса или None, если строка пустая или с ошибкой
+
+    Ошибки (строка пропускается): нет текста вопроса, неизвестный тип,
+    у вопроса с выбором нет вариантов или не отмечен правильный.
+    """
+    text = _cell(row, positions, 'question')
+    if not text:
+        if any(value not in (None, '') for value in row):
+            report.error(location, "нет текста вопроса")
+        return None
+
+    question_type = _cell(row, positions, 'type').lower() or 'single'
+    if question_type not in QUESTION_TYPES:
+        report.error(location, f"неизвестный тип «{question_type}» (допустимы: {', '.join(QUESTION_TYPES)})")
+        return None
+
+    points_raw = _cell(row, positions, 'points')
+    try:
+        points = float(points_raw.replace(',', '.')) if points_raw else DEFAULT_POINTS
+    except ValueError:
+        report.warning(location, f"баллы «{points_raw}» не число, использовано {DEFAULT_POINTS}")
+        points = DEFAULT_POINTS
+
+    options = []
+    for raw_option in _cell(row, positions, 'options').split(OPTION_SEPARATOR):
+        option = raw_option.strip()
+        if not option:
+            continue
+        is_correct = option.startswith('*')
+        options.append({'text': option.lstrip('*').strip() if is_correct else option, 'is_correct': is_correct})
+
+    if question_type != 'text':
+        if not options:
+            report.error(location, "нет вариантов ответа")
+            return None
+        correct = sum(option['is_correct'] for option in options)
+        if not correct:
+            report.error(location, "правильный ответ не отмечен «*»")
+            return None
+        if len(options) == 1:
+            report.warning(location, "только один вариант ответа")
+        if question_type == 'single' and correct > 1:
+            report.warning(location, "несколько правильных ответов, тип изменён на multiple")
+            question_type = 'multiple'
+
+    return {
+        'text': text,
+        'type': question_type,
+        'points': points,
+        'order_num': order_num,
+        'topic': _cell(row, positions, 'topic') or None,
+        'options': options,
+    }
+
+
+def iter_table_records(rows: Iterable[Sequence[Any]], report: ImportReport, first_line: int = 1) -> Iterator[Dict]:
+    """
+    Перебрать записи вопросов таблицы с заголовком в первой строке.
+
+    Args:
+        rows: Строки таблицы (первая — заголовок)
+        report: Отчёт о проверке
+        first_line: Номер первой строки в файле
+
+    Yields:
+        Записи вопросов
+
+    Raises:
+        ImportFormatError: Таблица пустая или без колонки question
+    """
+    iterator = iter(rows)
+    header = next(iterator, None)
+    if header is None:
+        raise ImportFormatError("Таблица пустая")
+    positions = map_columns(header)
+
+    order_num = 0
+    for line, row in enumerate(iterator, first_line + 1):
+        record = record_from_row(row, positions, order_num + 1, line, report)
+        if record:
+            order_num += 1
+            yield record
+
+
+def iter_excel_records(source: BinaryIO, report: ImportReport) -> Iterator[Dict]:
+    """
+    Потоково прочитать вопросы из .xlsx (openpyxl, read_only).
+
+    Берётся лист Questions, а если его нет — первый лист.
+
+    Args:
+        source: Файловый объект .xlsx
+        report: Отчёт о проверке
+
+    Yields:
+        Записи вопросов
+
+    Raises:
+        ImportFormatError: Архив не является книгой .xlsx
+    """
+    source.seek(0)
+    try:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+    except KeyError as e:
+        # openpyxl сообщает об отсутствующей части архива через KeyError
+        raise ImportFormatError("файл не является книгой .xlsx") from e
+    try:
+        if QUESTIONS_SHEET in workbook.sheetnames:
+            sheet = workbook[QUESTIONS_SHEET]
+        else:
+            sheet = workbook.worksheets[0]
+        yield from iter_table_records(sheet.iter_rows(values_only=True), report)
+    finally:
+        workbook.close()
+
+
+def _text_lines(source: BinaryIO) -> Iterator[str]:
+    """Построчно декодировать файл из UTF-8 (BOM допускается)."""
+    source.seek(0)
+    return codecs.getreader('utf-8-sig')(source)
+
+
+def iter_csv_records(source: BinaryIO, report: ImportReport) -> Iterator[Dict]:
+    """
+    Потоково прочитать вопросы из CSV (UTF-8, заголовок в первой строке).
+
+    Разделитель (запятая, точка с запятой или табуляция) определяется
+    по строке заголовка. В отчёт попадает номер строки файла, с которой
+    начинается запись (ячейки в кавычках могут занимать несколько строк).
+
+    Args:
+        source: Файловый объект .csv
+        report: Отчёт о проверке
+
+    Yields:
+        Записи вопросов
+
+    Raises:
+        ImportFormatError: Файл пустой или без колонки question
+        UnicodeDecodeError: Файл не в кодировке UTF-8
+    """
+    lines = _text_lines(source)
+    header = next(lines, '')
+    if not header.strip():
+        raise ImportFormatError("Файл пустой")
+    try:
+        dialect = csv.Sniffer().sniff(header, delimiters=CSV_DELIMITERS)
+    except csv.Error:
+        dialect = csv.excel
+
+    def _all_lines() -> Iterator[str]:
+        yield header
+        yield from lines
+
+    reader = csv.reader(_all_lines(), dialect)
+    positions = map_columns(next(reader))
+
+    order_num = 0
+    line = reader.line_num + 1
+    for row in reader:
+        record = record_from_row(row, positions, order_num + 1, line, report)
+        if record:
+            order_num += 1
+            yield record
+        line = reader.line_num + 1
+
+
+def iter_jsonl_records(source: BinaryIO, report: ImportReport) -> Iterator[Dict]:
+    """
+    Потоково прочитать вопросы из JSON Lines (один объект на строку).
+
+    Ключи объекта совпадают с колонками таблицы. options — строка
+    в формате «*Правильный||Неправильный» или список строк
+    в том же формате.
+
+    Args:
+        source: Файловый объект .jsonl
+        report: Отчёт о проверке
+
+    Yields:
+        Записи вопросов
+    """
+    positions = {column: index for index, column in enumerate(COLUMNS)}
+    order_num = 0
+    for line_number, line in enumerate(_text_lines(source), 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            report.error(line_number, f"некорректный JSON ({e.msg})")
+            continue
+        if not isinstance(item, dict):
+            report.error(line_number, "ожидается объект JSON")
+            continue
+
+        options = item.get('options')
+        if isinstance(options, list):
+            options = OPTION_SEPARATOR.join(str(option) for option in options)
+        row = (
+            item.get('question', item.get('text')),
+            item.get('type'),
+            item.get('points'),
+            options,
+            item.get('topic'),
+        )
+        record = record_from_row(row, positions, order_num + 1, line_number, report)
+        if record:
+            order_num += 1
+            yield record
@@ -0,0 +1,230 @@
+# utils/tracing.py
+"""
+Трассировка обработки обновлений.
+
+На каждое обновление строится дерево спанов: корневой спан обновления,
+дочерние — обработчик, SQL-запросы и вызовы Bot API. Текущий спан
+хранится в contextvar, поэтому вложенность определяется автоматически
+(контекст передаётся и в greenlet SQLAlchemy).
+
+Решение о сохранении принимается после завершения обновления
+(tail sampling): сохраняется доля TRACE_SAMPLE_RATE всех трасс
+и все трассы дольше TRACE_SLOW_MS. Трассы записываются в файл
+JSON Lines; поля спанов повторяют OTLP/JSON (traceId, spanId,
+parentSpanId, startTimeUnixNano, ...).
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """Отрезок работы внутри трассы."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Завершить спан."""
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Представление спана в духе OTLP/JSON."""
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+        }
+        if self.error:
+            span["status"] = {"code": "ERROR", "message": self.error}
+        return span
+
+
+class Trace:
+    """Спаны одного обновления."""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Текущий спан или None вне трассы."""
+    return _current_span.get()
+
+
+def open_span(name: str, **attributes: Any) -> Optional[Span]:
+    """
+    Открыть дочерний спан текущего спана (без смены текущего).
+
+    Args:
+        name: Имя спана
+        **attributes: Атрибуты спана
+
+    Returns:
+        Span или None вне трассы
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    span = Span(parent.trace, name, parent.span_id, attributes)
+    parent.trace.spans.append(span)
+    return span
+
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Выполнить блок внутри дочернего спана.
+
+    Args:
+        name: Имя спана
+        **attributes: Атрибуты спана
+    """
+    span = open_span(name, **attributes)
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.end(e)
+        raise
+    else:
+        span.end()
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Начать новую трассу с корневым спаном.
+
+    Args:
+        name: Имя корневого спана
+        **attributes: Атрибуты корневого спана
+    """
+    trace = Trace()
+    root = Span(trace, name, None, attributes)
+    trace.spans.append(root)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.end(e)
+        raise
+    else:
+        root.end()
+    finally:
+        _current_span.reset(token)
+
+
+class JsonLinesExporter:
+    """Запись сохранённых трасс в файл JSON Lines."""
+
+    def __init__(self, path: str, sample_rate: float = 0.01, slow_ms: float = 1000.0):
+        """
+        Args:
+            path: Путь к файлу трасс
+            sample_rate: Доля сохраняемых трасс (0..1)
+            slow_ms: Трассы дольше этого порога сохраняются всегда
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_ns = int(slow_ms * 1_000_000)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, root: Span) -> bool:
+        """
+        Сохранить трассу, если она проходит семплирование.
+
+        Args:
+            root: Завершённый корневой спан
+
+        Returns:
+            True, если трасса записана
+        """
+        duration_ns = root.end_ns - root.start_ns
+        if duration_ns < self.slow_ns and random.random() >= self.sample_rate:
+            return False
+
+        line = json.dumps({
+            "traceId": root.trace.trace_id,
+            "name": root.name,
+            "durationMs": round(duration_ns / 1_000_000, 3),
+            "spans": [span.to_dict() for span in root.trace.spans],
+        }, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+        return True
+
+    def close(self) -> None:
+        """Закрыть файл трасс."""
+        with self._lock:
+            self._file.close()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Создавать спан на каждый SQL-запрос внутри трассы.
+
+    Args:
+        engine: Асинхронный движок SQLAlchemy
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        span = open_span("db.query", statement=statement[:200])
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info["trace_spans"].pop()
+        if span is not None:
+            span.attributes["rows"] = cursor.rowcount
+            span.end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            if span is not None:
+                span.end(exception_context.original_exception)
@@ -2,161 +2,257 @@
 """
 Парсер для извлечения тестов из Word документов.
 Поддерживает формат:
-1. Текст вопроса
-A) Вариант ответа 1
-B) Вариант ответа 2
-C) Вариант ответа 3
-D) Вариант ответа 4
+1. Текст вопроса [multiple] [points=2]
+   (продолжение текста вопроса)
+*A) Правильный вариант
+B) Вариант ответа
+c) + Ещё один правильный вариант
+4) Вариант ответа
+
+Варианты нумеруются буквами (A–Z, a–z) или числами со скобкой.
+Правильный вариант отмечается «*» или «+» перед номером или текстом
+либо жирным шрифтом всего абзаца. Теги в тексте вопроса:
+[single], [multiple], [text] — тип вопроса, [points=N] — баллы.
 """
 
 import re
-import io
-from typing import List, Dict, Tuple, Union
-from docx import Document
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+from utils.docx_reader import Paragraph, iter_blocks
+from utils.import_report import ImportReport
 
-class WordTestParser:
-    """Парсер тестов из Word документа."""
-    
-    def __init__(self, source: Union[str, io.BytesIO]):
+# Начало вопроса: «N. Текст вопроса»
+QUESTION_RE = re.compile(r'^(\d+)\.\s+(.*)$')
+
+# Вариант ответа: «A) Текст», «a) Текст», «1) Текст», с отметкой «*»/«+»
+OPTION_RE = re.compile(r'^([*+]\s*)?([A-Za-z]|\d{1,2})\)\s+([*+]\s*)?(.+)$')
+
+# Теги вопроса: [single], [multiple], [text], [points=N]
+TAG_RE = re.compile(r'\[\s*(single|multiple|text|points\s*=\s*(\d+(?:[.,]\d+)?))\s*\]', re.IGNORECASE)
+
+# Баллы по умолчанию
+DEFAULT_POINTS = 1.0
+
+
+class QuestionStreamParser:
+    """
+    Построчный разбор вопросов текстового формата.
+
+    Строки передаются по одной через feed(); вопрос возвращается,
+    как только начинается следующий вопрос (или при close()).
+    Замечания собираются в отчёт report; вопросы с ошибками
+    не возвращаются.
+    """
+
+    def __init__(self, report: Optional[ImportReport] = None):
         """
-        Инициализация парсера.
-        
         Args:
-            source: Путь к Word документу или BytesIO объект
+            report: Отчёт для ошибок и предупреждений
         """
-        if isinstance(source, str):
-            self.doc = Document(source)
-        elif isinstance(source, io.BytesIO):
-            source.seek(0)
-            self.doc = Document(source)
+        self.report = report if report is not None else ImportReport("абзац")
+        self._current: Optional[Dict] = None
+        self._line = 0
+        self._last_number = 0
+
+    def feed(self, raw_line: str, bold: bool = False) -> Optional[Dict]:
+        """
+        Обработать очередную строку.
+
+        Args:
+            raw_line: Строка (абзац) документа
+            bold: Абзац целиком выделен жирным
+
+        Returns:
+            Завершённый вопрос или None
+        """
+        self._line += 1
+        line = raw_line.strip()
+        if not line:
+            return None
+
+        match = QUESTION_RE.match(line)
+        if match:
+            finished = self.close()
+            self._start_question(int(match.group(1)), match.group(2))
+            return finished
+
+        current = self._current
+        if current is None:
+            return None
+
+        option_match = OPTION_RE.match(line)
+        if option_match and current['declared_type'] != 'text':
+            prefix_mark, label, text_mark, text = option_match.groups()
+            current['options'].append({
+                'letter': label,
+                'text': text.strip(),
+                'index': len(current['options']),
+                'is_correct': bool(prefix_mark or text_mark or bold),
+            })
+        elif current['options']:
+            self.report.warning(self._line, f"вопрос {current['number']}: строка не распознана и пропущена")
         else:
-            raise ValueError("source должен быть строкой или BytesIO")
-        
-        self.tests = []
-    
-    def parse(self) -> List[Dict]:
+            # Продолжение текста вопроса
+            current['text'] = f"{current['text']}\n{self._extract_tags(current, line)}".strip()
+        return None
+
+    def close(self) -> Optional[Dict]:
         """
-        Парсить весь документ и вернуть список тестов.
-        
+        Завершить и проверить текущий вопрос.
+
         Returns:
-            Список тестов с вопросами
+            Последний вопрос или None, если вопроса нет или в нём ошибка
         """
-        all_text = self._extract_paragraphs()
-        self.questions = self._parse_questions(all_text)
-        return self.questions
-    
-    def _extract_paragraphs(self) -> str:
-        """Извлечь весь текст из документа."""
-        text = ""
-        for para in self.doc.paragraphs:
-            if para.text.strip():
-                text += para.text + "\n"
-        return text
+        current, self._current = self._current, None
+        if current is None:
+            return None
+        return self._validate(current)
+
+    def _start_question(self, number: int, text: str) -> None:
+        """Начать новый вопрос."""
+        if self._last_number and number != self._last_number + 1:
+            self.report.warning(self._line, f"после вопроса {self._last_number} идёт вопрос {number}")
+        self._last_number = number
+        self._current = {
+            'number': number,
+            'text': '',
+            'type': 'single',
+            'declared_type': None,
+            'points': DEFAULT_POINTS,
+            'options': [],
+            'correct_index': 0,
+            '_line': self._line,
+        }
+        self._current['text'] = self._extract_tags(self._current, text)
+
+    def _extract_tags(self, question: Dict, text: str) -> str:
+        """Применить теги из строки к вопросу и вернуть текст без них."""
+        for match in TAG_RE.finditer(text):
+            tag = match.group(1).lower()
+            if match.group(2):
+                question['points'] = float(match.group(2).replace(',', '.'))
+            else:
+                question['declared_type'] = tag
+        return TAG_RE.sub('', text).strip()
+
+    def _validate(self, question: Dict) -> Optional[Dict]:
+        """Проверить вопрос, определить тип и правильные ответы."""
+        line = question.pop('_line')
+        number = question['number']
+        declared_type = question.pop('declared_type')
+        options = question['options']
+
+        if not question['text']:
+            self.report.error(line, f"вопрос {number}: нет текста вопроса")
+            return None
+
+        if declared_type == 'text':
+            question['type'] = 'text'
+            question['correct_index'] = None
+            return question
+
+        if not options:
+            self.report.error(line, f"вопрос {number}: нет вариантов ответа")
+            return None
+        if len(options) == 1:
+            self.report.warning(line, f"вопрос {number}: только один вариант ответа")
+
+        texts = [option['text'].lower() for option in options]
+        if len(set(texts)) != len(texts):
+            self.report.warning(line, f"вопрос {number}: есть одинаковые варианты ответа")
+
+        correct = [option['index'] for option in options if option['is_correct']]
+        if not correct:
+            self.report.warning(line, f"вопрос {number}: правильный ответ не отмечен, выбран первый вариант")
+            options[0]['is_correct'] = True
+            correct = [0]
+
+        if declared_type == 'single' and len(correct) > 1:
+            self.report.warning(line, f"вопрос {number}: несколько правильных ответов, тип изменён на multiple")
+            declared_type = 'multiple'
+
+        question['type'] = declared_type or ('multiple' if len(correct) > 1 else 'single')
+        question['correct_index'] = correct[0]
+        return question
+
+
+def iter_questions(lines: Iterable[str], report: Optional[ImportReport] = None) -> Iterator[Dict]:
+    """
+    Разобрать вопросы из последовательности строк (абзацев).
+
+    Args:
+        lines: Строки документа
+        report: Отчёт для ошибок и предупреждений
+
+    Yields:
+        Словарь с номером, текстом, типом, баллами и вариантами вопроса
+    """
+    parser = QuestionStreamParser(report)
+    for line in lines:
+        question = parser.feed(line)
+        if question:
+            yield question
+    question = parser.close()
+    if question:
+        yield question
+
+
+class WordTestParser:
+    """Парсер тестов из Word документа."""
     
-    def _parse_questions(self, text: str) -> List[Dict]:
+    def __init__(self, source: Union[str, BinaryIO]):
         """
-        Парсить вопросы из текста.
+        Инициализация парсера.
         
-        Формат:
-        N. Текст вопроса
-        A) Вариант 1
-        B) Вариант 2
-        C) Вариант 3
-        D) Вариант 4
+        Args:
+            source: Путь к Word документу или файловый объект (BytesIO, открытый файл)
         """
-        questions = []
-        lines = text.strip().split("\n")
+        if not isinstance(source, str) and not hasattr(source, 'read'):
+            raise ValueError("source должен быть путём или файловым объектом")
         
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Ищем начало вопроса (N. Текст)
-            if self._is_question_start(line):
-                question = self._extract_question(lines, i)
-                if question:
-                    questions.append(question)
-                    i += len(question.get('_lines_used', 1)) - 1
-            
-            i += 1
-        
-        return questions
+        self.source = source
+        self.questions = []
+        self.table_rows = []
+        self.report = ImportReport("абзац")
+    
+    def iter_paragraphs(self) -> Iterator[str]:
+        """Перебрать тексты абзацев документа (вне таблиц)."""
+        for block in iter_blocks(self.source):
+            if isinstance(block, Paragraph):
+                yield block.text
     
-    def _is_question_start(self, line: str) -> bool:
-        """Проверить, начинается ли строка с номера вопроса."""
-        pattern = r'^\d+\.\s+'
-        return bool(re.match(pattern, line))
+    def iter_questions(self) -> Iterator[Dict]:
+        """Перебрать вопросы документа по мере разбора."""
+        return iter_questions(self.iter_paragraphs(), self.report)
     
-    def _extract_question(self, lines: List[str], start_idx: int) -> Dict | None:
+    def parse(self) -> List[Dict]:
         """
-        Извлечь вопрос с вариантами ответа.
+        Разобрать документ за один проход.
+
+        Вопросы текстового формата собираются в self.questions,
+        строки первой таблицы — в self.table_rows, замечания —
+        в self.report.
         
-        Args:
-            lines: Список строк документа
-            start_idx: Индекс начала вопроса
-            
         Returns:
-            Словарь с вопросом и вариантами
+            Список вопросов с вариантами
         """
-        question_line = lines[start_idx].strip()
-        
-        # Извлекаем номер и текст вопроса
-        match = re.match(r'^(\d+)\.\s+(.+)$', question_line)
-        if not match:
-            return None
-        
-        question_num = int(match.group(1))
-        question_text = match.group(2)
-        
-        options = []
-        i = start_idx + 1
-        correct_index = None
-        
-        # Ищем варианты ответов
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Проверяем, является ли это вариантом ответа
-            option_match = re.match(r'^([A-D])\)\s+(.+)$', line)
-            
-            if option_match:
-                option_letter = option_match.group(1)
-                option_text = option_match.group(2)
-                
-                # Определяем индекс (A=0, B=1, C=2, D=3)
-                option_index = ord(option_letter) - ord('A')
-                
-                options.append({
-                    'letter': option_letter,
-                    'text': option_text,
-                    'index': option_index
-                })
-                
-                i += 1
-            elif self._is_question_start(line) or line == "":
-                # Конец текущего вопроса
-                break
-            else:
-                i += 1
-        
-        if not options:
-            return None
-        
-        # Первый вариант считаем правильным (как в примере документа)
-        correct_index = 0
-        
-        result = {
-            'number': question_num,
-            'text': question_text,
-            'type': 'single',  # По умолчанию один правильный ответ
-            'points': 1.0,
-            'options': options,
-            'correct_index': correct_index,
-            '_lines_used': i - start_idx
-        }
-        
-        return result
+        self.report = ImportReport("абзац")
+        parser = QuestionStreamParser(self.report)
+        self.questions = []
+        self.table_rows = []
+
+        for block in iter_blocks(self.source):
+            if isinstance(block, Paragraph):
+                question = parser.feed(block.text, block.bold)
+                if question:
+                    self.questions.append(question)
+            elif block.table_index == 0:
+                self.table_rows.append(block.cells)
+
+        question = parser.close()
+        if question:
+            self.questions.append(question)
+        return self.questions
     
     def get_questions_as_db_format(self) -> List[Dict]:
         """
@@ -180,7 +276,7 @@ class WordTestParser:
             for opt in q['options']:
                 db_option = {
                     'text': opt['text'],
-                    'is_correct': (opt['index'] == q['correct_index'])
+                    'is_correct': opt['is_correct']
                 }
                 db_question['options'].append(db_option)
             